@@ -7,6 +7,20 @@ const router = express.Router();
 // Game engine service URL
 const GAME_ENGINE_URL = process.env.GAME_ENGINE_URL || 'http://localhost:8000';
 
+// Forward the request id so engine logs line up with ours, the user id the
+// engine rate-limits by, and the client's Idempotency-Key so a retried
+// create/join/move is answered with the first response
+const engineOptions = (req) => {
+  const headers = { 'X-Request-ID': req.requestId };
+  if (req.user) {
+    headers['X-User-ID'] = req.user.userId;
+  }
+  if (req.headers['idempotency-key']) {
+    headers['Idempotency-Key'] = req.headers['idempotency-key'];
+  }
+  return { headers };
+};
+
 // Middleware to verify session
 const verifySession = async (req, res, next) => {
   try {
@@ -34,13 +48,16 @@ const verifySession = async (req, res, next) => {
 // Create new game
 router.post('/create', verifySession, async (req, res) => {
   try {
-    const { gameMode = 'vs_human' } = req.body; // vs_human or vs_ai
+    const { gameMode = 'vs_human', aiDifficulty, boardSize, winLength } = req.body; // vs_human or vs_ai
     
     const response = await axios.post(`${GAME_ENGINE_URL}/api/game/create`, {
       created_by: req.user.userId,
       created_by_username: req.user.username,
-      game_mode: gameMode
-    });
+      game_mode: gameMode,
+      ai_difficulty: aiDifficulty,
+      board_size: boardSize,
+      win_length: winLength
+    }, engineOptions(req));
 
     console.log(`Game created: ${response.data.gameId} by ${req.user.username}`);
     
@@ -63,7 +80,7 @@ router.post('/join/:gameId', verifySession, async (req, res) => {
     const response = await axios.post(`${GAME_ENGINE_URL}/api/game/join/${gameId}`, {
       player_id: req.user.userId,
       player_username: req.user.username
-    });
+    }, engineOptions(req));
 
     console.log(`${req.user.username} joined game: ${gameId}`);
     
@@ -78,20 +95,86 @@ router.post('/join/:gameId', verifySession, async (req, res) => {
   }
 });
 
+// Find an opponent: join the longest-waiting game or open one and wait
+router.post('/matchmaking', verifySession, async (req, res) => {
+  try {
+    const { boardSize, winLength } = req.body;
+
+    const response = await axios.post(`${GAME_ENGINE_URL}/api/game/matchmaking`, {
+      player_id: req.user.userId,
+      player_username: req.user.username,
+      board_size: boardSize,
+      win_length: winLength
+    }, engineOptions(req));
+
+    res.json(response.data);
+  } catch (error) {
+    console.error('Matchmaking error:', error);
+    if (error.response) {
+      res.status(error.response.status).json(error.response.data);
+    } else {
+      res.status(500).json({ error: 'Failed to find a match' });
+    }
+  }
+});
+
+// Long-poll until someone joins the player's waiting game
+router.get('/matchmaking/wait/:gameId', verifySession, async (req, res) => {
+  try {
+    const { gameId } = req.params;
+
+    const response = await axios.get(`${GAME_ENGINE_URL}/api/game/matchmaking/wait/${gameId}`, {
+      ...engineOptions(req),
+      params: { timeout: req.query.timeout }
+    });
+
+    res.json(response.data);
+  } catch (error) {
+    console.error('Matchmaking wait error:', error);
+    if (error.response) {
+      res.status(error.response.status).json(error.response.data);
+    } else {
+      res.status(500).json({ error: 'Failed to wait for a match' });
+    }
+  }
+});
+
+// Stop waiting for an opponent
+router.delete('/matchmaking/:gameId', verifySession, async (req, res) => {
+  try {
+    const { gameId } = req.params;
+
+    const response = await axios.delete(`${GAME_ENGINE_URL}/api/game/matchmaking/${gameId}`, {
+      ...engineOptions(req),
+      params: { player_id: req.user.userId }
+    });
+
+    res.json(response.data);
+  } catch (error) {
+    console.error('Cancel matchmaking error:', error);
+    if (error.response) {
+      res.status(error.response.status).json(error.response.data);
+    } else {
+      res.status(500).json({ error: 'Failed to cancel matchmaking' });
+    }
+  }
+});
+
 // Make a move
 router.post('/move/:gameId', verifySession, async (req, res) => {
   try {
     const { gameId } = req.params;
     const { position } = req.body;
     
-    if (typeof position !== 'number' || position < 0 || position > 8) {
-      return res.status(400).json({ error: 'Invalid position. Must be 0-8.' });
+    // Upper bound depends on the game's board size; the engine validates it
+    if (!Number.isInteger(position) || position < 0) {
+      return res.status(400).json({ error: 'Invalid position. Must be a non-negative integer.' });
     }
 
     const response = await axios.post(`${GAME_ENGINE_URL}/api/game/move/${gameId}`, {
       player_id: req.user.userId,
       position
-    });
+    }, engineOptions(req));
 
     console.log(`Move made in game ${gameId}: position ${position} by ${req.user.username}`);
     
@@ -106,28 +189,87 @@ router.post('/move/:gameId', verifySession, async (req, res) => {
   }
 });
 
-// Get game state
+// Get game state. The engine's ETag is passed through and If-None-Match
+// forwarded, so an unchanged game costs a 304 end to end; the body is relayed
+// as text instead of being parsed and re-serialized here.
 router.get('/state/:gameId', verifySession, async (req, res) => {
   try {
     const { gameId } = req.params;
     
-    const response = await axios.get(`${GAME_ENGINE_URL}/api/game/state/${gameId}`);
+    const options = engineOptions(req);
+    if (req.headers['if-none-match']) {
+      options.headers['If-None-Match'] = req.headers['if-none-match'];
+    }
+    const response = await axios.get(`${GAME_ENGINE_URL}/api/game/state/${gameId}`, {
+      ...options,
+      responseType: 'text',
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304
+    });
     
-    res.json(response.data);
+    for (const header of ['etag', 'vary', 'cache-control']) {
+      if (response.headers[header]) {
+        res.set(header, response.headers[header]);
+      }
+    }
+    if (response.status === 304) {
+      return res.status(304).end();
+    }
+    res.type('application/json').send(response.data);
   } catch (error) {
     console.error('Get game state error:', error);
     if (error.response) {
-      res.status(error.response.status).json(error.response.data);
+      res.status(error.response.status).type('application/json').send(error.response.data);
     } else {
       res.status(500).json({ error: 'Failed to get game state' });
     }
   }
 });
 
-// Get list of active games
+// Wins, losses and draws of a user (the caller when no id is given)
+router.get('/stats/:userId?', verifySession, async (req, res) => {
+  try {
+    const userId = req.params.userId || req.user.userId;
+
+    const response = await axios.get(`${GAME_ENGINE_URL}/api/game/stats/${encodeURIComponent(userId)}`, engineOptions(req));
+
+    res.json(response.data);
+  } catch (error) {
+    console.error('Get player stats error:', error);
+    if (error.response) {
+      res.status(error.response.status).json(error.response.data);
+    } else {
+      res.status(500).json({ error: 'Failed to get player stats' });
+    }
+  }
+});
+
+// Top players by points
+router.get('/leaderboard', verifySession, async (req, res) => {
+  try {
+    const response = await axios.get(`${GAME_ENGINE_URL}/api/game/leaderboard`, {
+      ...engineOptions(req),
+      params: { limit: req.query.limit }
+    });
+
+    res.json(response.data);
+  } catch (error) {
+    console.error('Get leaderboard error:', error);
+    if (error.response) {
+      res.status(error.response.status).json(error.response.data);
+    } else {
+      res.status(500).json({ error: 'Failed to get leaderboard' });
+    }
+  }
+});
+
+// Get a page of active games (status, gameMode, limit, cursor and summary are passed on)
 router.get('/list', verifySession, async (req, res) => {
   try {
-    const response = await axios.get(`${GAME_ENGINE_URL}/api/game/list`);
+    const { status, gameMode, limit, cursor, summary } = req.query;
+    const response = await axios.get(`${GAME_ENGINE_URL}/api/game/list`, {
+      ...engineOptions(req),
+      params: { status, game_mode: gameMode, limit, cursor, summary }
+    });
     
     res.json(response.data);
   } catch (error) {
@@ -1,5 +1,6 @@
 const express = require('express');
 const cors = require('cors');
+const { randomUUID } = require('crypto');
 require('dotenv').config();
 
 const authRoutes = require('./routes/auth');
@@ -12,6 +13,13 @@ const app = express();
 app.use(cors());
 app.use(express.json());
 
+// Request id shared with the game engine so log lines can be correlated
+app.use((req, res, next) => {
+  req.requestId = req.get('x-request-id') || randomUUID();
+  res.set('X-Request-ID', req.requestId);
+  next();
+});
+
 // Health check
 app.get('/health', (req, res) => {
   res.json({ status: 'healthy', service: 'tictactoe-backend' });
@@ -0,0 +1,78 @@
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+# Benchmarks import the service the same way the Dockerfile runs it
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+# Keep request-path logging out of the measurements and the report
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted samples"""
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, int(round(fraction * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+def summarize(samples_ns: List[int], elapsed: float) -> Dict[str, float]:
+    """Throughput and latency percentiles for one benchmark"""
+    samples = sorted(samples_ns)
+    return {
+        "n": len(samples),
+        "ops_per_sec": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "p50_us": round(percentile(samples, 0.50) / 1000, 2),
+        "p99_us": round(percentile(samples, 0.99) / 1000, 2),
+    }
+
+
+def median_of_runs(runs: List[Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, float]]:
+    """Per benchmark, the median of each figure over repeated runs (n is summed)"""
+    merged = {}
+    for name in runs[0]:
+        samples = [run[name] for run in runs if name in run]
+        result = {key: round(statistics.median(sample[key] for sample in samples), 2)
+                  for key in samples[0] if key != "n"}
+        result["n"] = sum(sample["n"] for sample in samples)
+        result["runs"] = len(samples)
+        merged[name] = result
+    return merged
+
+
+def report_metadata() -> Dict[str, str]:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": str(os.cpu_count()),
+    }
+
+
+def format_table(results: Dict[str, Dict[str, float]]) -> str:
+    width = max([len(name) for name in results] + [9])
+    lines = [f"{'benchmark':<{width}}  {'ops/s':>12}  {'p50 us':>10}  {'p99 us':>10}  {'n':>8}"]
+    for name, result in results.items():
+        lines.append(
+            f"{name:<{width}}  {result['ops_per_sec']:>12,.1f}  {result['p50_us']:>10.2f}"
+            f"  {result['p99_us']:>10.2f}  {result['n']:>8}"
+        )
+    return "\n".join(lines)
+
+
+def write_json(path: str, data: dict):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def now_ns() -> int:
+    return time.perf_counter_ns()
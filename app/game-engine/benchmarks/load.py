@@ -0,0 +1,195 @@
+import asyncio
+import os
+import random
+import shutil
+import socket
+import subprocess
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import now_ns, summarize
+
+import config.admission as admission
+import config.redis_config as redis_config
+from main import app
+
+
+class LoadClient:
+    """ASGI client that records per-route latency samples"""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.samples: Dict[str, List[int]] = defaultdict(list)
+        self.errors = 0
+
+    async def request(self, route: str, method: str, url: str, **kwargs) -> Optional[dict]:
+        started = now_ns()
+        response = await self.client.request(method, url, **kwargs)
+        self.samples[route].append(now_ns() - started)
+        if response.status_code >= 500:
+            self.errors += 1
+            return None
+        return response.json()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def redis_backend(redis_url: Optional[str] = None, spawn: bool = False) -> AsyncIterator[str]:
+    """Point the service at fakeredis (default), a spawned redis-server, or `redis_url`"""
+    process = None
+    if spawn:
+        if shutil.which("redis-server") is None:
+            raise RuntimeError("redis-server not found on PATH")
+        port = _free_port()
+        process = subprocess.Popen(
+            ["redis-server", "--port", str(port), "--save", "", "--appendonly", "no"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        redis_url = f"redis://127.0.0.1:{port}"
+        await asyncio.sleep(0.2)
+
+    original_create_client = redis_config._create_client
+    if redis_url is not None:
+        os.environ["REDIS_URL"] = redis_url
+    else:
+        # In-process stand-in; the service code above the client is unchanged
+        import fakeredis
+        server = fakeredis.FakeServer()
+        redis_config._create_client = lambda url: fakeredis.FakeAsyncRedis(server=server)
+        redis_url = "fakeredis://"
+
+    try:
+        for attempt in range(20):
+            try:
+                await redis_config.init_redis()
+                break
+            except Exception:
+                if attempt == 19:
+                    raise
+                await asyncio.sleep(0.1)
+        yield redis_url
+    finally:
+        await redis_config.close_redis()
+        redis_config._create_client = original_create_client
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+async def play_human_game(load: LoadClient, polls_per_move: int):
+    """create, join, then alternate moves (polling state between them) until the game ends"""
+    created = await load.request("create", "POST", "/api/game/create", json={
+        "created_by": "p1", "created_by_username": "Alice", "game_mode": "vs_human"})
+    if not created:
+        return
+    game_id = created["game_state"]["game_id"]
+    await load.request("join", "POST", f"/api/game/join/{game_id}", json={
+        "player_id": "p2", "player_username": "Bob"})
+
+    cells = list(range(9))
+    random.shuffle(cells)
+    players = ("p1", "p2")
+    for turn, cell in enumerate(cells):
+        moved = await load.request("move", "POST", f"/api/game/move/{game_id}", json={
+            "player_id": players[turn % 2], "position": cell})
+        for _ in range(polls_per_move):
+            await load.request("state", "GET", f"/api/game/state/{game_id}")
+        if moved and moved.get("is_game_over"):
+            break
+
+
+async def play_ai_game(load: LoadClient, polls_per_move: int, difficulty: str = "perfect"):
+    """create vs_ai and move until the game ends (AI replies inside each move)"""
+    created = await load.request("create", "POST", "/api/game/create", json={
+        "created_by": "p1", "created_by_username": "Alice", "game_mode": "vs_ai",
+        "ai_difficulty": difficulty})
+    if not created:
+        return
+    game_id = created["game_state"]["game_id"]
+    board = created["game_state"]["board"]
+    while True:
+        free = [i for i, cell in enumerate(board) if cell is None]
+        if not free:
+            break
+        moved = await load.request("move", "POST", f"/api/game/move/{game_id}", json={
+            "player_id": "p1", "position": random.choice(free)})
+        for _ in range(polls_per_move):
+            await load.request("state", "GET", f"/api/game/state/{game_id}")
+        if not moved or moved.get("is_game_over"):
+            break
+        board = moved["game_state"]["board"]
+
+
+SCENARIOS = {
+    "human": lambda load: play_human_game(load, polls_per_move=1),
+    "ai": lambda load: play_ai_game(load, polls_per_move=1),
+    "poll_heavy": lambda load: play_human_game(load, polls_per_move=5),
+}
+
+
+async def run_scenario(name: str, games: int, concurrency: int,
+                       list_every: int = 0) -> Dict[str, Dict[str, float]]:
+    """Play `games` games with `concurrency` virtual users; results per route and in total"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        load = LoadClient(client)
+        queue: asyncio.Queue = asyncio.Queue()
+        for game in range(games):
+            queue.put_nowait(game)
+
+        async def user():
+            while not queue.empty():
+                game = queue.get_nowait()
+                await SCENARIOS[name](load)
+                if list_every and game % list_every == 0:
+                    await load.request("list", "GET", "/api/game/list")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    results = {}
+    all_samples: List[int] = []
+    for route, samples in sorted(load.samples.items()):
+        # Per-route throughput is that route's share of the scenario's wall time
+        results[f"load_{name}_{route}"] = summarize(samples, elapsed)
+        all_samples.extend(samples)
+    total = summarize(all_samples, elapsed)
+    total["errors"] = load.errors
+    results[f"load_{name}_total"] = total
+    return results
+
+
+async def load_benchmarks(scale: float = 1.0, concurrency: int = 32,
+                          redis_url: Optional[str] = None,
+                          spawn_redis: bool = False) -> Dict[str, Dict[str, float]]:
+    """All load scenarios against one Redis backend"""
+    random.seed(1234)
+    games = max(concurrency, int(200 * scale))
+    results = {}
+    # Measure the service, not the shedder: an in-process fakeredis shares the
+    # saturated event loop, so its latency would read as overload
+    admission_enabled = admission.ADMISSION_ENABLED
+    admission.ADMISSION_ENABLED = False
+    try:
+        async with redis_backend(redis_url, spawn_redis):
+            for name in SCENARIOS:
+                results.update(await run_scenario(name, games, concurrency,
+                                                  list_every=50 if name == "human" else 0))
+    finally:
+        admission.ADMISSION_ENABLED = admission_enabled
+    return results
+
+
+if __name__ == "__main__":
+    from benchmarks.common import format_table
+    print(format_table(asyncio.run(load_benchmarks())))
@@ -0,0 +1,96 @@
+import time
+from typing import Callable, Dict, Optional
+
+from benchmarks.common import now_ns, summarize
+
+from models.game_codec import decode_game, encode_game_binary, encode_game_json
+from models.game_models import AIDifficulty, GameMode
+from services.game_logic import GameEngine, TicTacToeLogic
+
+# Mid-game positions, no winner yet (X to move)
+CLASSIC_BOARD = ["X", "O", None, None, "X", None, "O", None, None]
+LARGE_BOARD = [None] * 225
+for _cell in (112, 113, 127, 98, 96, 126):
+    LARGE_BOARD[_cell] = "X" if _cell in (112, 127, 96) else "O"
+
+
+def run_benchmark(func: Callable, iterations: int,
+                  setup: Optional[Callable] = None) -> Dict[str, float]:
+    """Time `iterations` calls, one sample per call
+
+    With `setup`, its return value is passed to `func` and its cost is not
+    measured (for calls that consume their input, like make_move).
+    """
+    # Warm up caches (perfect-play table, geometries) before measuring
+    for _ in range(max(1, iterations // 100)):
+        if setup is None:
+            func()
+        else:
+            func(setup())
+
+    samples = []
+    elapsed_ns = 0
+    for _ in range(iterations):
+        if setup is None:
+            started = now_ns()
+            func()
+        else:
+            args = setup()
+            started = now_ns()
+            func(args)
+        duration = now_ns() - started
+        samples.append(duration)
+        elapsed_ns += duration
+    return summarize(samples, elapsed_ns / 1e9)
+
+
+def _game_with_players(game_mode: GameMode, ai_difficulty: AIDifficulty = AIDifficulty.RANDOM):
+    game_state = GameEngine.create_game("bench", "p1", "Alice", game_mode, ai_difficulty=ai_difficulty)
+    if game_mode == GameMode.VS_HUMAN:
+        GameEngine.join_game(game_state, "p2", "Bob")
+    return game_state
+
+
+def micro_benchmarks(scale: float = 1.0) -> Dict[str, Dict[str, float]]:
+    """Engine, AI and codec microbenchmarks; `scale` shrinks iteration counts"""
+    def n(count: int) -> int:
+        return max(10, int(count * scale))
+
+    results = {}
+    results["check_winner_3x3"] = run_benchmark(
+        lambda: TicTacToeLogic.check_winner(CLASSIC_BOARD), n(50_000))
+    results["check_winner_15x15"] = run_benchmark(
+        lambda: TicTacToeLogic.check_winner(LARGE_BOARD), n(5_000))
+
+    for difficulty in AIDifficulty:
+        results[f"ai_move_3x3_{difficulty.value}"] = run_benchmark(
+            lambda d=difficulty: TicTacToeLogic.ai_move(CLASSIC_BOARD, "X", d), n(20_000))
+    results["ai_move_15x15_greedy"] = run_benchmark(
+        lambda: TicTacToeLogic.ai_move(LARGE_BOARD, "X", AIDifficulty.GREEDY), n(2_000))
+
+    human_blob = encode_game_binary(_game_with_players(GameMode.VS_HUMAN))
+    results["make_move_vs_human"] = run_benchmark(
+        lambda state: GameEngine.make_move(state, "p1", 4),
+        n(20_000), setup=lambda: decode_game(human_blob))
+    ai_blob = encode_game_binary(_game_with_players(GameMode.VS_AI, AIDifficulty.PERFECT))
+    results["make_move_vs_ai_perfect"] = run_benchmark(
+        lambda state: GameEngine.make_move(state, "p1", 4),
+        n(20_000), setup=lambda: decode_game(ai_blob))
+
+    game_state = _game_with_players(GameMode.VS_HUMAN)
+    GameEngine.make_move(game_state, "p1", 4)
+    binary_blob = encode_game_binary(game_state)
+    json_blob = encode_game_json(game_state)
+    results["encode_binary"] = run_benchmark(lambda: encode_game_binary(game_state), n(20_000))
+    results["decode_binary"] = run_benchmark(lambda: decode_game(binary_blob), n(20_000))
+    results["encode_json"] = run_benchmark(lambda: encode_game_json(game_state), n(20_000))
+    results["decode_json"] = run_benchmark(lambda: decode_game(json_blob), n(20_000))
+
+    return results
+
+
+if __name__ == "__main__":
+    from benchmarks.common import format_table
+    started = time.perf_counter()
+    print(format_table(micro_benchmarks()))
+    print(f"\n{time.perf_counter() - started:.1f}s")
@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import json
+import sys
+from typing import Dict, List, Optional
+
+from benchmarks.common import format_table, median_of_runs, report_metadata, write_json
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float, min_samples: int = 0) -> List[str]:
+    """Benchmarks whose throughput fell more than `tolerance` below the baseline
+
+    Benchmarks with fewer than `min_samples` samples on either side are shown
+    but never flagged: their throughput is noise.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<32}  {'baseline ops/s':>14}  {'ops/s':>12}  {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["ops_per_sec"]
+        after = result["ops_per_sec"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if min(result["n"], baseline[name]["n"]) < min_samples:
+            flag = "  (too few samples)"
+        elif after < before * (1 - tolerance):
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<32}  {before:>14,.1f}  {after:>12,.1f}  {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """python -m benchmarks.run [--quick] [--repeat 3] [--compare bench-base.json]"""
+    parser = argparse.ArgumentParser(description="Game engine micro and load benchmarks")
+    parser.add_argument("--only", choices=("micro", "load"), help="Run one suite")
+    parser.add_argument("--quick", action="store_true", help="Quarter-size run (CI)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Virtual users in load scenarios")
+    parser.add_argument("--redis-url", help="Run load scenarios against this Redis instead of fakeredis")
+    parser.add_argument("--spawn-redis", action="store_true",
+                        help="Start a throwaway local redis-server for the load scenarios")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--compare", help="Baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="Allowed throughput drop against the baseline (0.3 = 30%%)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Run everything this many times and report the median of each figure")
+    parser.add_argument("--min-samples", type=int, default=20,
+                        help="Benchmarks with fewer samples are not checked against the baseline")
+    args = parser.parse_args(argv)
+
+    scale = 0.25 if args.quick else 1.0
+    runs: List[Dict[str, Dict[str, float]]] = []
+
+    for _ in range(max(1, args.repeat)):
+        results: Dict[str, Dict[str, float]] = {}
+        if args.only in (None, "micro"):
+            from benchmarks.micro import micro_benchmarks
+            results.update(micro_benchmarks(scale))
+        if args.only in (None, "load"):
+            from benchmarks.load import load_benchmarks
+            results.update(asyncio.run(load_benchmarks(
+                scale, args.concurrency, redis_url=args.redis_url, spawn_redis=args.spawn_redis)))
+        runs.append(results)
+    results = median_of_runs(runs)
+
+    print(format_table(results))
+
+    report = {
+        "meta": dict(report_metadata(), scale=scale, concurrency=args.concurrency, runs=len(runs),
+                     redis="spawned" if args.spawn_redis else args.redis_url or "fakeredis"),
+        "results": results,
+    }
+    if args.output:
+        write_json(args.output, report)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance, args.min_samples)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed beyond {args.tolerance:.0%}: "
+                  f"{', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,36 +2,105 @@
 
 import sys
 import os
-import subprocess
+import math
+import tempfile
+from typing import Optional
+
+import uvicorn
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
 
 # Add src directory to Python path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+sys.path.insert(0, SRC_DIR)
+
+# Seconds in-flight requests get to finish after SIGTERM (keep below the
+# pod's terminationGracePeriodSeconds)
+GRACEFUL_SHUTDOWN_SECONDS = int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "25"))
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """CPUs allowed by the container's cgroup quota, or None when unlimited"""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+def default_workers() -> int:
+    """WEB_CONCURRENCY, else one worker per CPU of the cgroup quota (rounded up), else 1
+
+    Without a quota os.cpu_count() is the node's core count, not what the
+    pod may use, and every worker holds its own Redis pool, AI pool,
+    lifecycle task and events hub.
+    """
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(os.environ["WEB_CONCURRENCY"]))
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        return max(1, min(os.cpu_count() or 1, math.ceil(limit)))
+    return 1
+
+def _available(module: str) -> bool:
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
 
 def main():
     """Start the FastAPI server"""
-    port = os.getenv("PORT", "8000")
+    port = int(os.getenv("PORT", "8000"))
     env = os.getenv("ENV", "development")
-    
-    cmd = [
-        "uvicorn", 
-        "main:app", 
-        "--host", "0.0.0.0", 
-        "--port", port
-    ]
-    
-    if env == "development":
-        cmd.extend(["--reload"])
-    
+
     print(f"Starting Game Engine on port {port}")
     print(f"Environment: {env}")
-    
-    # Change to src directory
-    os.chdir(os.path.join(os.path.dirname(__file__), 'src'))
-    
-    try:
-        subprocess.run(cmd)
-    except KeyboardInterrupt:
-        print("\nGame Engine stopped")
+
+    if env == "development":
+        uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True,
+                    app_dir=SRC_DIR, reload_dirs=[SRC_DIR])
+        return
+
+    workers = default_workers()
+    # Workers size their share of per-pod resources (the AI pool) from it
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    if workers > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Each worker writes its samples here so /metrics covers all of them
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+
+    loop = "uvloop" if _available("uvloop") else "auto"
+    http = "httptools" if _available("httptools") else "auto"
+    print(f"Workers: {workers} (loop={loop}, http={http})")
+
+    # The worker supervisor forwards SIGTERM: each worker stops accepting
+    # connections, finishes in-flight requests, then runs lifespan shutdown
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        app_dir=SRC_DIR,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_SECONDS,
+        proxy_headers=True,
+        forwarded_allow_ips="*",
+        # Request logging is covered by /metrics and the app's own logs
+        access_log=False
+    )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
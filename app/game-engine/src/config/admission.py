@@ -0,0 +1,262 @@
+import asyncio
+import json
+import math
+import os
+import random
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from starlette.routing import Match
+
+from config.logging_config import get_logger
+from config.metrics import REDIS_LATENCY_EWMA, REQUESTS_IN_FLIGHT, request_rejected
+from config.redis_config import get_redis_client, take_tokens
+
+logger = get_logger(__name__)
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+
+# Requests handled at once per worker before new ones get 503 (0 disables)
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "200"))
+
+# Per-user token buckets, "METHOD /route/template=rate:burst" with rate in
+# requests per second; "*" covers the other routes. Users are identified by
+# the X-User-ID header the backend forwards; requests without it are not limited.
+USER_RATE_LIMITS = os.getenv(
+    "USER_RATE_LIMITS",
+    "POST /api/game/move/{game_id}=5:10,POST /api/game/create=1:5,POST /api/game/join/{game_id}=1:5,"
+    "POST /api/game/matchmaking=1:5,*=20:40"
+)
+
+# Buckets shared by every caller of a route across replicas, same format (none by default)
+ROUTE_RATE_LIMITS = os.getenv("ROUTE_RATE_LIMITS", "")
+
+# Shedding starts once the smoothed Redis latency or the event-loop lag passes these
+SHED_REDIS_LATENCY_MS = float(os.getenv("SHED_REDIS_LATENCY_MS", "50"))
+SHED_LOOP_LAG_MS = float(os.getenv("SHED_LOOP_LAG_MS", "100"))
+
+# Largest fraction of requests shed, so some still get through and show recovery
+MAX_SHED_FRACTION = float(os.getenv("MAX_SHED_FRACTION", "0.9"))
+
+# Seconds between load samples (event-loop lag and a Redis PING; 0 disables them)
+LOAD_SAMPLE_SECONDS = float(os.getenv("LOAD_SAMPLE_SECONDS", "0.5"))
+
+# Retry-After sent with 503s
+SHED_RETRY_AFTER_SECONDS = int(os.getenv("SHED_RETRY_AFTER_SECONDS", "1"))
+
+# Longest the rate-limit round trip may take; past it the request is admitted
+RATE_LIMIT_TIMEOUT_MS = float(os.getenv("RATE_LIMIT_TIMEOUT_MS", "50"))
+
+# (method, path) -> route template lookups kept per worker, so most requests skip route matching
+ROUTE_CACHE_SIZE = int(os.getenv("ROUTE_CACHE_SIZE", "10000"))
+
+USER_ID_HEADER = b"x-user-id"
+
+# Never limited or shed: probes, metrics and long-lived streams
+EXEMPT_ROUTES = {
+    "/", "/health", "/ready", "/metrics", "/api/game/admission/stats", "/api/game/ai/stats",
+    "/api/game/events/{game_id}", "/api/game/matchmaking/wait/{game_id}"
+}
+
+
+def parse_rate_limits(value: str) -> Dict[str, Tuple[float, float]]:
+    """"METHOD /route=rate:burst,..." -> {"METHOD /route": (rate, burst)}"""
+    limits = {}
+    for item in value.split(","):
+        route, _, limit = item.rpartition("=")
+        if route.strip() and limit.strip():
+            rate, _, burst = limit.partition(":")
+            limits[route.strip()] = (float(rate), float(burst or rate))
+    return limits
+
+
+class LoadMonitor:
+    """Event-loop lag and Redis latency of this worker, and what admission control did about them
+
+    Redis latency is the moving average of single-command Redis calls (bulk
+    and pipelined batch helpers are left out), topped up by a periodic PING
+    so an idle or stuck server is still measured.
+    """
+
+    def __init__(self):
+        self.loop_lag = 0.0
+        self.in_flight = 0
+        self.rejected: Dict[str, int] = {"shed": 0, "in_flight": 0, "rate_limited": 0}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if ADMISSION_ENABLED and LOAD_SAMPLE_SECONDS > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(LOAD_SAMPLE_SECONDS)
+            lag = max(0.0, loop.time() - started - LOAD_SAMPLE_SECONDS)
+            # Rise at once, decay over a few samples
+            self.loop_lag = max(lag, (self.loop_lag + lag) / 2)
+
+            started = loop.time()
+            try:
+                await asyncio.wait_for(get_redis_client().ping(), timeout=1.0)
+            except Exception:
+                pass
+            REDIS_LATENCY_EWMA.observe(loop.time() - started)
+
+    def overload(self) -> float:
+        """Worst signal relative to its threshold (above 1.0 means overloaded)"""
+        return max(self.loop_lag * 1000 / SHED_LOOP_LAG_MS,
+                   REDIS_LATENCY_EWMA.value * 1000 / SHED_REDIS_LATENCY_MS)
+
+    def shed_fraction(self) -> float:
+        """Share of requests to refuse: grows with how far past the threshold we are"""
+        if not ADMISSION_ENABLED:
+            return 0.0
+        return min(MAX_SHED_FRACTION, max(0.0, self.overload() - 1.0))
+
+    def reject(self, reason: str):
+        self.rejected[reason] += 1
+        request_rejected(reason)
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "in_flight": self.in_flight,
+            "max_in_flight": MAX_IN_FLIGHT,
+            "loop_lag_ms": round(self.loop_lag * 1000, 2),
+            "redis_latency_ms": round(REDIS_LATENCY_EWMA.value * 1000, 2),
+            "shed_fraction": round(self.shed_fraction(), 3),
+            "rejected": dict(self.rejected)
+        }
+
+
+async def _refuse(send, status: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode())
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """ASGI middleware deciding whether a request is handled at all
+
+    Checks run cheapest first, so refusing costs far less than serving:
+    shedding (503) while Redis latency or event-loop lag is over its
+    threshold, then the worker's in-flight limit (503), then the user's and
+    route's token buckets in Redis (429). Refusals carry Retry-After and
+    skip routing, validation and every other Redis call.
+    """
+
+    def __init__(self, app, monitor: LoadMonitor):
+        self.app = app
+        self.monitor = monitor
+        self.user_limits = parse_rate_limits(USER_RATE_LIMITS)
+        self.route_limits = parse_rate_limits(ROUTE_RATE_LIMITS)
+        self._routes: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+    def _route(self, scope) -> str:
+        """Path template of the route the request will reach"""
+        key = (scope["method"], scope["path"])
+        route = self._routes.get(key)
+        if route is not None:
+            self._routes.move_to_end(key)
+            return route
+
+        route = self._match_route(scope)
+        if ROUTE_CACHE_SIZE > 0:
+            self._routes[key] = route
+            if len(self._routes) > ROUTE_CACHE_SIZE:
+                self._routes.popitem(last=False)
+        return route
+
+    @staticmethod
+    def _match_route(scope) -> str:
+        partial = "unmatched"
+        for route in scope["app"].routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", "unmatched")
+            if match == Match.PARTIAL and partial == "unmatched":
+                # Path matches but not the method (405): still limit by this route
+                partial = getattr(route, "path", "unmatched")
+        return partial
+
+    def _buckets(self, scope, route: str) -> List[Tuple[str, float, float]]:
+        name = f"{scope['method']} {route}"
+        buckets = []
+        user_id = next((value.decode("latin-1") for key, value in scope.get("headers") or ()
+                        if key == USER_ID_HEADER), None)
+        if user_id:
+            limit = self.user_limits.get(name) or self.user_limits.get("*")
+            if limit:
+                buckets.append((f"rate_limit:user:{user_id}:{name}", *limit))
+        limit = self.route_limits.get(name) or self.route_limits.get("*")
+        if limit:
+            buckets.append((f"rate_limit:route:{name}", *limit))
+        return buckets
+
+    async def _retry_after(self, buckets: List[Tuple[str, float, float]]) -> float:
+        """Seconds until the request may be retried, 0 to admit it"""
+        if not buckets:
+            return 0.0
+        try:
+            return await asyncio.wait_for(take_tokens(buckets), timeout=RATE_LIMIT_TIMEOUT_MS / 1000)
+        except Exception as e:
+            # Fail open: a slow or unreachable Redis is the shedder's problem
+            logger.debug("Rate limit check skipped: %s", e)
+            return 0.0
+
+    async def __call__(self, scope, receive, send):
+        if not ADMISSION_ENABLED or scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route(scope)
+        if route in EXEMPT_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        monitor = self.monitor
+        fraction = monitor.shed_fraction()
+        if fraction and random.random() < fraction:
+            monitor.reject("shed")
+            await _refuse(send, 503, "Server overloaded, please retry", SHED_RETRY_AFTER_SECONDS)
+            return
+
+        if MAX_IN_FLIGHT and monitor.in_flight >= MAX_IN_FLIGHT:
+            monitor.reject("in_flight")
+            await _refuse(send, 503, "Too many requests in progress, please retry", SHED_RETRY_AFTER_SECONDS)
+            return
+
+        monitor.in_flight += 1
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            retry_after = await self._retry_after(self._buckets(scope, route))
+            if retry_after:
+                monitor.reject("rate_limited")
+                await _refuse(send, 429, "Rate limit exceeded", retry_after)
+                return
+            await self.app(scope, receive, send)
+        finally:
+            monitor.in_flight -= 1
+            REQUESTS_IN_FLIGHT.dec()
+
+
+load_monitor = LoadMonitor()
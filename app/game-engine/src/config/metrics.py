@@ -0,0 +1,246 @@
+import os
+import time
+from functools import wraps
+from typing import Callable, Dict
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+)
+
+from config.logging_config import on_dropped_record
+
+# Set by multi-worker deployments so every worker's samples are exported
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Sub-millisecond buckets for in-process steps and Redis round trips
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REQUEST_LATENCY = Histogram(
+    "game_engine_request_seconds", "HTTP request latency by route",
+    ["method", "route"], buckets=REQUEST_BUCKETS
+)
+REQUEST_ERRORS = Counter(
+    "game_engine_request_errors_total", "HTTP responses with status >= 400",
+    ["method", "route", "status"]
+)
+REDIS_LATENCY = Histogram(
+    "game_engine_redis_seconds", "Redis operation latency",
+    ["operation"], buckets=FAST_BUCKETS
+)
+REDIS_ERRORS = Counter(
+    "game_engine_redis_errors_total", "Redis operations that raised",
+    ["operation"]
+)
+CODEC_LATENCY = Histogram(
+    "game_engine_codec_seconds", "Game state serialize/deserialize time",
+    ["step"], buckets=FAST_BUCKETS
+)
+ENGINE_LATENCY = Histogram(
+    "game_engine_engine_seconds", "Game engine time (make_move includes the AI reply unless the caller plays it)",
+    ["step"], buckets=FAST_BUCKETS
+)
+GAMES_CREATED = Counter("game_engine_games_created_total", "Games created", ["mode"])
+GAMES_FINISHED = Counter("game_engine_games_finished_total", "Games finished", ["result"])
+GAMES_ARCHIVED = Counter("game_engine_games_archived_total", "Games moved from Redis to the archive")
+REQUESTS_REJECTED = Counter(
+    "game_engine_requests_rejected_total", "Requests refused by admission control",
+    ["reason"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "game_engine_requests_in_flight", "Requests being handled (admission-controlled routes)",
+    multiprocess_mode="livesum"
+)
+AI_COMPUTE = Histogram(
+    "game_engine_ai_compute_seconds", "AI search time in a pool worker",
+    buckets=REQUEST_BUCKETS
+)
+AI_QUEUE_WAIT = Histogram(
+    "game_engine_ai_queue_seconds", "Time an AI search waited for a pool worker",
+    buckets=REQUEST_BUCKETS
+)
+AI_QUEUE_DEPTH = Gauge(
+    "game_engine_ai_queue_depth", "AI searches submitted to the pool and not finished",
+    multiprocess_mode="livesum"
+)
+AI_FALLBACKS = Counter(
+    "game_engine_ai_fallbacks_total", "AI moves answered with the fallback move instead of a search",
+    ["reason"]
+)
+# Per replica: created minus finished here; sum() over replicas for the total
+ACTIVE_GAMES = Gauge(
+    "game_engine_active_games", "Games started and not yet finished",
+    multiprocess_mode="livesum"
+)
+
+# A counter rather than a callback gauge: set_function() is not exported in multiprocess mode
+LOG_RECORDS_DROPPED = Counter(
+    "game_engine_log_records_dropped", "Log records dropped because the log queue was full"
+)
+on_dropped_record(LOG_RECORDS_DROPPED.inc)
+
+class Ewma:
+    """Exponentially weighted moving average, for load signals that must react in seconds"""
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.value = 0.0
+
+    def observe(self, value: float):
+        self.value += self.alpha * (value - self.value)
+
+
+# Recent round-trip time of single Redis commands in seconds, read by admission control
+REDIS_LATENCY_EWMA = Ewma(alpha=0.1)
+
+# Label children resolved once; labels() on every observation costs more than observe()
+_children: Dict[tuple, object] = {}
+
+
+def _child(metric, *labels):
+    key = (metric, labels)
+    child = _children.get(key)
+    if child is None:
+        child = _children[key] = metric.labels(*labels)
+    return child
+
+
+def timed_redis(operation: str, load_signal: bool = False) -> Callable:
+    """Decorator timing an async Redis helper and counting its failures
+
+    Only helpers making a single small round trip should pass load_signal:
+    their latency also feeds REDIS_LATENCY_EWMA, which admission control
+    sheds on, and a bulk or multi-round-trip call would read as a slow Redis.
+    """
+    def decorator(func):
+        latency = _child(REDIS_LATENCY, operation)
+        errors = _child(REDIS_ERRORS, operation)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                latency.observe(elapsed)
+                if load_signal:
+                    REDIS_LATENCY_EWMA.observe(elapsed)
+        return wrapper
+    return decorator
+
+
+def timed(metric, step: str) -> Callable:
+    """Decorator timing a synchronous function into `metric` under `step`"""
+    def decorator(func):
+        latency = _child(metric, step)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                latency.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def game_created(mode: str):
+    _child(GAMES_CREATED, mode).inc()
+    ACTIVE_GAMES.inc()
+
+
+def game_finished(result: str):
+    _child(GAMES_FINISHED, result).inc()
+    ACTIVE_GAMES.dec()
+
+
+def game_archived(count: int):
+    GAMES_ARCHIVED.inc(count)
+
+
+def request_rejected(reason: str):
+    _child(REQUESTS_REJECTED, reason).inc()
+
+
+def ai_fallback(reason: str):
+    _child(AI_FALLBACKS, reason).inc()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and errors per route template
+
+    Routes are labelled by their path template (/move/{game_id}), never the
+    raw path, so label cardinality stays fixed. WebSocket and streaming
+    connections are not timed.
+    """
+
+    def __init__(self, app, skip_paths=("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+        self._route_paths: Dict[Callable, str] = {}
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            path = "unmatched"
+            for route in scope["app"].routes:
+                if getattr(route, "endpoint", None) is endpoint:
+                    path = route.path
+                    break
+            self._route_paths[endpoint] = path
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = dict(message.get("headers") or ())
+                streaming = headers.get(b"content-type", b"").startswith(b"text/event-stream")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = self._route(scope)
+            method = scope["method"]
+            if not streaming:
+                _child(REQUEST_LATENCY, method, route).observe(time.perf_counter() - started)
+            if status >= 400:
+                _child(REQUEST_ERRORS, method, route, str(status)).inc()
+
+
+def close_metrics():
+    """Drop this worker's live gauges from the multiprocess directory"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def metrics_response_body() -> bytes:
+    """Current metrics in the Prometheus text format"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
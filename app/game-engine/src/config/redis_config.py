@@ -1,84 +1,1250 @@
+import asyncio
 import redis.asyncio as redis
 import os
-import json
-from typing import Optional
+import time
+from redis.asyncio.cluster import RedisCluster
+from redis.asyncio.connection import BlockingConnectionPool
+from redis.asyncio.retry import Retry
+from redis.asyncio.sentinel import Sentinel
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from typing import Any, AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
 
+from config.logging_config import get_logger
+from config.metrics import timed_redis
+
+logger = get_logger(__name__)
+
+# Game blobs are opaque bytes (see models/game_codec.py), so responses are not decoded
 redis_client: Optional[redis.Redis] = None
 
+# Dedicated pub/sub client in cluster mode (the async cluster client has no pub/sub)
+pubsub_client: Optional[redis.Redis] = None
+
+# "standalone" (REDIS_URL), "sentinel" (REDIS_SENTINELS + REDIS_SENTINEL_MASTER)
+# or "cluster" (REDIS_URL points at any cluster node)
+REDIS_MODE = os.getenv("REDIS_MODE", "standalone")
+REDIS_SENTINELS = os.getenv("REDIS_SENTINELS", "")  # host:port,host:port
+REDIS_SENTINEL_MASTER = os.getenv("REDIS_SENTINEL_MASTER", "mymaster")
+REDIS_PASSWORD = os.getenv("REDIS_PASSWORD") or None
+
+# Connections per process (per node in cluster mode)
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+# Seconds a request waits for a free pooled connection before failing
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "2"))
+REDIS_KEEPALIVE = os.getenv("REDIS_KEEPALIVE", "true").lower() == "true"
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+# Retries of a command after a connection error or timeout, with exponential backoff
+REDIS_RETRIES = int(os.getenv("REDIS_RETRIES", "3"))
+REDIS_RETRY_BACKOFF_BASE_MS = int(os.getenv("REDIS_RETRY_BACKOFF_BASE_MS", "10"))
+REDIS_RETRY_BACKOFF_CAP_MS = int(os.getenv("REDIS_RETRY_BACKOFF_CAP_MS", "500"))
+# Connections opened at startup, so the first burst does not pay for connects
+REDIS_PREWARM_CONNECTIONS = int(os.getenv("REDIS_PREWARM_CONNECTIONS", "10"))
+
+# Keys per SCAN/MGET/pipeline round trip for bulk operations
+REDIS_BATCH_SIZE = int(os.getenv("REDIS_BATCH_SIZE", "200"))
+
+GAME_TTL_SECONDS = 3600  # 1 hour TTL
+
+# "snapshot": every update rewrites the whole game blob.
+# "events":   every update appends its delta to the game's Redis Stream and the
+#             blob becomes a snapshot, rewritten every GAME_SNAPSHOT_EVERY
+#             versions (and when the caller asks, e.g. joins and game over).
+#             Readers replay the deltas newer than the snapshot.
+GAME_STORAGE_MODE = os.getenv("GAME_STORAGE_MODE", "snapshot")
+GAME_SNAPSHOT_EVERY = int(os.getenv("GAME_SNAPSHOT_EVERY", "10"))
+
+# Sorted set of user id -> leaderboard points (no TTL, like the stats hashes)
+LEADERBOARD_KEY = "leaderboard"
+
+# Listing indexes: one sorted set of game ids per status and game mode, scored
+# by created_at in milliseconds ("game_index:<status>:<mode>", outside game:*)
+GAME_INDEX_PREFIX = "game_index"
+
+# Keeps a game in the listing index of its current status, called by the write
+# scripts below before RECORD_RESULTS_LUA. k and a as there.
+# KEYS[k + 1] = index the game belongs to, KEYS[k + 2] = index it may leave
+# ARGV[a + 1] = created_at score ('' to leave the indexes alone), ARGV[a + 2] = game id
+INDEX_GAME_LUA = """
+local function index_game(k, a)
+    if #KEYS > k and ARGV[a + 1] ~= '' then
+        redis.call('ZADD', KEYS[k + 1], ARGV[a + 1], ARGV[a + 2])
+        if KEYS[k + 2] ~= KEYS[k + 1] then
+            redis.call('ZREM', KEYS[k + 2], ARGV[a + 2])
+        end
+    end
+end
+"""
+
+# Results of a finished game, recorded by the compare-and-set scripts below in
+# the call that stores the game over, so a game is counted exactly when its
+# final write lands. k and a are the number of KEYS and ARGV the script itself uses.
+# KEYS[k + 1] = leaderboard, KEYS[k + 2...] = one stats hash per player
+# ARGV[a + 1...] = user id, username, outcome field, points ('' when unranked) per player
+RECORD_RESULTS_LUA = """
+local function record_results(k, a)
+    for i = k + 2, #KEYS do
+        local arg = a + 1 + 4 * (i - k - 2)
+        redis.call('HINCRBY', KEYS[i], ARGV[arg + 2], 1)
+        redis.call('HSET', KEYS[i], 'username', ARGV[arg + 1])
+        if ARGV[arg + 3] ~= '' then
+            redis.call('ZINCRBY', KEYS[k + 1], ARGV[arg + 3], ARGV[arg])
+        end
+    end
+end
+"""
+
+# Compare-and-set of a game blob against its version counter.
+# KEYS[1] = game key, KEYS[2] = version key, KEYS[3] = idempotency hash
+# ARGV[1] = expected version, ARGV[2] = new blob, ARGV[3] = TTL seconds,
+# ARGV[4] = idempotency field ('' for none), ARGV[5] = its record
+# followed by the game's index entry (INDEX_GAME_LUA) and a finished game's
+# results (RECORD_RESULTS_LUA)
+# Returns {1, new_version} on success, {0, current_version} on conflict and
+# {2, record} when the request was already applied.
+STORE_IF_VERSION_SCRIPT = INDEX_GAME_LUA + RECORD_RESULTS_LUA + """
+if ARGV[4] ~= '' then
+    local record = redis.call('HGET', KEYS[3], ARGV[4])
+    if record then
+        return {2, record}
+    end
+end
+local current = tonumber(redis.call('GET', KEYS[2]) or '0')
+if current ~= tonumber(ARGV[1]) then
+    return {0, current}
+end
+local new_version = current + 1
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+redis.call('SET', KEYS[2], new_version, 'EX', ARGV[3])
+if ARGV[4] ~= '' then
+    redis.call('HSET', KEYS[3], ARGV[4], ARGV[5])
+end
+redis.call('EXPIRE', KEYS[3], ARGV[3])
+index_game(3, 5)
+record_results(5, 7)
+return {1, new_version}
+"""
+
+# Store a new game, once per idempotency field.
+# KEYS[1..4] as in APPEND_EVENT_SCRIPT, KEYS[5] = idempotency hash
+# ARGV[1] = blob, ARGV[2] = version, ARGV[3] = TTL seconds,
+# ARGV[4] = '1' in event-sourced mode, ARGV[5] = "create" event ('' for none),
+# ARGV[6] = idempotency field ('' for none), ARGV[7] = its record
+# followed by the game's index entry (INDEX_GAME_LUA)
+# Returns nil when stored, or the existing record when the request was already applied.
+STORE_NEW_GAME_SCRIPT = INDEX_GAME_LUA + """
+if ARGV[6] ~= '' then
+    local record = redis.call('HGET', KEYS[5], ARGV[6])
+    if record then
+        return record
+    end
+    redis.call('HSET', KEYS[5], ARGV[6], ARGV[7])
+    redis.call('EXPIRE', KEYS[5], ARGV[3])
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+if ARGV[4] == '1' then
+    redis.call('SET', KEYS[3], ARGV[2], 'EX', ARGV[3])
+    if ARGV[5] ~= '' then
+        -- Sorts before the delta of the next version ("<version + 1>-0")
+        redis.call('XADD', KEYS[4], ARGV[2] .. '-1', 'd', ARGV[5])
+        redis.call('EXPIRE', KEYS[4], ARGV[3])
+    end
+end
+index_game(5, 7)
+return nil
+"""
+
+# Conditional read for the in-process cache.
+# KEYS[1] = game key, KEYS[2] = version key, ARGV[1] = version the caller holds
+# Returns {version} when unchanged, {version, blob} when changed and
+# {-1, blob} for games without a version key (blob is nil if the game is gone).
+GET_IF_CHANGED_SCRIPT = """
+local version = redis.call('GET', KEYS[2])
+if not version then
+    return {-1, redis.call('GET', KEYS[1])}
+end
+if version == ARGV[1] then
+    return {tonumber(version)}
+end
+return {tonumber(version), redis.call('GET', KEYS[1])}
+"""
+
+# Matchmaking queues: a sorted set of waiting game ids scored by enqueue time
+# (oldest first) plus a hash, in the same slot, of game id -> creator and
+# "player:<creator>" -> the creator's queued game, so a player waits in at
+# most one game per queue. KEYS[1] = queue, KEYS[2] = creators in every script.
+# unqueue(game_ids) drops games from both, with their creators' entries.
+UNQUEUE_LUA = """
+local function unqueue(game_ids)
+    local creators = redis.call('HMGET', KEYS[2], unpack(game_ids))
+    redis.call('ZREM', KEYS[1], unpack(game_ids))
+    redis.call('HDEL', KEYS[2], unpack(game_ids))
+    for i, creator in ipairs(creators) do
+        if creator and redis.call('HGET', KEYS[2], 'player:' .. creator) == game_ids[i] then
+            redis.call('HDEL', KEYS[2], 'player:' .. creator)
+        end
+    end
+end
+local function queued_game_of(player_id)
+    local game_id = redis.call('HGET', KEYS[2], 'player:' .. player_id)
+    if game_id and redis.call('ZSCORE', KEYS[1], game_id) then
+        return game_id
+    end
+    return nil
+end
+"""
+
+# ARGV[1] = game id, ARGV[2] = creator id, ARGV[3] = now (ms), ARGV[4] = expiry cutoff (ms)
+# Drops entries whose games have outlived GAME_TTL_SECONDS. Returns {queue
+# length, queued game id}: the creator's already queued game, if any, instead of ARGV[1].
+ENQUEUE_WAITING_GAME_SCRIPT = UNQUEUE_LUA + """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[4], 'LIMIT', 0, 100)
+if #expired > 0 then
+    unqueue(expired)
+end
+local queued = queued_game_of(ARGV[2])
+if not queued then
+    queued = ARGV[1]
+    redis.call('ZADD', KEYS[1], ARGV[3], queued)
+    redis.call('HSET', KEYS[2], queued, ARGV[2], 'player:' .. ARGV[2], queued)
+end
+return {redis.call('ZCARD', KEYS[1]), queued}
+"""
+
+# Atomically take the oldest waiting game not created by the caller.
+# ARGV[1] = player id, ARGV[2] = entries to look at
+# Returns {game id, 0}, {the caller's own queued game id, 1} without claiming
+# anything when the caller is already waiting, or nil when no other player is.
+CLAIM_WAITING_GAME_SCRIPT = UNQUEUE_LUA + """
+local own = queued_game_of(ARGV[1])
+if own then
+    return {own, 1}
+end
+local candidates = redis.call('ZRANGE', KEYS[1], 0, tonumber(ARGV[2]) - 1)
+for _, game_id in ipairs(candidates) do
+    if redis.call('HGET', KEYS[2], game_id) ~= ARGV[1] then
+        unqueue({game_id})
+        return {game_id, 0}
+    end
+end
+return nil
+"""
+
+# ARGV[1] = game id. Returns 1 if it was queued.
+DEQUEUE_WAITING_GAME_SCRIPT = UNQUEUE_LUA + """
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return 0
+end
+unqueue({ARGV[1]})
+return 1
+"""
+
+# Queue entries a claim skips over (the caller's own waiting games) at most
+MATCHMAKING_SCAN_LIMIT = 16
+
+# Event-sourced update: compare-and-set on the version, then XADD the delta.
+# KEYS[1] = game key, KEYS[2] = version key, KEYS[3] = snapshot version key, KEYS[4] = stream,
+# KEYS[5] = idempotency hash
+# ARGV[1] = expected version, ARGV[2] = delta, ARGV[3] = snapshot blob or '', ARGV[4] = TTL seconds,
+# ARGV[5] = idempotency field ('' for none), ARGV[6] = its record
+# followed by the game's index entry (INDEX_GAME_LUA) and a finished game's
+# results (RECORD_RESULTS_LUA)
+# Stream entry IDs are "<version>-0", so XRANGE can start right after a snapshot.
+# Returns as STORE_IF_VERSION_SCRIPT.
+APPEND_EVENT_SCRIPT = INDEX_GAME_LUA + RECORD_RESULTS_LUA + """
+if ARGV[5] ~= '' then
+    local record = redis.call('HGET', KEYS[5], ARGV[5])
+    if record then
+        return {2, record}
+    end
+end
+local current = tonumber(redis.call('GET', KEYS[2]) or '0')
+if current ~= tonumber(ARGV[1]) then
+    return {0, current}
+end
+local new_version = current + 1
+redis.call('XADD', KEYS[4], new_version .. '-0', 'd', ARGV[2])
+redis.call('EXPIRE', KEYS[4], ARGV[4])
+if ARGV[3] ~= '' then
+    redis.call('SET', KEYS[1], ARGV[3], 'EX', ARGV[4])
+    redis.call('SET', KEYS[3], new_version, 'EX', ARGV[4])
+else
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+    redis.call('EXPIRE', KEYS[3], ARGV[4])
+end
+redis.call('SET', KEYS[2], new_version, 'EX', ARGV[4])
+if ARGV[5] ~= '' then
+    redis.call('HSET', KEYS[5], ARGV[5], ARGV[6])
+end
+redis.call('EXPIRE', KEYS[5], ARGV[4])
+index_game(5, 6)
+record_results(7, 8)
+return {1, new_version}
+"""
+
+# Event-sourced read, the counterpart of GET_IF_CHANGED_SCRIPT.
+# KEYS[1..4] as in APPEND_EVENT_SCRIPT, ARGV[1] = version the caller holds (or '')
+# Returns {version} when unchanged. Otherwise {version, snapshot, deltas...}
+# with the deltas newer than the snapshot, or {version, nil, deltas...} with
+# only the deltas newer than ARGV[1] when the caller's copy is at least as
+# new as the snapshot. Games without a version key come back as {-1, blob}.
+GET_WITH_EVENTS_SCRIPT = """
+local version = redis.call('GET', KEYS[2])
+if not version then
+    return {-1, redis.call('GET', KEYS[1])}
+end
+if version == ARGV[1] then
+    return {tonumber(version)}
+end
+version = tonumber(version)
+local snapshot = tonumber(redis.call('GET', KEYS[3]) or version)
+local known = tonumber(ARGV[1])
+local result = {version}
+local after = snapshot
+if known and known >= snapshot and known < version then
+    result[2] = false
+    after = known
+else
+    result[2] = redis.call('GET', KEYS[1])
+end
+if after < version then
+    for _, entry in ipairs(redis.call('XRANGE', KEYS[4], (after + 1) .. '-0', '+')) do
+        result[#result + 1] = entry[2][2]
+    end
+end
+return result
+"""
+
+# Token bucket refilled continuously at ARGV[1] tokens per second, holding at most ARGV[2].
+# KEYS[1] = bucket hash. Uses the server clock, so every replica sees the same bucket.
+# Returns 0 when a token was taken, else the milliseconds until one is available.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local last = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - last) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+store_if_version_script = None
+get_if_changed_script = None
+append_event_script = None
+get_with_events_script = None
+store_new_game_script = None
+token_bucket_script = None
+enqueue_waiting_game_script = None
+claim_waiting_game_script = None
+dequeue_waiting_game_script = None
+
+
+class GameVersionConflict(Exception):
+    """Raised when a game changed since it was read"""
+    
+    def __init__(self, game_id: str, expected_version: int, current_version: int):
+        super().__init__(
+            f"Game {game_id} is at version {current_version}, expected {expected_version}"
+        )
+        self.game_id = game_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+
+class DuplicateRequest(Exception):
+    """Raised when a write's idempotency field shows the request was already applied"""
+    
+    def __init__(self, game_id: str, record: bytes):
+        super().__init__(f"Request already applied to game {game_id}")
+        self.game_id = game_id
+        self.record = record
+
+
+class PlayerResult(NamedTuple):
+    """One player's outcome of a finished game"""
+    user_id: str
+    username: str
+    outcome: str  # "wins", "losses" or "draws": the stats hash field to increment
+    points: Optional[int]  # Leaderboard points, None for games that are not ranked
+
+
+class IndexEntry(NamedTuple):
+    """Listing index a game belongs in after a write"""
+    key: str  # Index of its status and mode (game_index_key)
+    previous_key: str  # Index it was in before the write; the same key when the status did not change
+    score: int  # created_at in milliseconds since the Unix epoch
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """Blocking pool that counts how often callers had to wait or gave up"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waits = 0
+        self.exhausted = 0
+        self.peak_in_use = 0
+    
+    async def get_connection(self, command_name, *keys, **options):
+        if not self.can_get_connection():
+            self.waits += 1
+        try:
+            connection = await super().get_connection(command_name, *keys, **options)
+        except RedisConnectionError as e:
+            if str(e) == "No connection available.":
+                self.exhausted += 1
+            raise
+        self.peak_in_use = max(self.peak_in_use, len(self._in_use_connections))
+        return connection
+
+
+def is_cluster() -> bool:
+    return REDIS_MODE == "cluster"
+
+def is_event_sourced() -> bool:
+    return GAME_STORAGE_MODE == "events"
+
+def game_key(game_id: str) -> str:
+    """Redis key holding a game blob"""
+    if is_cluster():
+        # Hash tag: the blob and version keys of a game share one slot
+        return f"game:{{{game_id}}}"
+    return f"game:{game_id}"
+
+def version_key(game_id: str) -> str:
+    """Redis key holding a game's version counter"""
+    # Deliberately outside the game:* namespace so SCAN only returns game blobs
+    if is_cluster():
+        return f"game_version:{{{game_id}}}"
+    return f"game_version:{game_id}"
+
+def snapshot_version_key(game_id: str) -> str:
+    """Redis key holding the version of the stored snapshot (event-sourced mode)"""
+    if is_cluster():
+        return f"game_snapshot_version:{{{game_id}}}"
+    return f"game_snapshot_version:{game_id}"
+
+def stream_key(game_id: str) -> str:
+    """Redis Stream of a game's deltas (event-sourced mode)"""
+    if is_cluster():
+        return f"game_stream:{{{game_id}}}"
+    return f"game_stream:{game_id}"
+
+def idempotency_key(game_id: str) -> str:
+    """Redis hash of the idempotency records of requests applied to a game"""
+    if is_cluster():
+        return f"game_idempotency:{{{game_id}}}"
+    return f"game_idempotency:{game_id}"
+
+def _game_keys(game_id: str) -> List[str]:
+    """KEYS of the event-sourced scripts"""
+    return [game_key(game_id), version_key(game_id), snapshot_version_key(game_id), stream_key(game_id)]
+
+def _store_call(game_id: str, game_data: bytes, expected_version: int, event: Optional[str],
+                snapshot: bool, idempotency: Optional[Tuple[str, str]],
+                results: Optional[List[PlayerResult]],
+                index: Optional[IndexEntry] = None) -> Tuple[Any, List[str], List]:
+    """(script, KEYS, ARGV) of one compare-and-set write"""
+    field, record = idempotency or ("", "")
+    if is_event_sourced() and event is not None:
+        keys, args = _with_index(
+            _game_keys(game_id) + [idempotency_key(game_id)],
+            [expected_version, event,
+             game_data if _snapshot_due(expected_version + 1, snapshot) else b"",
+             GAME_TTL_SECONDS, field, record],
+            game_id, index
+        )
+        keys, args = _with_results(keys, args, results)
+        return append_event_script, keys, args
+    keys, args = _with_index(
+        [game_key(game_id), version_key(game_id), idempotency_key(game_id)],
+        [expected_version, game_data, GAME_TTL_SECONDS, field, record],
+        game_id, index
+    )
+    keys, args = _with_results(keys, args, results)
+    return store_if_version_script, keys, args
+
+def _snapshot_due(new_version: int, force: bool) -> bool:
+    return force or GAME_SNAPSHOT_EVERY <= 1 or new_version % GAME_SNAPSHOT_EVERY == 0
+
+def game_index_key(status: str, game_mode: str) -> str:
+    """Sorted set listing the games of one status and mode, by created_at"""
+    return f"{GAME_INDEX_PREFIX}:{status}:{game_mode}"
+
+def _with_index(keys: List[str], args: List, game_id: str,
+                index: Optional[IndexEntry]) -> Tuple[List[str], List]:
+    """KEYS and ARGV of a write script extended with the game's index entry
+    
+    Always extended outside cluster mode, so the results that may follow sit
+    at fixed positions; without an entry the slots hold the game's own key
+    and an empty score. In cluster mode the indexes live in other slots than
+    the game and _index_after_write() follows the write instead.
+    """
+    if is_cluster():
+        return keys, args
+    if index is None:
+        return keys + [keys[0], keys[0]], list(args) + ["", game_id]
+    return keys + [index.key, index.previous_key], list(args) + [index.score, game_id]
+
+def player_stats_key(user_id: str) -> str:
+    """Redis hash of a user's win/loss/draw counters"""
+    return f"player_stats:{user_id}"
+
+def _with_results(keys: List[str], args: List,
+                  results: Optional[List[PlayerResult]]) -> Tuple[List[str], List]:
+    """KEYS and ARGV of a compare-and-set call extended with a game's results
+    
+    Not in cluster mode: the stats keys live in other slots than the game,
+    so there record_results() follows the write instead.
+    """
+    if not results or is_cluster():
+        return keys, args
+    keys = keys + [LEADERBOARD_KEY] + [player_stats_key(result.user_id) for result in results]
+    args = list(args)
+    for result in results:
+        args.extend([result.user_id, result.username, result.outcome,
+                     "" if result.points is None else result.points])
+    return keys, args
+
+def matchmaking_queue(game_mode: str, board_size: int, win_length: int) -> str:
+    """Queue pairing games of one mode and board"""
+    return f"{game_mode}:{board_size}x{board_size}:k{win_length}"
+
+def matchmaking_keys(queue: str) -> List[str]:
+    """Sorted set and creator hash of a matchmaking queue (one slot in cluster mode)"""
+    if is_cluster():
+        queue = f"{{{queue}}}"
+    return [f"matchmaking:{queue}", f"matchmaking_creators:{queue}"]
+
+def game_id_from_key(key: str) -> str:
+    """Game id from a game or version key (with or without a hash tag)"""
+    game_id = key.split(":", 1)[-1]
+    if game_id.startswith("{") and game_id.endswith("}"):
+        return game_id[1:-1]
+    return game_id
+
+def _retry() -> Retry:
+    return Retry(
+        ExponentialBackoff(cap=REDIS_RETRY_BACKOFF_CAP_MS / 1000, base=REDIS_RETRY_BACKOFF_BASE_MS / 1000),
+        REDIS_RETRIES
+    )
+
+def _connection_options() -> Dict[str, Any]:
+    """Socket, keepalive and retry settings shared by every mode"""
+    options = {
+        "decode_responses": False,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_CONNECT_TIMEOUT,
+        "socket_keepalive": REDIS_KEEPALIVE,
+        "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+        "retry": _retry(),
+        "retry_on_error": [RedisConnectionError, RedisTimeoutError],
+    }
+    if REDIS_PASSWORD:
+        options["password"] = REDIS_PASSWORD
+    return options
+
+def _create_client(redis_url: str):
+    """Client for the configured REDIS_MODE"""
+    if REDIS_MODE == "cluster":
+        return RedisCluster.from_url(
+            redis_url,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            connection_error_retry_attempts=REDIS_RETRIES,
+            **_connection_options()
+        )
+    
+    if REDIS_MODE == "sentinel":
+        sentinels = []
+        for address in REDIS_SENTINELS.split(","):
+            host, _, port = address.strip().partition(":")
+            sentinels.append((host, int(port or 26379)))
+        sentinel = Sentinel(
+            sentinels,
+            sentinel_kwargs={"socket_timeout": REDIS_SOCKET_TIMEOUT,
+                             "socket_connect_timeout": REDIS_CONNECT_TIMEOUT}
+        )
+        return sentinel.master_for(
+            REDIS_SENTINEL_MASTER,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            **_connection_options()
+        )
+    
+    if REDIS_MODE != "standalone":
+        raise ValueError(f"Unknown REDIS_MODE {REDIS_MODE!r}")
+    
+    pool = InstrumentedConnectionPool.from_url(
+        redis_url,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
+        **_connection_options()
+    )
+    return redis.Redis.from_pool(pool)
+
+def _create_pubsub_client(client: RedisCluster) -> redis.Redis:
+    """Plain client on one cluster node (PUBLISH is broadcast to every node)"""
+    node = client.get_default_node()
+    return redis.Redis(host=node.host, port=node.port,
+                       max_connections=REDIS_MAX_CONNECTIONS, **_connection_options())
+
 async def init_redis():
     """Initialize Redis connection"""
-    global redis_client
+    global redis_client, pubsub_client, store_if_version_script, get_if_changed_script
+    global enqueue_waiting_game_script, claim_waiting_game_script, dequeue_waiting_game_script
+    global append_event_script, get_with_events_script, store_new_game_script, token_bucket_script
     
     try:
         redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
         
-        redis_client = redis.from_url(
-            redis_url,
-            decode_responses=True,
-            health_check_interval=30
-        )
+        redis_client = _create_client(redis_url)
         
         # Test connection
         await redis_client.ping()
-        print(f"Game Engine Redis connected: {redis_url}")
+        if is_cluster():
+            pubsub_client = _create_pubsub_client(redis_client)
+        
+        # Preload scripts so every call is a single EVALSHA
+        store_if_version_script = redis_client.register_script(STORE_IF_VERSION_SCRIPT)
+        get_if_changed_script = redis_client.register_script(GET_IF_CHANGED_SCRIPT)
+        enqueue_waiting_game_script = redis_client.register_script(ENQUEUE_WAITING_GAME_SCRIPT)
+        claim_waiting_game_script = redis_client.register_script(CLAIM_WAITING_GAME_SCRIPT)
+        dequeue_waiting_game_script = redis_client.register_script(DEQUEUE_WAITING_GAME_SCRIPT)
+        append_event_script = redis_client.register_script(APPEND_EVENT_SCRIPT)
+        get_with_events_script = redis_client.register_script(GET_WITH_EVENTS_SCRIPT)
+        store_new_game_script = redis_client.register_script(STORE_NEW_GAME_SCRIPT)
+        token_bucket_script = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+        # Every registered script, so none pays a NOSCRIPT round trip on first use
+        for script in (store_if_version_script, get_if_changed_script,
+                       enqueue_waiting_game_script, claim_waiting_game_script,
+                       dequeue_waiting_game_script,
+                       append_event_script, get_with_events_script,
+                       store_new_game_script, token_bucket_script):
+            await redis_client.script_load(script.script)
+        logger.info("Game Engine Redis connected",
+                    extra={"mode": REDIS_MODE, "storage": GAME_STORAGE_MODE, "url": redis_url})
         
     except Exception as e:
-        print(f"Redis connection failed: {e}")
+        logger.error("Redis connection failed: %s", e)
         raise e
 
+async def prewarm_redis_pool(connections: Optional[int] = None):
+    """Open pooled connections up front with concurrent PINGs"""
+    connections = min(connections or REDIS_PREWARM_CONNECTIONS, REDIS_MAX_CONNECTIONS)
+    client = get_redis_client()
+    await asyncio.gather(*(client.ping() for _ in range(connections)))
+    logger.info("Redis pool prewarmed", extra={"connections": connections})
+
+async def close_redis():
+    """Close all pooled connections"""
+    global redis_client, pubsub_client
+    
+    for client in (pubsub_client, redis_client):
+        if client is not None:
+            await client.aclose()
+    redis_client = None
+    pubsub_client = None
+
 def get_redis_client() -> redis.Redis:
     """Get Redis client instance"""
     if redis_client is None:
         raise RuntimeError("Redis client not initialized. Call init_redis() first.")
     return redis_client
 
-async def store_game(game_id: str, game_data: dict) -> bool:
-    """Store game state in Redis"""
+def get_pubsub_client() -> redis.Redis:
+    """Client to publish and subscribe with"""
+    return pubsub_client or get_redis_client()
+
+def pipeline(transaction: bool = False):
+    """Pipeline on the shared client
+    
+    Cluster pipelines cannot be MULTI transactions, so there a transaction is
+    sent as a plain pipeline (a game's keys share a slot and node, and are
+    written back to back).
+    """
+    return get_redis_client().pipeline(transaction=transaction and not is_cluster())
+
+async def _queue_script(pipe, script, keys: List[str], args: List) -> None:
+    """Add a registered script call to a pipeline"""
+    if is_cluster():
+        # Cluster pipelines reject EVALSHA, but EVAL is routed by key
+        pipe.eval(script.script, len(keys), *keys, *args)
+    else:
+        await script(keys=keys, args=args, client=pipe)
+
+def pool_stats() -> Dict[str, Any]:
+    """Connection pool utilization for this process"""
+    client = get_redis_client()
+    stats: Dict[str, Any] = {"mode": REDIS_MODE}
+    
+    if is_cluster():
+        nodes = client.get_nodes()
+        in_use = sum(len(node._connections) - len(node._free) for node in nodes)
+        idle = sum(len(node._free) for node in nodes)
+        max_connections = sum(node.max_connections for node in nodes)
+        stats["nodes"] = len(nodes)
+    else:
+        pool = client.connection_pool
+        in_use = len(pool._in_use_connections)
+        idle = len(pool._available_connections)
+        max_connections = pool.max_connections
+        if isinstance(pool, InstrumentedConnectionPool):
+            stats["waits"] = pool.waits
+            stats["exhausted"] = pool.exhausted
+            stats["peak_in_use"] = pool.peak_in_use
+    
+    stats.update({
+        "max_connections": max_connections,
+        "in_use": in_use,
+        "idle": idle,
+        "utilization": round(in_use / max_connections, 4) if max_connections else 0.0
+    })
+    return stats
+
+@timed_redis("store_game", load_signal=True)
+async def store_game(game_id: str, game_data: bytes, version: int = 0,
+                     event: Optional[str] = None,
+                     idempotency: Optional[Tuple[str, str]] = None,
+                     index: Optional[IndexEntry] = None) -> bool:
+    """Store game state in Redis (unconditionally, e.g. for a new game)
+    
+    In event-sourced mode the blob is also the first snapshot and `event`
+    opens the game's stream. With `idempotency` (field, record) the game is
+    only stored if the field is not recorded yet; otherwise DuplicateRequest
+    carries the original record. `index` adds the game to its listing index.
+    """
+    if store_new_game_script is None:
+        raise RuntimeError("Redis client not initialized. Call init_redis() first.")
+    
+    field, record = idempotency or ("", "")
+    keys, args = _with_index(
+        _game_keys(game_id) + [idempotency_key(game_id)],
+        [game_data, version, GAME_TTL_SECONDS, "1" if is_event_sourced() else "",
+         event or "", field, record],
+        game_id, index
+    )
     try:
-        client = get_redis_client()
-        await client.setex(f"game:{game_id}", 3600, json.dumps(game_data))  # 1 hour TTL
-        return True
+        existing = await store_new_game_script(keys=keys, args=args)
     except Exception as e:
-        print(f"Failed to store game {game_id}: {e}")
+        logger.error("Failed to store game %s: %s", game_id, e, extra={"game_id": game_id})
         return False
+    if existing is not None:
+        raise DuplicateRequest(game_id, existing)
+    if index is not None and is_cluster():
+        await _index_after_write({game_id: index})
+    return True
+
+@timed_redis("store_game_if_version", load_signal=True)
+async def store_game_if_version(game_id: str, game_data: bytes, expected_version: int,
+                                event: Optional[str] = None, snapshot: bool = False,
+                                results: Optional[List[PlayerResult]] = None,
+                                idempotency: Optional[Tuple[str, str]] = None,
+                                index: Optional[IndexEntry] = None) -> int:
+    """Store game state only if its version is still `expected_version`
+    
+    Validation, write, version bump and TTL reset happen in one EVALSHA round
+    trip. In event-sourced mode `event` (the update's delta) is appended to
+    the game's stream and the blob is only written when a snapshot is due or
+    `snapshot` is set. `results` (for the write that finishes a game) update
+    the players' stats and the leaderboard in the same script, and so does
+    `idempotency` (field, record): a field that is already recorded raises
+    DuplicateRequest instead of writing. `index` moves the game to the
+    listing index of its new status. Returns the new version or raises
+    GameVersionConflict.
+    """
+    if store_if_version_script is None:
+        raise RuntimeError("Redis client not initialized. Call init_redis() first.")
+    
+    script, keys, args = _store_call(game_id, game_data, expected_version, event, snapshot,
+                                     idempotency, results, index)
+    stored, version = await script(keys=keys, args=args)
+    if stored == 2:
+        raise DuplicateRequest(game_id, version)
+    if not stored:
+        raise GameVersionConflict(game_id, expected_version, int(version))
+    if is_cluster():
+        if index is not None:
+            await _index_after_write({game_id: index})
+        if results:
+            await _record_results_after_write(results)
+    return int(version)
 
-async def get_game(game_id: str) -> Optional[dict]:
+@timed_redis("get_idempotency_record", load_signal=True)
+async def get_idempotency_record(game_id: str, field: str) -> Optional[bytes]:
+    """Record of a request already applied to a game, or None"""
+    return await get_redis_client().hget(idempotency_key(game_id), field)
+
+@timed_redis("get_game", load_signal=True)
+async def get_game(game_id: str) -> Optional[bytes]:
     """Retrieve game state from Redis"""
     try:
         client = get_redis_client()
-        game_data = await client.get(f"game:{game_id}")
+        game_data = await client.get(game_key(game_id))
         
         if game_data:
-            return json.loads(game_data)
+            return game_data
         return None
     except Exception as e:
-        print(f"Failed to get game {game_id}: {e}")
+        logger.error("Failed to get game %s: %s", game_id, e, extra={"game_id": game_id})
         return None
 
-async def delete_game(game_id: str) -> bool:
-    """Delete game from Redis"""
+@timed_redis("store_games_if_version")
+async def store_games_if_version(games: Iterable[Tuple[str, bytes, int]],
+                                 batch_size: Optional[int] = None,
+                                 events: Optional[Dict[str, Tuple[str, bool]]] = None,
+                                 results: Optional[Dict[str, List[PlayerResult]]] = None,
+                                 indexes: Optional[Dict[str, IndexEntry]] = None
+                                 ) -> Dict[str, Optional[int]]:
+    """Compare-and-set many (game_id, blob, expected_version) in pipelined round trips
+    
+    `events` maps game_id -> (delta, force snapshot) for event-sourced mode,
+    `results` game_id -> results of the games the batch finishes and
+    `indexes` game_id -> index entry, as in store_game_if_version. Returns
+    game_id -> new version, or None where the game changed meanwhile.
+    """
+    if store_if_version_script is None:
+        raise RuntimeError("Redis client not initialized. Call init_redis() first.")
+    
+    batch_size = batch_size or REDIS_BATCH_SIZE
+    items = list(games)
+    versions: Dict[str, Optional[int]] = {}
+    
+    for start in range(0, len(items), batch_size):
+        chunk = items[start:start + batch_size]
+        async with pipeline() as pipe:
+            for game_id, game_data, expected_version in chunk:
+                event, snapshot = (events or {}).get(game_id, (None, False))
+                script, keys, args = _store_call(game_id, game_data, expected_version, event, snapshot,
+                                                 None, results.get(game_id) if results else None,
+                                                 indexes.get(game_id) if indexes else None)
+                await _queue_script(pipe, script, keys, args)
+            replies = await pipe.execute()
+        for (game_id, _, _), (stored, version) in zip(chunk, replies):
+            versions[game_id] = int(version) if stored else None
+    
+    if indexes and is_cluster():
+        await _index_after_write({game_id: index for game_id, index in indexes.items()
+                                  if versions.get(game_id) is not None})
+    if results and is_cluster():
+        await _record_results_after_write([result for game_id, game_results in results.items()
+                                           if versions.get(game_id) is not None
+                                           for result in game_results])
+    return versions
+
+@timed_redis("get_game_if_changed", load_signal=True)
+async def get_game_if_changed(game_id: str,
+                              known_version: Optional[int]) -> Tuple[int, Optional[bytes], List[bytes]]:
+    """Return (version, blob, deltas), with blob None if still at `known_version`
+    
+    Version is -1 for games stored without a version key; a missing game
+    comes back as (-1, None, []). One EVALSHA round trip either way. Deltas
+    are only returned in event-sourced mode: replaying them on the blob (or,
+    when the blob is None, on the caller's copy at `known_version`) gives the
+    current state.
+    """
+    if get_if_changed_script is None:
+        raise RuntimeError("Redis client not initialized. Call init_redis() first.")
+    
+    known = "" if known_version is None else known_version
+    if is_event_sourced():
+        result = await get_with_events_script(keys=_game_keys(game_id), args=[known])
+    else:
+        result = await get_if_changed_script(keys=[game_key(game_id), version_key(game_id)], args=[known])
+    version = int(result[0])
+    blob = result[1] if len(result) > 1 else None
+    return version, blob, list(result[2:])
+
+@timed_redis("get_game_events", load_signal=True)
+async def get_game_events(game_id: str) -> List[bytes]:
+    """Every delta in a game's stream, oldest first (event-sourced mode)"""
+    entries = await get_redis_client().xrange(stream_key(game_id))
+    return [fields[b"d"] for _, fields in entries]
+
+@timed_redis("delete_game", load_signal=True)
+async def delete_game(game_id: str, index_keys: Iterable[str] = ()) -> bool:
+    """Delete game from Redis, and from the listing indexes in `index_keys`"""
     try:
-        client = get_redis_client()
-        await client.delete(f"game:{game_id}")
+        async with pipeline() as pipe:
+            pipe.delete(*_game_keys(game_id), idempotency_key(game_id))
+            for key in index_keys:
+                pipe.zrem(key, game_id)
+            await pipe.execute()
         return True
     except Exception as e:
-        print(f"Failed to delete game {game_id}: {e}")
+        logger.error("Failed to delete game %s: %s", game_id, e, extra={"game_id": game_id})
+        return False
+
+@timed_redis("enqueue_waiting_game", load_signal=True)
+async def enqueue_waiting_game(queue: str, game_id: str, creator_id: str) -> Tuple[int, str]:
+    """Put a WAITING game at the back of a matchmaking queue
+    
+    Returns (queue length, queued game id). The id is the creator's game
+    that was already queued, and `game_id` was not added, when they are
+    waiting in this queue already.
+    """
+    if enqueue_waiting_game_script is None:
+        raise RuntimeError("Redis client not initialized. Call init_redis() first.")
+    
+    now_ms = int(time.time() * 1000)
+    length, queued = await enqueue_waiting_game_script(
+        keys=matchmaking_keys(queue),
+        args=[game_id, creator_id, now_ms, now_ms - GAME_TTL_SECONDS * 1000]
+    )
+    return int(length), queued.decode() if isinstance(queued, bytes) else queued
+
+@timed_redis("claim_waiting_game", load_signal=True)
+async def claim_waiting_game(queue: str, player_id: str) -> Tuple[Optional[str], bool]:
+    """Remove and return the oldest game in a queue that `player_id` did not create
+    
+    The pop is a single script, so two players can never claim the same game.
+    Returns (game id, False), (None, False) when nobody else is waiting, or
+    (the player's own queued game id, True), claiming nothing, when the
+    player is waiting in this queue already.
+    """
+    if claim_waiting_game_script is None:
+        raise RuntimeError("Redis client not initialized. Call init_redis() first.")
+    
+    result = await claim_waiting_game_script(
+        keys=matchmaking_keys(queue), args=[player_id, MATCHMAKING_SCAN_LIMIT]
+    )
+    if result is None:
+        return None, False
+    game_id, own = result
+    return game_id.decode() if isinstance(game_id, bytes) else game_id, bool(int(own))
+
+@timed_redis("dequeue_waiting_game", load_signal=True)
+async def dequeue_waiting_game(queue: str, game_id: str) -> bool:
+    """Take a game out of a matchmaking queue; False if it was not queued"""
+    try:
+        if dequeue_waiting_game_script is None:
+            raise RuntimeError("Redis client not initialized. Call init_redis() first.")
+        return bool(await dequeue_waiting_game_script(keys=matchmaking_keys(queue), args=[game_id]))
+    except Exception as e:
+        logger.error("Failed to dequeue game %s: %s", game_id, e, extra={"game_id": game_id})
         return False
 
-async def get_all_games() -> list:
-    """Get all active games"""
+@timed_redis("record_results")
+async def record_results(results: Iterable[PlayerResult], batch_size: Optional[int] = None):
+    """Add game results to the stats hashes and leaderboard, pipelined
+    
+    Used where they cannot ride along with the game's own write: in cluster
+    mode (right after it, so a crash in between loses one game's counts)
+    and by the backfill job.
+    """
+    batch_size = batch_size or REDIS_BATCH_SIZE
+    items = list(results)
+    for start in range(0, len(items), batch_size):
+        async with pipeline() as pipe:
+            for result in items[start:start + batch_size]:
+                key = player_stats_key(result.user_id)
+                pipe.hincrby(key, result.outcome, 1)
+                pipe.hset(key, "username", result.username)
+                if result.points is not None:
+                    pipe.zincrby(LEADERBOARD_KEY, result.points, result.user_id)
+            await pipe.execute()
+
+async def _record_results_after_write(results: List[PlayerResult]):
+    """record_results() for a game that is already stored: failures are logged, not raised"""
+    try:
+        await record_results(results)
+    except Exception as e:
+        logger.error("Failed to record game results for %s: %s",
+                     ", ".join(result.user_id for result in results), e)
+
+@timed_redis("index_games")
+async def index_games(indexes: Dict[str, IndexEntry], batch_size: Optional[int] = None):
+    """Put games in their listing indexes (game_id -> entry), pipelined
+    
+    Used where the entry cannot ride along with the game's own write: in
+    cluster mode, and when the lifecycle worker re-indexes the games it scans.
+    """
+    batch_size = batch_size or REDIS_BATCH_SIZE
+    items = list(indexes.items())
+    for start in range(0, len(items), batch_size):
+        async with pipeline() as pipe:
+            for game_id, index in items[start:start + batch_size]:
+                pipe.zadd(index.key, {game_id: index.score})
+                if index.previous_key != index.key:
+                    pipe.zrem(index.previous_key, game_id)
+            await pipe.execute()
+
+async def _index_after_write(indexes: Dict[str, IndexEntry]):
+    """index_games() for games that are already stored: failures are logged, not raised"""
+    try:
+        await index_games(indexes)
+    except Exception as e:
+        logger.error("Failed to index games %s: %s", ", ".join(indexes), e)
+
+@timed_redis("unindex_games")
+async def unindex_games(index_key: str, game_ids: List[str]):
+    """Drop entries from a listing index"""
+    if game_ids:
+        await get_redis_client().zrem(index_key, *game_ids)
+
+@timed_redis("get_index_pages")
+async def get_index_pages(index_keys: List[str], max_score: Optional[int], after_id: str,
+                          count: int) -> List[Tuple[int, str, str]]:
+    """Up to `count` entries of each index, newest first, below a cursor
+    
+    The cursor is the (score, game id) of the last entry already returned:
+    entries with a lower score, or the same score and a lower id, come next.
+    One pipelined ZREVRANGEBYSCORE per index, O(log n + count) each; another
+    round trip only when entries sharing the cursor's score fill a page.
+    Returns (score, game id, index key) from all indexes, unsorted.
+    """
+    top = "+inf" if max_score is None else max_score
+    entries: List[Tuple[int, str, str]] = []
+    pending = [(key, 0) for key in index_keys]
+    while pending:
+        async with pipeline() as pipe:
+            for key, offset in pending:
+                pipe.zrevrangebyscore(key, top, "-inf", start=offset, num=count, withscores=True)
+            replies = await pipe.execute()
+        retry = []
+        for (key, offset), reply in zip(pending, replies):
+            taken = 0
+            for member, score in reply:
+                game_id = member.decode() if isinstance(member, bytes) else member
+                score = int(score)
+                if max_score is not None and score == max_score and game_id >= after_id:
+                    continue
+                entries.append((score, game_id, key))
+                taken += 1
+            if len(reply) == count and taken < count:
+                # Skipped entries tied with the cursor; the page needs the ones after them
+                retry.append((key, offset + count))
+        pending = retry
+    return entries
+
+@timed_redis("prune_game_index")
+async def prune_game_index(index_keys: List[str], created_before: int,
+                           batch_size: Optional[int] = None) -> int:
+    """Drop index entries of games that expired, returns how many
+    
+    A game expires GAME_TTL_SECONDS after its last write, so only games
+    created before `created_before` (ms, now minus that TTL) can be gone;
+    just those entries are checked.
+    """
+    client = get_redis_client()
+    batch_size = batch_size or REDIS_BATCH_SIZE
+    removed = 0
+    for key in index_keys:
+        offset = 0
+        while True:
+            members = await client.zrangebyscore(key, "-inf", created_before, start=offset, num=batch_size)
+            if not members:
+                break
+            game_ids = [member.decode() if isinstance(member, bytes) else member for member in members]
+            async with pipeline() as pipe:
+                for game_id in game_ids:
+                    pipe.exists(game_key(game_id))
+                exists = await pipe.execute()
+            gone = [game_id for game_id, found in zip(game_ids, exists) if not found]
+            if gone:
+                await client.zrem(key, *gone)
+                removed += len(gone)
+            offset += len(game_ids) - len(gone)
+            if len(members) < batch_size:
+                break
+    return removed
+
+def _player_stats(user_id: str, fields: Dict[bytes, bytes], score: Optional[float],
+                  rank: Optional[int]) -> Dict[str, Any]:
+    wins, losses, draws = (int(fields.get(field, 0)) for field in (b"wins", b"losses", b"draws"))
+    return {
+        "user_id": user_id,
+        "username": fields.get(b"username", b"").decode(),
+        "wins": wins,
+        "losses": losses,
+        "draws": draws,
+        "games_played": wins + losses + draws,
+        "points": int(score or 0),
+        "rank": None if rank is None else rank + 1
+    }
+
+@timed_redis("get_player_stats")
+async def get_player_stats(user_id: str) -> Optional[Dict[str, Any]]:
+    """A user's counters, leaderboard points and rank (1 = top), None if they never finished a game
+    
+    HGETALL of a small hash plus ZSCORE and ZREVRANK: O(log n) in the number of ranked players.
+    """
+    async with pipeline() as pipe:
+        pipe.hgetall(player_stats_key(user_id))
+        pipe.zscore(LEADERBOARD_KEY, user_id)
+        pipe.zrevrank(LEADERBOARD_KEY, user_id)
+        fields, score, rank = await pipe.execute()
+    if not fields:
+        return None
+    return _player_stats(user_id, fields, score, rank)
+
+@timed_redis("get_leaderboard")
+async def get_leaderboard(limit: int) -> List[Dict[str, Any]]:
+    """Top `limit` players by points: one ZREVRANGE (O(log n + limit)) and one pipelined read of their stats"""
+    client = get_redis_client()
+    entries = await client.zrevrange(LEADERBOARD_KEY, 0, limit - 1, withscores=True)
+    if not entries:
+        return []
+    user_ids = [member.decode() if isinstance(member, bytes) else member for member, _ in entries]
+    async with pipeline() as pipe:
+        for user_id in user_ids:
+            pipe.hgetall(player_stats_key(user_id))
+        details = await pipe.execute()
+    return [
+        _player_stats(user_id, fields, score, rank)
+        for rank, (user_id, (_, score), fields) in enumerate(zip(user_ids, entries, details))
+    ]
+
+@timed_redis("take_tokens", load_signal=True)
+async def take_tokens(buckets: List[Tuple[str, float, float]]) -> float:
+    """Take a token from each (key, tokens per second, burst) bucket in one pipelined round trip
+    
+    Returns 0 when every bucket had one, else the seconds until the emptiest
+    refills. A bucket that had a token keeps it spent either way.
+    """
+    if token_bucket_script is None:
+        raise RuntimeError("Redis client not initialized. Call init_redis() first.")
+    
+    async with pipeline() as pipe:
+        for key, rate, burst in buckets:
+            await _queue_script(pipe, token_bucket_script, [key], [rate, burst])
+        waits = await pipe.execute()
+    return max(int(wait) for wait in waits) / 1000
+
+async def matchmaking_queue_length(queue: str) -> int:
+    """Games waiting for an opponent in a queue"""
+    return int(await get_redis_client().zcard(matchmaking_keys(queue)[0]))
+
+async def scan_game_keys(batch_size: Optional[int] = None) -> AsyncIterator[List[bytes]]:
+    """Yield game keys in batches using non-blocking SCAN"""
+    client = get_redis_client()
+    batch_size = batch_size or REDIS_BATCH_SIZE
+    batch = []
+    
+    async for key in client.scan_iter(match="game:*", count=batch_size):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    
+    if batch:
+        yield batch
+
+@timed_redis("mget")
+async def _mget_games(keys: List) -> List[Optional[bytes]]:
+    """Read one batch of game keys with a single MGET"""
+    client = get_redis_client()
+    if is_cluster():
+        # Keys of different games live in different slots
+        values = await client.mget_nonatomic(keys)
+    else:
+        values = await client.mget(keys)
+    return [value or None for value in values]
+
+@timed_redis("get_games_with_events")
+async def _get_games_with_events(game_ids: List[str]) -> List[Optional[Tuple[bytes, List[bytes]]]]:
+    """Snapshot plus newer deltas for one batch of games, pipelined (event-sourced mode)"""
+    async with pipeline() as pipe:
+        for game_id in game_ids:
+            await _queue_script(pipe, get_with_events_script, _game_keys(game_id), [""])
+        replies = await pipe.execute()
+    return [(reply[1], list(reply[2:])) if len(reply) > 1 and reply[1] else None for reply in replies]
+
+async def _read_games(game_ids: List[str]) -> List[Optional[Tuple[bytes, List[bytes]]]]:
+    """(blob, deltas) per game, None where missing; deltas are empty in snapshot mode"""
+    if is_event_sourced():
+        return await _get_games_with_events(game_ids)
+    values = await _mget_games([game_key(game_id) for game_id in game_ids])
+    return [(value, []) if value is not None else None for value in values]
+
+async def get_games(game_ids: Iterable[str],
+                    batch_size: Optional[int] = None) -> Dict[str, Tuple[bytes, List[bytes]]]:
+    """Retrieve many games with one MGET (or pipeline) per batch, as (blob, deltas)
+    
+    Missing games are left out. Read errors are raised rather than returned
+    as an empty result, so callers never mistake a failed read for games
+    that are gone.
+    """
+    batch_size = batch_size or REDIS_BATCH_SIZE
+    ids = list(dict.fromkeys(game_ids))
+    games = {}
+    
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        values = await _read_games(chunk)
+        for game_id, game in zip(chunk, values):
+            if game is not None:
+                games[game_id] = game
+    
+    return games
+
+@timed_redis("existing_games")
+async def existing_games(game_ids: Iterable[str]) -> Set[str]:
+    """The ids whose game key still exists, with one pipelined EXISTS per game"""
+    ids = list(dict.fromkeys(game_ids))
+    if not ids:
+        return set()
+    async with pipeline() as pipe:
+        for game_id in ids:
+            pipe.exists(game_key(game_id))
+        replies = await pipe.execute()
+    return {game_id for game_id, exists in zip(ids, replies) if exists}
+
+async def iter_game_batches(batch_size: Optional[int] = None
+                            ) -> AsyncIterator[List[Tuple[bytes, List[bytes]]]]:
+    """Yield stored games as (blob, deltas) one SCAN batch at a time"""
+    async for keys in scan_game_keys(batch_size):
+        records = await _read_games([game_id_from_key(key.decode()) for key in keys])
+        games = [record for record in records if record]
+        if games:
+            yield games
+
+async def get_all_games(batch_size: Optional[int] = None) -> List[Tuple[bytes, List[bytes]]]:
+    """Get all active games (SCAN + one MGET per batch)"""
     try:
-        client = get_redis_client()
-        keys = await client.keys("game:*")
         games = []
         
-        for key in keys:
-            game_data = await client.get(key)
-            if game_data:
-                game = json.loads(game_data)
-                games.append(game)
+        async for batch in iter_game_batches(batch_size):
+            games.extend(batch)
         
         return games
     except Exception as e:
-        print(f"Failed to get games list: {e}")
-        return []
\ No newline at end of file
+        logger.error("Failed to get games list: %s", e)
+        return []
+
+@timed_redis("delete_games")
+async def delete_games(game_ids: Iterable[str], batch_size: Optional[int] = None,
+                       index_keys: Iterable[str] = ()) -> bool:
+    """Delete many games (blob and version keys) with one pipelined round trip per batch
+    
+    The games are also removed from the listing indexes in `index_keys`.
+    """
+    try:
+        batch_size = batch_size or REDIS_BATCH_SIZE
+        ids = list(game_ids)
+        index_keys = list(index_keys)
+        
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            async with pipeline() as pipe:
+                for game_id in chunk:
+                    # Separate DELs: in cluster mode each game sits in its own slot
+                    pipe.delete(*_game_keys(game_id), idempotency_key(game_id))
+                for key in index_keys:
+                    pipe.zrem(key, *chunk)
+                await pipe.execute()
+        
+        return True
+    except Exception as e:
+        logger.error("Failed to delete games batch: %s", e)
+        return False
@@ -1,20 +1,75 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
-from config.redis_config import init_redis, get_redis_client
+from config.logging_config import setup_logging, shutdown_logging, get_logger, RequestIdMiddleware
+from config.metrics import MetricsMiddleware, METRICS_CONTENT_TYPE, metrics_response_body, close_metrics
+from config.admission import AdmissionMiddleware, load_monitor
+from config.redis_config import init_redis, close_redis, get_redis_client, prewarm_redis_pool
+from services.game_cache import init_game_cache, close_game_cache
+from services.game_events import game_events
+from services.game_archive import game_lifecycle
+from services.ai_executor import ai_executor
 from routers import game_router
 from models.game_models import HealthResponse
+from services.ai_logic import TicTacToeAI
+from services.endgame_db import EndgameDatabase
 
 # Load environment variables
 load_dotenv()
 
+# Structured logs via a background writer thread, so logging never blocks the event loop
+setup_logging()
+logger = get_logger(__name__)
+
+async def prewarm():
+    """Do first-request work up front: map the endgame databases, open pooled connections"""
+    EndgameDatabase.load_all()
+    if EndgameDatabase.for_geometry(TicTacToeAI.CLASSIC) is None:
+        TicTacToeAI.get_table()
+    await prewarm_redis_pool()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup before the first request, graceful shutdown after the last"""
+    try:
+        await init_redis()
+        await prewarm()
+        await ai_executor.start()
+        await init_game_cache()
+        await game_events.start()
+        await game_lifecycle.start()
+        await load_monitor.start()
+        app.state.ready = True
+        logger.info("Game Engine started successfully")
+    except Exception as e:
+        logger.exception("Failed to start Game Engine")
+        raise e
+    
+    yield
+    
+    # Uvicorn has stopped accepting connections and drained in-flight requests
+    app.state.ready = False
+    await load_monitor.stop()
+    await game_lifecycle.stop()
+    await game_events.stop()
+    await close_game_cache()
+    await close_redis()
+    await ai_executor.stop()
+    EndgameDatabase.close_all()
+    close_metrics()
+    logger.info("Game Engine stopped")
+    shutdown_logging()
+
 app = FastAPI(
     title="Tic-Tac-Toe Game Engine",
     description="Python FastAPI service for game logic and AI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -26,15 +81,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize connections on startup"""
-    try:
-        await init_redis()
-        print("Game Engine started successfully")
-    except Exception as e:
-        print(f"Failed to start Game Engine: {e}")
-        raise e
+# Per-route latency and error metrics, exported at /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Sheds, caps and rate-limits requests before any routing or validation
+app.add_middleware(AdmissionMiddleware, monitor=load_monitor)
+
+# Added last so it wraps everything: request ids are set before any handler logs
+app.add_middleware(RequestIdMiddleware)
 
 @app.get("/", response_model=HealthResponse)
 async def root():
@@ -62,6 +116,24 @@ async def health_check():
         message=f"Game Engine is running - Redis: {redis_status}"
     )
 
+@app.get("/ready", response_model=HealthResponse)
+async def readiness_check():
+    """Readiness probe: 503 until startup (and prewarm) finished and once shutdown
+    began. Overload is left to admission control: a slow Redis slows every
+    replica alike, so failing readiness on it would pull all of them at once."""
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content=HealthResponse(
+            status="starting",
+            service="tictactoe-game-engine",
+            message="Game Engine is not ready"
+        ).model_dump())
+    return await health_check()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    return Response(content=metrics_response_body(), media_type=METRICS_CONTENT_TYPE)
+
 # Include API routes
 app.include_router(game_router.router, prefix="/api/game", tags=["game"])
 
@@ -0,0 +1,236 @@
+import json
+import os
+import struct
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from config.metrics import CODEC_LATENCY, timed
+from models.game_models import (
+    GameState, Player, PlayerSymbol, GameStatus, GameMode, AIDifficulty
+)
+
+# Format written by encode_game(): "binary" (compact) or "json" (legacy).
+# Keep "json" while replicas that only read JSON are still running.
+GAME_CODEC = os.getenv("GAME_CODEC", "binary")
+
+# Binary layout (little endian), codec version 1:
+#   header     magic, codec version, board size, win length, status, game mode,
+#              AI difficulty, player count, moves count, game version,
+#              created_at / updated_at as microseconds since the Unix epoch
+#   refs       current_turn and winner as string-table indexes or special codes
+#   players    one flag byte each (symbol, is_ai)
+#   board      X mask then O mask, ceil(cells / 8) bytes each
+#   strings    count, then length-prefixed UTF-8: game_id, then user_id and
+#              username per player, then any extra strings referenced above
+MAGIC = b"\x00G"  # Never a valid first byte of a JSON document
+CODEC_VERSION = 1
+HEADER = struct.Struct("<2sBBBBBBBHIqqBB")
+STRING_LENGTH = struct.Struct("<H")
+
+# Enum values are stored by position, so these lists must only ever grow
+STATUSES = list(GameStatus)
+MODES = list(GameMode)
+DIFFICULTIES = list(AIDifficulty)
+
+REF_NONE = 0xFF
+# Winner codes for the usual values, so they need no string table entry
+WINNER_CODES = {"X": 0xF0, "O": 0xF1, "draw": 0xF2}
+WINNER_VALUES = {code: value for value, code in WINNER_CODES.items()}
+
+FLAG_SYMBOL_O = 0x01
+FLAG_IS_AI = 0x02
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class GameCodecError(ValueError):
+    """Raised when a stored game cannot be decoded"""
+
+
+def is_legacy_blob(blob: bytes) -> bool:
+    """Legacy games are stored as JSON objects"""
+    return blob[:1] == b"{"
+
+
+@timed(CODEC_LATENCY, "serialize")
+def encode_game(game_state: GameState) -> bytes:
+    """GameState -> bytes in the configured GAME_CODEC format"""
+    if GAME_CODEC == "json":
+        return encode_game_json(game_state)
+    return encode_game_binary(game_state)
+
+
+@timed(CODEC_LATENCY, "deserialize")
+def decode_game(blob: bytes) -> GameState:
+    """Stored bytes (binary or legacy JSON) -> GameState"""
+    if isinstance(blob, str):
+        blob = blob.encode()
+    if is_legacy_blob(blob):
+        return decode_game_json(blob)
+    return decode_game_binary(blob)
+
+
+def encode_game_json(game_state: GameState) -> bytes:
+    """Legacy format: full model_dump as JSON"""
+    game_dict = game_state.model_dump(mode='json')
+    # Convert datetime to string for JSON serialization
+    game_dict['created_at'] = game_state.created_at.isoformat()
+    game_dict['updated_at'] = game_state.updated_at.isoformat()
+    return json.dumps(game_dict).encode()
+
+
+def decode_game_json(blob: bytes) -> GameState:
+    """Legacy format -> GameState (fully validated)"""
+    game_data = json.loads(blob)
+    game_data['created_at'] = datetime.fromisoformat(game_data['created_at'])
+    game_data['updated_at'] = datetime.fromisoformat(game_data['updated_at'])
+    return GameState(**game_data)
+
+
+def _to_micros(value: datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    return (value - EPOCH) // MICROSECOND
+
+
+def _from_micros(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+def encode_game_binary(game_state: GameState) -> bytes:
+    """GameState -> compact binary record"""
+    strings: List[str] = [game_state.game_id]
+    flags = bytearray()
+    for player in game_state.players:
+        strings.append(player.user_id)
+        strings.append(player.username)
+        flags.append(
+            (FLAG_SYMBOL_O if player.symbol == PlayerSymbol.O else 0)
+            | (FLAG_IS_AI if player.is_ai else 0)
+        )
+
+    def ref(value: Optional[str]) -> int:
+        if value is None:
+            return REF_NONE
+        # Player user_ids sit at odd indexes; reuse them before adding a string
+        for index in range(1, len(strings), 2):
+            if strings[index] == value:
+                return index
+        strings.append(value)
+        return len(strings) - 1
+
+    turn_ref = ref(game_state.current_turn)
+    winner = game_state.winner
+    winner_ref = WINNER_CODES[winner] if winner in WINNER_CODES else ref(winner)
+    if len(strings) > WINNER_CODES["X"]:
+        raise GameCodecError("Too many strings to encode")
+
+    x_mask = 0
+    o_mask = 0
+    for i, cell in enumerate(game_state.board):
+        if cell == "X":
+            x_mask |= 1 << i
+        elif cell == "O":
+            o_mask |= 1 << i
+    mask_bytes = (len(game_state.board) + 7) // 8
+
+    parts = [
+        HEADER.pack(
+            MAGIC, CODEC_VERSION,
+            game_state.board_size, game_state.win_length,
+            STATUSES.index(game_state.status),
+            MODES.index(game_state.game_mode),
+            DIFFICULTIES.index(game_state.ai_difficulty),
+            len(game_state.players),
+            game_state.moves_count, game_state.version,
+            _to_micros(game_state.created_at), _to_micros(game_state.updated_at),
+            turn_ref, winner_ref
+        ),
+        bytes(flags),
+        x_mask.to_bytes(mask_bytes, "little"),
+        o_mask.to_bytes(mask_bytes, "little"),
+        bytes([len(strings)])
+    ]
+    for value in strings:
+        encoded = value.encode()
+        parts.append(STRING_LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+
+    return b"".join(parts)
+
+
+def decode_game_binary(blob: bytes) -> GameState:
+    """Compact binary record -> GameState
+
+    The record was produced by encode_game_binary() from a validated model, so
+    the model is rebuilt without running validation again.
+    """
+    try:
+        (magic, codec_version, board_size, win_length, status, game_mode, ai_difficulty,
+         player_count, moves_count, version, created_at, updated_at,
+         turn_ref, winner_ref) = HEADER.unpack_from(blob)
+        if magic != MAGIC or codec_version != CODEC_VERSION:
+            raise GameCodecError(f"Unsupported game record (codec version {codec_version})")
+
+        offset = HEADER.size
+        flags = blob[offset:offset + player_count]
+        offset += player_count
+
+        cell_count = board_size * board_size
+        mask_bytes = (cell_count + 7) // 8
+        x_mask = int.from_bytes(blob[offset:offset + mask_bytes], "little")
+        offset += mask_bytes
+        o_mask = int.from_bytes(blob[offset:offset + mask_bytes], "little")
+        offset += mask_bytes
+
+        string_count = blob[offset]
+        offset += 1
+        strings = []
+        for _ in range(string_count):
+            (length,) = STRING_LENGTH.unpack_from(blob, offset)
+            offset += STRING_LENGTH.size
+            if offset + length > len(blob):
+                raise GameCodecError("Corrupt game record: truncated string table")
+            strings.append(blob[offset:offset + length].decode())
+            offset += length
+
+        players = [
+            Player.model_construct(
+                user_id=strings[1 + 2 * i],
+                username=strings[2 + 2 * i],
+                symbol=PlayerSymbol.O if flag & FLAG_SYMBOL_O else PlayerSymbol.X,
+                is_ai=bool(flag & FLAG_IS_AI)
+            )
+            for i, flag in enumerate(flags)
+        ]
+
+        if winner_ref in WINNER_VALUES:
+            winner = WINNER_VALUES[winner_ref]
+        else:
+            winner = None if winner_ref == REF_NONE else strings[winner_ref]
+
+        return GameState.model_construct(
+            game_id=strings[0],
+            board=[
+                "X" if (x_mask >> i) & 1 else "O" if (o_mask >> i) & 1 else None
+                for i in range(cell_count)
+            ],
+            board_size=board_size,
+            win_length=win_length,
+            players=players,
+            current_turn=None if turn_ref == REF_NONE else strings[turn_ref],
+            status=STATUSES[status],
+            winner=winner,
+            game_mode=MODES[game_mode],
+            ai_difficulty=DIFFICULTIES[ai_difficulty],
+            created_at=_from_micros(created_at),
+            updated_at=_from_micros(updated_at),
+            moves_count=moves_count,
+            version=version
+        )
+    except GameCodecError:
+        raise
+    except (struct.error, IndexError, ValueError, OverflowError) as e:
+        # Any field read from a damaged record can be out of range
+        raise GameCodecError(f"Corrupt game record: {e}") from e
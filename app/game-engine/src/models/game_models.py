@@ -1,8 +1,15 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Optional, Literal
 from datetime import datetime
 from enum import Enum
 
+# Largest supported board (19x19, a go board) and so the largest cell index
+MAX_BOARD_SIZE = 19
+MAX_POSITION = MAX_BOARD_SIZE * MAX_BOARD_SIZE - 1
+
+# Most moves accepted by one /moves/batch request
+MAX_BATCH_MOVES = 1000
+
 class GameMode(str, Enum):
     VS_HUMAN = "vs_human"
     VS_AI = "vs_ai"
@@ -13,6 +20,11 @@ class GameStatus(str, Enum):
     FINISHED = "finished"    # Game completed
     ABANDONED = "abandoned"  # Game abandoned
 
+class AIDifficulty(str, Enum):
+    RANDOM = "random"        # Random empty square
+    GREEDY = "greedy"        # Win if possible, otherwise block
+    PERFECT = "perfect"      # Full minimax, never loses
+
 class PlayerSymbol(str, Enum):
     X = "X"
     O = "O"
@@ -31,36 +43,106 @@ class Player(BaseModel):
 class GameState(BaseModel):
     game_id: str
     board: List[Optional[str]] = Field(default_factory=lambda: [None] * 9)
+    board_size: int = 3
+    win_length: int = 3
     players: List[Player] = []
     current_turn: Optional[str] = None  # user_id of current player
     status: GameStatus = GameStatus.WAITING
     winner: Optional[str] = None  # user_id of winner, or "draw"
     game_mode: GameMode = GameMode.VS_HUMAN
+    ai_difficulty: AIDifficulty = AIDifficulty.RANDOM
     created_at: datetime
     updated_at: datetime
     moves_count: int = 0
+    version: int = 0  # Bumped on every stored update (optimistic concurrency)
 
 class CreateGameRequest(BaseModel):
     created_by: str
     created_by_username: str
     game_mode: GameMode = GameMode.VS_HUMAN
+    ai_difficulty: AIDifficulty = AIDifficulty.RANDOM
+    board_size: int = Field(default=3, ge=3, le=MAX_BOARD_SIZE, description="Board is board_size x board_size")
+    win_length: Optional[int] = Field(default=None, ge=3, le=MAX_BOARD_SIZE, description="Stones in a row to win (default: min(board_size, 5))")
+
+    @model_validator(mode="after")
+    def check_win_length(self) -> "CreateGameRequest":
+        if self.win_length is not None and self.win_length > self.board_size:
+            raise ValueError("win_length cannot exceed board_size")
+        return self
 
 class JoinGameRequest(BaseModel):
     player_id: str
     player_username: str
 
+class MatchmakingRequest(BaseModel):
+    player_id: str
+    player_username: str
+    board_size: int = Field(default=3, ge=3, le=MAX_BOARD_SIZE, description="Board is board_size x board_size")
+    win_length: Optional[int] = Field(default=None, ge=3, le=MAX_BOARD_SIZE, description="Stones in a row to win (default: min(board_size, 5))")
+
+    @model_validator(mode="after")
+    def check_win_length(self) -> "MatchmakingRequest":
+        if self.win_length is not None and self.win_length > self.board_size:
+            raise ValueError("win_length cannot exceed board_size")
+        return self
+
 class MoveRequest(BaseModel):
     player_id: str
-    position: int = Field(ge=0, le=8, description="Board position (0-8)")
+    position: int = Field(ge=0, le=MAX_POSITION, description="Board position (0 to board_size^2 - 1)")
 
 class GameResponse(BaseModel):
     success: bool
     message: str
     game_state: Optional[GameState] = None
 
+class GameSummary(BaseModel):
+    """What a game list shows, without the board"""
+    game_id: str
+    status: GameStatus
+    game_mode: GameMode
+    board_size: int
+    win_length: int
+    players: List[Player]
+    moves_count: int
+    winner: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
 class GameListResponse(BaseModel):
     success: bool
-    games: List[GameState]
+    games: List[GameState] = []
+    summaries: Optional[List[GameSummary]] = None  # In place of games when summaries were asked for
+    next_cursor: Optional[str] = None  # Pass back as `cursor` for the next page; None on the last one
+
+class MatchmakingResponse(BaseModel):
+    success: bool
+    matched: bool  # False while the player's own game waits for an opponent
+    message: str
+    game_state: GameState
+
+class GameReplayResponse(BaseModel):
+    success: bool
+    game_id: str
+    events: List[dict]  # "create" (full state) first, then one delta per version
+    game_state: Optional[GameState] = None  # State at the requested version
+
+class PlayerStats(BaseModel):
+    user_id: str
+    username: str
+    wins: int = 0
+    losses: int = 0
+    draws: int = 0
+    games_played: int = 0
+    points: int = 0  # Leaderboard points from ranked (vs_human) games
+    rank: Optional[int] = None  # 1 = top of the leaderboard, None if never ranked
+
+class PlayerStatsResponse(BaseModel):
+    success: bool
+    stats: PlayerStats
+
+class LeaderboardResponse(BaseModel):
+    success: bool
+    players: List[PlayerStats]
 
 class MoveResponse(BaseModel):
     success: bool
@@ -68,4 +150,29 @@ class MoveResponse(BaseModel):
     game_state: GameState
     is_game_over: bool = False
     winner: Optional[str] = None
-    ai_move: Optional[dict] = None  # If AI made a move after player
\ No newline at end of file
+    ai_move: Optional[dict] = None  # If AI made a move after player
+
+class BatchMoveItem(BaseModel):
+    game_id: str
+    player_id: str
+    position: int = Field(ge=0, le=MAX_POSITION, description="Board position (0 to board_size^2 - 1)")
+
+class BatchMoveRequest(BaseModel):
+    moves: List[BatchMoveItem] = Field(min_length=1, max_length=MAX_BATCH_MOVES)
+
+class BatchMoveResult(BaseModel):
+    game_id: str
+    position: int
+    success: bool
+    status_code: int = 200  # HTTP status the single-move endpoint would have used
+    message: str
+    ai_move: Optional[dict] = None
+    is_game_over: bool = False
+    winner: Optional[str] = None
+    version: Optional[int] = None  # Game version after the batch was stored
+
+class BatchMoveResponse(BaseModel):
+    success: bool
+    applied: int
+    failed: int
+    results: List[BatchMoveResult]
\ No newline at end of file
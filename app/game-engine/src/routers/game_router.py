@@ -1,204 +1,789 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, Header, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import inspect
+import json
+import os
 import uuid
 from datetime import datetime
 
 from models.game_models import (
     CreateGameRequest, JoinGameRequest, MoveRequest,
-    GameResponse, GameListResponse, MoveResponse, GameState
+    GameResponse, GameListResponse, MoveResponse, GameState, GameStatus, GameMode,
+    BatchMoveRequest, BatchMoveResponse, BatchMoveResult,
+    MatchmakingRequest, MatchmakingResponse, GameReplayResponse,
+    PlayerStats, PlayerStatsResponse, LeaderboardResponse, MAX_BOARD_SIZE
 )
+from models.game_codec import encode_game
 from services.game_logic import GameEngine
-from config.redis_config import store_game, get_game, get_all_games
+from services.ai_executor import ai_executor
+from services.game_cache import game_cache, load_game, remember_game, forget_game
+from services.game_events import game_events, build_snapshot, build_delta, apply_delta, rebuild_game
+from services.game_archive import game_archive, game_lifecycle
+from services.player_stats import game_results
+from services.game_index import ALL_INDEX_KEYS, index_entry, list_games as list_indexed_games, summarize
+from services.idempotency import IdempotentRequest, IdempotencyKeyReused
+from services.game_responses import game_response, response_cache
+from config.logging_config import get_logger
+from config.metrics import game_created, game_finished
+from config.admission import load_monitor
+from config.redis_config import (
+    store_game, store_game_if_version, store_games_if_version, get_idempotency_record,
+    get_games, get_game_events, delete_game, pool_stats, GameVersionConflict, DuplicateRequest,
+    enqueue_waiting_game, claim_waiting_game, dequeue_waiting_game, matchmaking_queue,
+    matchmaking_queue_length, get_player_stats, get_leaderboard
+)
 
 router = APIRouter()
 
+logger = get_logger(__name__)
+
+# Attempts for a read-modify-write before answering 409 Conflict
+GAME_UPDATE_RETRIES = int(os.getenv("GAME_UPDATE_RETRIES", "3"))
+
+# Seconds between SSE keep-alive comments on idle streams
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
+# Most players one /leaderboard request returns
+LEADERBOARD_MAX_LIMIT = 100
+
+# Most games one /list page holds
+LIST_MAX_LIMIT = 500
+
+# Longest a matchmaking long-poll is held open
+MATCHMAKING_WAIT_SECONDS = float(os.getenv("MATCHMAKING_WAIT_SECONDS", "25"))
+
+# Claimed games that turn out to be gone or taken before a new game is opened instead
+MATCHMAKING_CLAIM_ATTEMPTS = int(os.getenv("MATCHMAKING_CLAIM_ATTEMPTS", "5"))
+
+def _serialize_game(game_state: GameState) -> bytes:
+    """GameState -> stored blob"""
+    return encode_game(game_state)
+
+class _Replay(Exception):
+    """Raised to answer a retried request with the response it got the first time"""
+    
+    def __init__(self, body: dict):
+        super().__init__("Idempotent replay")
+        self.response = JSONResponse(content=body, headers={"Idempotent-Replayed": "true"})
+
+def _idempotent_request(key: Optional[str], scope: str, request: BaseModel) -> Optional[IdempotentRequest]:
+    try:
+        return IdempotentRequest.from_header(key, scope, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _replay(idempotency: IdempotentRequest, record: bytes) -> _Replay:
+    try:
+        return _Replay(idempotency.stored_response(record))
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+async def _check_replay(idempotency: Optional[IdempotentRequest], game_id: str):
+    """Raise _Replay if the request was already applied to the game (one HGET)"""
+    if idempotency is None:
+        return
+    record = await get_idempotency_record(game_id, idempotency.field)
+    if record is not None:
+        raise _replay(idempotency, record)
+
+async def _update_game(game_id: str, event: str, apply: Callable[[GameState], Any],
+                       respond: Optional[Callable[[GameState, Any], BaseModel]] = None,
+                       idempotency: Optional[IdempotentRequest] = None) -> Tuple[GameState, Any]:
+    """Read a game, apply `apply` to it and store it with compare-and-set
+    
+    `apply` mutates the state in place and may raise HTTPException to reject
+    the update; it may be a coroutine function (the AI reply is awaited). On
+    a version conflict (another replica stored the game first) the whole
+    cycle is retried on fresh state, then 409 is returned. A stored update is
+    published to the game's channel as an `event` delta. The write keeps the
+    game's listing index current, and the one that finishes a game also
+    records the players' results.
+    
+    `respond`, when given, turns the new state and apply's result into the
+    response, which is returned in place of the result. With `idempotency`
+    that response is stored along with the update, and a request that was
+    already applied raises _Replay instead of running `apply` again.
+    """
+    for attempt in range(GAME_UPDATE_RETRIES):
+        await _check_replay(idempotency, game_id)
+        game_state = await load_game(game_id, for_update=True)
+        if not game_state:
+            raise HTTPException(status_code=404, detail="Game not found")
+        
+        expected_version = game_state.version
+        previous_board = list(game_state.board)
+        previous_status = game_state.status
+        try:
+            result = apply(game_state)
+            if inspect.isawaitable(result):
+                result = await result
+        except HTTPException:
+            # The first attempt may have landed between the check and the read
+            await _check_replay(idempotency, game_id)
+            raise
+        game_state.version = expected_version + 1
+        game_data = _serialize_game(game_state)
+        results = game_results(game_state) if previous_status != GameStatus.FINISHED else None
+        if respond is not None:
+            result = respond(game_state, result)
+        
+        # The same delta is published and, in event-sourced mode, appended to the
+        # game's stream; moves skip the snapshot unless one is due or the game ended
+        delta = build_delta(game_state, event, previous_board)
+        snapshot = event != "move" or game_state.status != GameStatus.ACTIVE
+        try:
+            await store_game_if_version(game_id, game_data, expected_version, delta, snapshot, results,
+                                        idempotency.entry(result) if idempotency else None,
+                                        index_entry(game_state, previous_status))
+            remember_game(game_state, game_data)
+            await game_events.publish(game_id, delta)
+            return game_state, result
+        except GameVersionConflict as e:
+            forget_game(game_id)
+            logger.info("Version conflict on %s (attempt %d): %s", game_id, attempt + 1, e,
+                        extra={"event": "version_conflict", "game_id": game_id})
+        except DuplicateRequest as e:
+            forget_game(game_id)
+            raise _replay(idempotency, e.record)
+    
+    raise HTTPException(status_code=409, detail="Game was updated concurrently, please retry")
+
+async def _store_new_game(game_state: GameState, idempotency: Optional[IdempotentRequest] = None,
+                          response: Optional[BaseModel] = None):
+    """Store a freshly created game and count it
+    
+    With `idempotency`, `response` is stored with the game and a request
+    that already created it raises _Replay.
+    """
+    game_data = _serialize_game(game_state)
+    try:
+        success = await store_game(game_state.game_id, game_data, game_state.version,
+                                   build_snapshot(game_state, "create"),
+                                   idempotency.entry(response) if idempotency else None,
+                                   index_entry(game_state))
+    except DuplicateRequest as e:
+        raise _replay(idempotency, e.record)
+    
+    if not success:
+        raise HTTPException(status_code=500, detail="Failed to store game")
+    remember_game(game_state, game_data)
+    game_created(game_state.game_mode.value)
+
+def _join_as(player_id: str, player_username: str) -> Callable[[GameState], str]:
+    """_update_game step adding a second player"""
+    def apply(game_state: GameState) -> str:
+        success, message = GameEngine.join_game(
+            game_state=game_state,
+            player_id=player_id,
+            player_username=player_username
+        )
+        if not success:
+            raise HTTPException(status_code=400, detail=message)
+        return message
+    return apply
+
 @router.post("/create", response_model=GameResponse)
-async def create_game(request: CreateGameRequest):
-    """Create a new game"""
+async def create_game(request: CreateGameRequest, idempotency_key: Optional[str] = Header(default=None)):
+    """Create a new game
+    
+    With an Idempotency-Key the game id is derived from the key, so a retry
+    finds the first attempt's record and gets the same game back.
+    """
+    idempotency = _idempotent_request(idempotency_key, f"create:{request.created_by}", request)
     try:
-        game_id = str(uuid.uuid4())
+        game_id = idempotency.game_id() if idempotency else str(uuid.uuid4())
+        await _check_replay(idempotency, game_id)
         
         # Create game using game engine
         game_state = GameEngine.create_game(
             game_id=game_id,
             creator_id=request.created_by,
             creator_username=request.created_by_username,
-            game_mode=request.game_mode
+            game_mode=request.game_mode,
+            ai_difficulty=request.ai_difficulty,
+            board_size=request.board_size,
+            win_length=request.win_length
         )
-        
-        # Store in Redis
-        game_dict = game_state.model_dump(mode='json')
-        # Convert datetime to string for JSON serialization
-        game_dict['created_at'] = game_state.created_at.isoformat()
-        game_dict['updated_at'] = game_state.updated_at.isoformat()
-        
-        success = await store_game(game_id, game_dict)
-        
-        if not success:
-            raise HTTPException(status_code=500, detail="Failed to store game")
-        
-        print(f"Game created: {game_id} by {request.created_by_username} ({request.game_mode})")
-        
-        return GameResponse(
+        response = GameResponse(
             success=True,
             message=f"Game created successfully in {request.game_mode.value} mode",
             game_state=game_state
         )
         
+        # Store in Redis
+        await _store_new_game(game_state, idempotency, response)
+        
+        logger.info("Game created: %s by %s (%s)", game_id, request.created_by_username, request.game_mode.value,
+                    extra={"event": "create", "game_id": game_id})
+        
+        return response
+        
+    except _Replay as replay:
+        return replay.response
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Create game error: {e}")
+        logger.exception("Create game error", extra={"event": "create"})
         raise HTTPException(status_code=500, detail=f"Failed to create game: {str(e)}")
 
 @router.post("/join/{game_id}", response_model=GameResponse)
-async def join_game(game_id: str, request: JoinGameRequest):
+async def join_game(game_id: str, request: JoinGameRequest, idempotency_key: Optional[str] = Header(default=None)):
     """Join an existing game"""
+    idempotency = _idempotent_request(idempotency_key, f"join:{request.player_id}", request)
     try:
-        # Get game from Redis
-        game_data = await get_game(game_id)
-        if not game_data:
-            raise HTTPException(status_code=404, detail="Game not found")
+        def respond(game_state: GameState, message: str) -> GameResponse:
+            return GameResponse(success=True, message=message, game_state=game_state)
         
-        # Convert back to GameState object
-        game_data['created_at'] = datetime.fromisoformat(game_data['created_at'])
-        game_data['updated_at'] = datetime.fromisoformat(game_data['updated_at'])
-        game_state = GameState(**game_data)
-        
-        # Join the game
-        success, message = GameEngine.join_game(
-            game_state=game_state,
-            player_id=request.player_id,
-            player_username=request.player_username
+        game_state, response = await _update_game(
+            game_id, "join", _join_as(request.player_id, request.player_username), respond, idempotency
+        )
+        # Joined by id: its matchmaking entry (if any) must not be handed out again
+        await dequeue_waiting_game(
+            matchmaking_queue(game_state.game_mode.value, game_state.board_size, game_state.win_length), game_id
         )
         
-        if not success:
-            raise HTTPException(status_code=400, detail=message)
+        logger.info("%s joined game: %s", request.player_username, game_id,
+                    extra={"event": "join", "game_id": game_id})
         
-        # Update in Redis
-        game_dict = game_state.model_dump(mode='json')
-        game_dict['created_at'] = game_state.created_at.isoformat()
-        game_dict['updated_at'] = game_state.updated_at.isoformat()
+        return response
         
-        await store_game(game_id, game_dict)
+    except _Replay as replay:
+        return replay.response
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Join game error", extra={"event": "join", "game_id": game_id})
+        raise HTTPException(status_code=500, detail=f"Failed to join game: {str(e)}")
+
+@router.post("/matchmaking", response_model=MatchmakingResponse)
+async def find_match(request: MatchmakingRequest):
+    """Join the longest-waiting game for this board, or open one and wait for an opponent
+    
+    Waiting games sit in a per-board Redis sorted set; a claim pops the oldest
+    one atomically, so two players never get the same game. A player without
+    a match gets their own WAITING game back and learns about the opponent
+    through /matchmaking/wait, the SSE stream or the WebSocket. A player
+    waits in one game per board: asking again returns the same game.
+    """
+    win_length = request.win_length or GameEngine.default_win_length(request.board_size)
+    queue = matchmaking_queue(GameMode.VS_HUMAN.value, request.board_size, win_length)
+    try:
+        for _ in range(MATCHMAKING_CLAIM_ATTEMPTS):
+            game_id, own = await claim_waiting_game(queue, request.player_id)
+            if game_id is None:
+                break
+            if own:
+                game_state = await load_game(game_id)
+                if game_state and game_state.status == GameStatus.WAITING:
+                    return MatchmakingResponse(
+                        success=True, matched=False, message="Waiting for an opponent", game_state=game_state
+                    )
+                # Expired or no longer waiting: drop the entry and look again
+                await dequeue_waiting_game(queue, game_id)
+                continue
+            try:
+                game_state, message = await _update_game(
+                    game_id, "join", _join_as(request.player_id, request.player_username)
+                )
+            except HTTPException as e:
+                # Expired, joined by id or cancelled since it was queued: try the next one
+                if e.status_code in (400, 404, 409):
+                    continue
+                raise
+            
+            logger.info("%s matched into game: %s", request.player_username, game_id,
+                        extra={"event": "match", "game_id": game_id})
+            return MatchmakingResponse(
+                success=True, matched=True, message=message, game_state=game_state
+            )
         
-        print(f"{request.player_username} joined game: {game_id}")
+        game_state = GameEngine.create_game(
+            game_id=str(uuid.uuid4()),
+            creator_id=request.player_id,
+            creator_username=request.player_username,
+            game_mode=GameMode.VS_HUMAN,
+            board_size=request.board_size,
+            win_length=win_length
+        )
+        await _store_new_game(game_state)
+        waiting, queued_id = await enqueue_waiting_game(queue, game_state.game_id, request.player_id)
+        if queued_id != game_state.game_id:
+            # A concurrent request by the same player queued a game first: keep that one
+            await delete_game(game_state.game_id, index_keys=ALL_INDEX_KEYS)
+            forget_game(game_state.game_id)
+            game_finished("abandoned")
+            queued = await load_game(queued_id)
+            if queued:
+                return MatchmakingResponse(
+                    success=True, matched=False, message="Waiting for an opponent", game_state=queued
+                )
+            raise HTTPException(status_code=409, detail="Matchmaking changed meanwhile, please retry")
         
-        return GameResponse(
-            success=True,
-            message=message,
-            game_state=game_state
+        logger.info("%s is waiting for a match in %s", request.player_username, game_state.game_id,
+                    extra={"event": "match_wait", "game_id": game_state.game_id, "queue_length": waiting})
+        return MatchmakingResponse(
+            success=True, matched=False, message="Waiting for an opponent", game_state=game_state
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Join game error: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to join game: {str(e)}")
+        logger.exception("Matchmaking error", extra={"event": "match"})
+        raise HTTPException(status_code=500, detail=f"Failed to find a match: {str(e)}")
 
-@router.post("/move/{game_id}", response_model=MoveResponse)
-async def make_move(game_id: str, request: MoveRequest):
-    """Make a move in the game"""
-    try:
-        # Get game from Redis
-        game_data = await get_game(game_id)
-        if not game_data:
+@router.get("/matchmaking/wait/{game_id}", response_model=MatchmakingResponse)
+async def wait_for_match(game_id: str,
+                         timeout: float = Query(default=MATCHMAKING_WAIT_SECONDS, ge=0)):
+    """Long-poll: return as soon as someone joins the game, or its state after `timeout`"""
+    timeout = min(timeout, MATCHMAKING_WAIT_SECONDS)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    
+    # Subscribe before reading the state so a join cannot slip in between
+    async with game_events.subscribe(game_id) as queue:
+        game_state = await load_game(game_id)
+        if not game_state:
             raise HTTPException(status_code=404, detail="Game not found")
         
-        # Convert back to GameState object
-        game_data['created_at'] = datetime.fromisoformat(game_data['created_at'])
-        game_data['updated_at'] = datetime.fromisoformat(game_data['updated_at'])
-        game_state = GameState(**game_data)
+        while game_state.status == GameStatus.WAITING:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            game_state = await load_game(game_id)
+            if not game_state:
+                raise HTTPException(status_code=404, detail="Game not found")
+    
+    matched = game_state.status != GameStatus.WAITING
+    return MatchmakingResponse(
+        success=True,
+        matched=matched,
+        message="Opponent found" if matched else "Still waiting for an opponent",
+        game_state=game_state
+    )
+
+@router.delete("/matchmaking/{game_id}", response_model=GameResponse)
+async def cancel_match(game_id: str, player_id: str = Query(...)):
+    """Stop waiting: take the creator's game out of its queue and abandon it"""
+    try:
+        def apply(game_state: GameState) -> None:
+            if game_state.status != GameStatus.WAITING:
+                raise HTTPException(status_code=400, detail="Game is no longer waiting")
+            if game_state.players[0].user_id != player_id:
+                raise HTTPException(status_code=403, detail="Only the creator can cancel")
+            game_state.status = GameStatus.ABANDONED
+            game_state.updated_at = datetime.utcnow()
         
-        # Make the move
-        success, message, ai_move_data = GameEngine.make_move(
-            game_state=game_state,
-            player_id=request.player_id,
-            position=request.position
+        game_state, _ = await _update_game(game_id, "cancel", apply)
+        await dequeue_waiting_game(
+            matchmaking_queue(game_state.game_mode.value, game_state.board_size, game_state.win_length), game_id
         )
+        game_finished("abandoned")
         
-        if not success:
-            raise HTTPException(status_code=400, detail=message)
+        logger.info("Matchmaking cancelled: %s", game_id, extra={"event": "match_cancel", "game_id": game_id})
+        return GameResponse(success=True, message="Matchmaking cancelled", game_state=game_state)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Cancel matchmaking error", extra={"event": "match_cancel", "game_id": game_id})
+        raise HTTPException(status_code=500, detail=f"Failed to cancel matchmaking: {str(e)}")
+
+@router.get("/matchmaking/stats")
+async def get_matchmaking_stats(board_size: int = Query(default=3, ge=3, le=MAX_BOARD_SIZE),
+                                win_length: Optional[int] = Query(default=None, ge=3, le=MAX_BOARD_SIZE)):
+    """Games waiting for an opponent on one board"""
+    if win_length is not None and win_length > board_size:
+        raise HTTPException(status_code=422, detail="win_length cannot exceed board_size")
+    win_length = win_length or GameEngine.default_win_length(board_size)
+    queue = matchmaking_queue(GameMode.VS_HUMAN.value, board_size, win_length)
+    return {"success": True, "queue": queue, "waiting": await matchmaking_queue_length(queue)}
+
+@router.post("/move/{game_id}", response_model=MoveResponse)
+async def make_move(game_id: str, request: MoveRequest, idempotency_key: Optional[str] = Header(default=None)):
+    """Make a move in the game
+    
+    A retry carrying the same Idempotency-Key gets the original response
+    back (Idempotent-Replayed: true) instead of an "Invalid move" error.
+    """
+    idempotency = _idempotent_request(idempotency_key, f"move:{request.player_id}", request)
+    try:
+        async def apply(game_state: GameState) -> Tuple[str, Any]:
+            success, message, ai_move_data = GameEngine.make_move(
+                game_state=game_state,
+                player_id=request.player_id,
+                position=request.position,
+                ai_reply=False
+            )
+            if not success:
+                raise HTTPException(status_code=400, detail=message)
+            # The AI reply is computed off the event loop
+            ai_player = GameEngine.ai_opponent(game_state)
+            if ai_player is not None:
+                ai_position = await ai_executor.reply(game_state, ai_player)
+                message, ai_move_data = GameEngine.apply_ai_move(game_state, ai_player, ai_position)
+            return message, ai_move_data
         
-        # Update in Redis
-        game_dict = game_state.model_dump(mode='json')
-        game_dict['created_at'] = game_state.created_at.isoformat()
-        game_dict['updated_at'] = game_state.updated_at.isoformat()
+        def respond(game_state: GameState, result: Tuple[str, Any]) -> MoveResponse:
+            message, ai_move_data = result
+            is_game_over = game_state.status.value == "finished"
+            return MoveResponse(
+                success=True,
+                message=message,
+                game_state=game_state,
+                is_game_over=is_game_over,
+                winner=game_state.winner if is_game_over else None,
+                ai_move=ai_move_data
+            )
         
-        await store_game(game_id, game_dict)
+        _, response = await _update_game(game_id, "move", apply, respond, idempotency)
         
-        is_game_over = game_state.status.value == "finished"
-        winner = game_state.winner if is_game_over else None
+        if response.is_game_over:
+            game_finished(response.winner)
         
-        print(f"Move made in {game_id}: position {request.position}")
-        if ai_move_data:
-            print(f"AI responded with position {ai_move_data['position']}")
+        logger.info("Move made in %s: position %d", game_id, request.position,
+                    extra={"event": "move", "game_id": game_id,
+                           "ai_position": response.ai_move["position"] if response.ai_move else None})
         
-        return MoveResponse(
-            success=True,
-            message=message,
-            game_state=game_state,
-            is_game_over=is_game_over,
-            winner=winner,
-            ai_move=ai_move_data
-        )
+        return response
         
+    except _Replay as replay:
+        return replay.response
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Make move error: {e}")
+        logger.exception("Make move error", extra={"event": "move", "game_id": game_id})
         raise HTTPException(status_code=500, detail=f"Failed to make move: {str(e)}")
 
-@router.get("/state/{game_id}", response_model=GameResponse)
-async def get_game_state(game_id: str):
-    """Get current game state"""
+@router.post("/moves/batch", response_model=BatchMoveResponse)
+async def make_moves_batch(request: BatchMoveRequest):
+    """Apply many moves with one pipelined read and one pipelined write
+    
+    Moves for the same game are applied in request order. Each game is stored
+    once with compare-and-set; if another writer got there first, all of that
+    game's moves in the batch report 409 and nothing is written for it.
+    """
     try:
-        # Get game from Redis
-        game_data = await get_game(game_id)
-        if not game_data:
-            raise HTTPException(status_code=404, detail="Game not found")
+        game_ids = list(dict.fromkeys(move.game_id for move in request.moves))
+        records = await get_games(game_ids)
+        
+        states: Dict[str, GameState] = {}
+        expected_versions: Dict[str, int] = {}
+        previous_boards: Dict[str, List] = {}
+        previous_statuses: Dict[str, GameStatus] = {}
+        for game_id, (blob, deltas) in records.items():
+            game_state = rebuild_game(blob, deltas)
+            states[game_id] = game_state
+            expected_versions[game_id] = game_state.version
+            previous_boards[game_id] = list(game_state.board)
+            previous_statuses[game_id] = game_state.status
         
-        # Convert back to GameState object
-        game_data['created_at'] = datetime.fromisoformat(game_data['created_at'])
-        game_data['updated_at'] = datetime.fromisoformat(game_data['updated_at'])
-        game_state = GameState(**game_data)
+        results: List[BatchMoveResult] = []
+        changed: List[str] = []
+        for move in request.moves:
+            game_state = states.get(move.game_id)
+            if game_state is None:
+                results.append(BatchMoveResult(
+                    game_id=move.game_id, position=move.position, success=False,
+                    status_code=404, message="Game not found"
+                ))
+                continue
+            
+            success, message, ai_move_data = GameEngine.make_move(
+                game_state=game_state,
+                player_id=move.player_id,
+                position=move.position,
+                ai_reply=False
+            )
+            if not success:
+                results.append(BatchMoveResult(
+                    game_id=move.game_id, position=move.position, success=False,
+                    status_code=400, message=message
+                ))
+                continue
+            ai_player = GameEngine.ai_opponent(game_state)
+            if ai_player is not None:
+                ai_position = await ai_executor.reply(game_state, ai_player)
+                message, ai_move_data = GameEngine.apply_ai_move(game_state, ai_player, ai_position)
+            
+            if move.game_id not in changed:
+                changed.append(move.game_id)
+            is_game_over = game_state.status.value == "finished"
+            results.append(BatchMoveResult(
+                game_id=move.game_id, position=move.position, success=True,
+                message=message, ai_move=ai_move_data, is_game_over=is_game_over,
+                winner=game_state.winner if is_game_over else None
+            ))
+        
+        # One CAS per changed game, all in pipelined round trips
+        blobs_to_store = {}
+        deltas: Dict[str, Tuple[str, bool]] = {}
+        finished = {}
+        indexes = {}
+        for game_id in changed:
+            game_state = states[game_id]
+            game_state.version = expected_versions[game_id] + 1
+            blobs_to_store[game_id] = _serialize_game(game_state)
+            deltas[game_id] = (build_delta(game_state, "move", previous_boards[game_id]),
+                               game_state.status != GameStatus.ACTIVE)
+            # Moves only apply to ACTIVE games, so every FINISHED game here ended in this batch
+            if game_state.status == GameStatus.FINISHED:
+                finished[game_id] = game_results(game_state)
+            indexes[game_id] = index_entry(game_state, previous_statuses[game_id])
+        stored = await store_games_if_version(
+            ((game_id, blob, expected_versions[game_id]) for game_id, blob in blobs_to_store.items()),
+            events=deltas, results=finished, indexes=indexes
+        )
+        
+        updates = []
+        for game_id, version in stored.items():
+            if version is None:
+                forget_game(game_id)
+                continue
+            remember_game(states[game_id], blobs_to_store[game_id])
+            if states[game_id].status.value == "finished":
+                game_finished(states[game_id].winner)
+            updates.append((game_id, deltas[game_id][0]))
+        await game_events.publish_many(updates)
+        
+        for result in results:
+            if not result.success or result.game_id not in stored:
+                continue
+            version = stored[result.game_id]
+            if version is None:
+                result.success = False
+                result.status_code = 409
+                result.message = "Game was updated concurrently, please retry"
+                result.ai_move = None
+                result.is_game_over = False
+                result.winner = None
+            else:
+                result.version = version
         
-        return GameResponse(
+        applied = sum(1 for result in results if result.success)
+        logger.info("Batch applied %d/%d moves across %d games", applied, len(results), len(changed),
+                    extra={"event": "batch"})
+        
+        return BatchMoveResponse(
             success=True,
-            message="Game state retrieved",
-            game_state=game_state
+            applied=applied,
+            failed=len(results) - applied,
+            results=results
         )
         
+    except Exception as e:
+        logger.exception("Batch move error", extra={"event": "batch"})
+        raise HTTPException(status_code=500, detail=f"Failed to apply moves: {str(e)}")
+
+@router.get("/state/{game_id}", response_model=GameResponse,
+            responses={304: {"description": "Game unchanged since the ETag in If-None-Match"}})
+async def get_game_state(game_id: str, accept: Optional[str] = Header(default=None),
+                         if_none_match: Optional[str] = Header(default=None)):
+    """Get current game state
+    
+    Carries an ETag that changes with every update; polls sending it back in
+    If-None-Match get 304 while the game is unchanged. Accept:
+    application/msgpack gets MessagePack instead of JSON (when installed).
+    """
+    try:
+        # Get game through the in-process cache (validated against Redis)
+        game_state = await load_game(game_id)
+        if not game_state:
+            raise HTTPException(status_code=404, detail="Game not found")
+        
+        return game_response(game_state, "Game state retrieved", accept, if_none_match)
+        
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Get game state error: {e}")
+        logger.exception("Get game state error", extra={"game_id": game_id})
         raise HTTPException(status_code=500, detail=f"Failed to get game state: {str(e)}")
 
-@router.get("/list", response_model=GameListResponse)
-async def list_games():
-    """Get list of all active games"""
+@router.get("/replay/{game_id}", response_model=GameReplayResponse)
+async def replay_game(game_id: str, version: Optional[int] = Query(default=None, ge=0)):
+    """Move history from the game's event stream, and its state at `version` if given
+    
+    Only games stored with GAME_STORAGE_MODE=events have a stream.
+    """
     try:
-        games_data = await get_all_games()
-        games = []
+        events = [json.loads(event) for event in await get_game_events(game_id)]
+        if not events or events[0].get("event") != "create":
+            raise HTTPException(status_code=404, detail="No event log for this game")
         
-        for game_data in games_data:
-            try:
-                # Convert datetime strings back to datetime objects
-                game_data['created_at'] = datetime.fromisoformat(game_data['created_at'])
-                game_data['updated_at'] = datetime.fromisoformat(game_data['updated_at'])
-                game_state = GameState(**game_data)
-                games.append(game_state)
-            except Exception as e:
-                print(f"⚠️ Skipping invalid game data: {e}")
-                continue
+        game_state = None
+        if version is not None:
+            events = [event for event in events if event["v"] <= version]
+            game_state = GameState.model_validate(events[0]["game_state"])
+            for event in events[1:]:
+                apply_delta(game_state, event)
         
-        # Sort by creation time (newest first)
-        games.sort(key=lambda x: x.created_at, reverse=True)
+        return GameReplayResponse(success=True, game_id=game_id, events=events, game_state=game_state)
         
-        return GameListResponse(
-            success=True,
-            games=games
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Replay error", extra={"game_id": game_id})
+        raise HTTPException(status_code=500, detail=f"Failed to replay game: {str(e)}")
+
+@router.get("/list", response_model=GameListResponse)
+async def list_games(status: Optional[GameStatus] = None, game_mode: Optional[GameMode] = None,
+                     limit: int = Query(default=50, ge=1, le=LIST_MAX_LIMIT), cursor: Optional[str] = None,
+                     summary: bool = False):
+    """A page of live games, newest first, optionally of one status and mode
+    
+    Served from the per-status and per-mode indexes: only the page's games
+    are read. Pass next_cursor back as `cursor` for the next page; with
+    summary=true the games come back as summaries without their boards.
+    """
+    try:
+        games, next_cursor = await list_indexed_games(status, game_mode, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("List games error")
+        raise HTTPException(status_code=500, detail=f"Failed to list games: {str(e)}")
+    
+    if summary:
+        return GameListResponse(success=True, summaries=[summarize(game) for game in games],
+                                next_cursor=next_cursor)
+    return GameListResponse(success=True, games=games, next_cursor=next_cursor)
+
+@router.get("/history", response_model=GameListResponse)
+async def get_game_history(player_id: Optional[str] = None, status: Optional[GameStatus] = None,
+                           since: Optional[datetime] = None, until: Optional[datetime] = None,
+                           limit: int = Query(default=50, ge=1, le=LIST_MAX_LIMIT)):
+    """Archived (finished or abandoned) games, oldest first, streamed from the archive"""
+    try:
+        games = await asyncio.to_thread(
+            game_archive.history, player_id, status.value if status else None, since, until, limit
         )
-        
+        return GameListResponse(success=True, games=games)
+    except Exception as e:
+        logger.exception("Game history error")
+        raise HTTPException(status_code=500, detail=f"Failed to read game history: {str(e)}")
+
+@router.get("/archive/stats")
+async def get_archive_stats():
+    """Games abandoned and archived by this replica's lifecycle worker"""
+    return {"success": True, "lifecycle": game_lifecycle.stats()}
+
+@router.get("/archive/{game_id}", response_model=GameResponse)
+async def get_archived_game(game_id: str, accept: Optional[str] = Header(default=None),
+                            if_none_match: Optional[str] = Header(default=None)):
+    """A game that has been moved out of Redis into the archive"""
+    game_state = await asyncio.to_thread(game_archive.get_game, game_id)
+    if not game_state:
+        raise HTTPException(status_code=404, detail="Game not found in archive")
+    return game_response(game_state, "Archived game retrieved", accept, if_none_match)
+
+@router.get("/stats/{user_id}", response_model=PlayerStatsResponse)
+async def get_user_stats(user_id: str):
+    """A user's wins, losses and draws plus leaderboard points and rank"""
+    try:
+        stats = await get_player_stats(user_id)
+    except Exception as e:
+        logger.exception("Player stats error")
+        raise HTTPException(status_code=500, detail=f"Failed to get player stats: {str(e)}")
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No finished games for this player")
+    return PlayerStatsResponse(success=True, stats=PlayerStats(**stats))
+
+@router.get("/leaderboard", response_model=LeaderboardResponse)
+async def get_leaderboard_page(limit: int = Query(default=10, ge=1, le=LEADERBOARD_MAX_LIMIT)):
+    """Top players by points from ranked (vs_human) games"""
+    try:
+        players = await get_leaderboard(limit)
+        return LeaderboardResponse(success=True, players=[PlayerStats(**player) for player in players])
     except Exception as e:
-        print(f"List games error: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to list games: {str(e)}")
\ No newline at end of file
+        logger.exception("Leaderboard error")
+        raise HTTPException(status_code=500, detail=f"Failed to get leaderboard: {str(e)}")
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss/eviction counters of this replica's game and response caches"""
+    return {"success": True, "cache": game_cache.stats(), "responses": response_cache.stats()}
+
+@router.get("/redis/stats")
+async def get_redis_stats():
+    """Connection pool utilization of this replica"""
+    return {"success": True, "redis": pool_stats()}
+
+@router.get("/admission/stats")
+async def get_admission_stats():
+    """Load signals and refused requests of this worker"""
+    return {"success": True, "admission": load_monitor.stats()}
+
+@router.get("/ai/stats")
+async def get_ai_stats():
+    """AI searches of this worker: queue depth, compute time and fallback moves"""
+    return {"success": True, "ai": ai_executor.stats()}
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    """Consume (and ignore) client messages until the socket closes"""
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+@router.websocket("/ws/{game_id}")
+async def game_updates_ws(websocket: WebSocket, game_id: str):
+    """Push a snapshot, then a delta for every update of the game"""
+    await websocket.accept()
+    
+    # Subscribe before reading the snapshot so no update falls in between
+    async with game_events.subscribe(game_id) as queue:
+        game_state = await load_game(game_id)
+        if not game_state:
+            await websocket.close(code=4404, reason="Game not found")
+            return
+        
+        disconnected = asyncio.create_task(_wait_for_disconnect(websocket))
+        try:
+            await websocket.send_text(build_snapshot(game_state))
+            while True:
+                getter = asyncio.create_task(queue.get())
+                done, _ = await asyncio.wait({getter, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnected in done:
+                    getter.cancel()
+                    break
+                await websocket.send_text(getter.result())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            disconnected.cancel()
+
+@router.get("/events/{game_id}")
+async def game_updates_sse(game_id: str):
+    """Server-Sent Events stream: a snapshot, then a delta for every update"""
+    if not await load_game(game_id):
+        raise HTTPException(status_code=404, detail="Game not found")
+    
+    async def stream():
+        # Subscribe before reading the snapshot so no update falls in between
+        async with game_events.subscribe(game_id) as queue:
+            game_state = await load_game(game_id)
+            if not game_state:
+                return
+            yield f"event: snapshot\ndata: {build_snapshot(game_state)}\n\n"
+            
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {message}\n\n"
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
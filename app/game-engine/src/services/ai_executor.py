@@ -0,0 +1,184 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+from config.logging_config import get_logger
+from config.metrics import AI_COMPUTE, AI_QUEUE_DEPTH, AI_QUEUE_WAIT, ai_fallback
+from models.game_models import AIDifficulty, GameState, Player
+from services.ai_logic import AI_MOVE_BUDGET_MS, TicTacToeAI, search_until
+from services.board import BoardGeometry
+from services.endgame_db import EndgameDatabase
+from services.game_logic import TicTacToeLogic
+
+logger = get_logger(__name__)
+
+# Where searches run: "process" (a pool of worker processes), "thread" (keeps
+# the event loop responsive but shares the GIL) or "inline" (on the event loop)
+AI_EXECUTOR = os.getenv("AI_EXECUTOR", "process")
+
+# Search processes per pod, shared out among its web workers. A web worker whose
+# share rounds down to zero searches in one thread instead of starting processes.
+AI_POOL_WORKERS = int(os.getenv("AI_POOL_WORKERS", "1"))
+
+# Web workers in this pod (run.py exports the count it starts)
+WEB_WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+# Searches queued or running per engine worker before new ones get the fallback move
+AI_MAX_QUEUE = int(os.getenv("AI_MAX_QUEUE", "8"))
+
+# Time past the move budget allowed for a worker's answer to come back
+AI_DEADLINE_GRACE_MS = int(os.getenv("AI_DEADLINE_GRACE_MS", "50"))
+
+
+class AIExecutor:
+    """Computes AI replies without blocking the event loop
+
+    Random and greedy moves and perfect moves that are looked up (endgame
+    database, 3x3 table) take microseconds and stay inline. Searches on
+    larger boards go to the pool with AI_MOVE_BUDGET_MS counted from when
+    they were submitted. A move that misses its deadline, finds the queue
+    full or hits a broken pool gets the greedy move instead (win, else
+    block, else the best free square); a search still waiting for a worker
+    when its request gives up is cancelled.
+    """
+
+    def __init__(self):
+        self._pool: Optional[Executor] = None
+        self.kind, self.workers = self.pool_plan()
+        self.queued = 0
+        self.moves: Dict[str, int] = {"inline": 0, "pool": 0}
+        self.fallbacks: Dict[str, int] = {"timeout": 0, "queue_full": 0, "error": 0}
+        self.compute_seconds = 0.0
+        self.queue_seconds = 0.0
+
+    @staticmethod
+    def pool_plan() -> Tuple[str, int]:
+        """(executor kind, pool size) for this web worker"""
+        if AI_EXECUTOR == "process":
+            share = AI_POOL_WORKERS // WEB_WORKERS
+            if share >= 1:
+                return "process", share
+            return "thread", 1
+        if AI_EXECUTOR == "thread":
+            return "thread", max(1, AI_POOL_WORKERS // WEB_WORKERS)
+        return "inline", 0
+
+    def _create_pool(self) -> Optional[Executor]:
+        if self.kind == "process":
+            # Not fork: the engine process runs an event loop and a log writer thread
+            return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        if self.kind == "thread":
+            return ThreadPoolExecutor(self.workers, thread_name_prefix="ai")
+        return None
+
+    async def start(self):
+        if self._pool is not None:
+            return
+        self._pool = self._create_pool()
+        if self._pool is None:
+            return
+        # Start the workers and import the search now, not on the first move
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.gather(*(
+                loop.run_in_executor(self._pool, search_until, 0, 0, 3, 3, 0.0)
+                for _ in range(self.workers)
+            ))
+        except Exception as e:
+            logger.error("AI pool failed to start, searching inline: %s", e, extra={"event": "ai_pool"})
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def stop(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _restart(self):
+        """Replace a pool whose worker died"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = self._create_pool()
+
+    @staticmethod
+    def needs_search(difficulty: AIDifficulty, geometry: BoardGeometry) -> bool:
+        """Whether the move is searched rather than picked or looked up"""
+        return (difficulty == AIDifficulty.PERFECT and geometry is not TicTacToeAI.CLASSIC
+                and EndgameDatabase.for_geometry(geometry) is None)
+
+    async def choose_move(self, x_mask: int, o_mask: int, symbol: str,
+                          difficulty: AIDifficulty, geometry: BoardGeometry) -> int:
+        """TicTacToeLogic.bitboard_ai_move(), with searches run in the pool"""
+        if self._pool is None or not self.needs_search(difficulty, geometry):
+            self.moves["inline"] += 1
+            return TicTacToeLogic.bitboard_ai_move(x_mask, o_mask, symbol, difficulty, geometry)
+
+        own, opp = (x_mask, o_mask) if symbol == "X" else (o_mask, x_mask)
+        if self.queued >= AI_MAX_QUEUE:
+            return self._fallback("queue_full", own, opp, geometry)
+
+        budget = AI_MOVE_BUDGET_MS / 1000
+        submitted = time.monotonic()
+        self.queued += 1
+        AI_QUEUE_DEPTH.inc()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(
+                self._pool, search_until, own, opp, geometry.size, geometry.win_length, submitted + budget
+            )
+            # On timeout or cancellation wait_for cancels the future, so a search
+            # still queued never runs; a running one stops at its own deadline
+            move, started, compute = await asyncio.wait_for(
+                future, timeout=budget + AI_DEADLINE_GRACE_MS / 1000
+            )
+        except asyncio.TimeoutError:
+            return self._fallback("timeout", own, opp, geometry)
+        except Exception as e:
+            logger.error("AI search failed: %s", e, extra={"event": "ai_search"})
+            if isinstance(e, BrokenProcessPool):
+                self._restart()
+            return self._fallback("error", own, opp, geometry)
+        finally:
+            self.queued -= 1
+            AI_QUEUE_DEPTH.dec()
+
+        waited = max(0.0, started - submitted)
+        self.moves["pool"] += 1
+        self.compute_seconds += compute
+        self.queue_seconds += waited
+        AI_COMPUTE.observe(compute)
+        AI_QUEUE_WAIT.observe(waited)
+        return move
+
+    async def reply(self, game_state: GameState, ai_player: Player) -> int:
+        """The AI player's move on the game's current board"""
+        geometry = BoardGeometry.get(game_state.board_size, game_state.win_length)
+        x_mask, o_mask = TicTacToeLogic.to_bitboards(game_state.board)
+        return await self.choose_move(x_mask, o_mask, ai_player.symbol.value,
+                                      game_state.ai_difficulty, geometry)
+
+    def _fallback(self, reason: str, own: int, opp: int, geometry: BoardGeometry) -> int:
+        self.fallbacks[reason] += 1
+        ai_fallback(reason)
+        logger.info("AI search skipped (%s), playing the fallback move", reason,
+                    extra={"event": "ai_fallback", "reason": reason})
+        return TicTacToeAI.greedy_move(own, opp, geometry)
+
+    def stats(self) -> Dict:
+        searched = self.moves["pool"]
+        return {
+            "executor": self.kind if self._pool is not None else "inline",
+            "workers": self.workers if self._pool is not None else 0,
+            "budget_ms": AI_MOVE_BUDGET_MS,
+            "queued": self.queued,
+            "max_queue": AI_MAX_QUEUE,
+            "moves": dict(self.moves),
+            "fallbacks": dict(self.fallbacks),
+            "avg_compute_ms": round(self.compute_seconds * 1000 / searched, 2) if searched else 0.0,
+            "avg_queue_ms": round(self.queue_seconds * 1000 / searched, 2) if searched else 0.0
+        }
+
+
+ai_executor = AIExecutor()
@@ -0,0 +1,351 @@
+import os
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from models.game_models import AIDifficulty
+from services.board import BoardGeometry, popcount
+from services.endgame_db import EndgameDatabase
+
+# Per-move thinking time for boards that are searched instead of looked up
+AI_MOVE_BUDGET_MS = int(os.getenv("AI_MOVE_BUDGET_MS", "250"))
+
+# Heuristic value of a window holding n stones of one side and none of the other
+WINDOW_WEIGHTS = tuple(10 ** n if n else 0 for n in range(20))
+
+
+def win_score(geometry: BoardGeometry) -> int:
+    """Score of a won position: above any static evaluation plus the ply adjustment
+
+    Every window scoring its largest weight (win_length - 1 stones) bounds
+    the evaluation, so no heuristic score can pass for a forced win.
+    """
+    return (len(geometry.win_masks) * WINDOW_WEIGHTS[geometry.win_length - 1]
+            + 2 * geometry.cell_count + 1)
+
+
+def _symmetry_permutations() -> List[Tuple[int, ...]]:
+    """The 8 symmetries of the 3x3 board as cell permutations (perm[cell] -> new cell)"""
+    def rotate(r: int, c: int) -> Tuple[int, int]:
+        return c, 2 - r
+
+    perms = []
+    for mirrored in (False, True):
+        for turns in range(4):
+            perm = []
+            for cell in range(9):
+                r, c = divmod(cell, 3)
+                if mirrored:
+                    c = 2 - c
+                for _ in range(turns):
+                    r, c = rotate(r, c)
+                perm.append(r * 3 + c)
+            perms.append(tuple(perm))
+    return perms
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the move budget runs out"""
+
+
+class TicTacToeAI:
+    """AI strategies working on (own_mask, opponent_mask) bitboards
+
+    Perfect play reads the memory-mapped endgame database for the board when
+    one has been generated (see services.endgame_db). Without one, the classic
+    3x3 board falls back to a transposition table keyed on the canonical form
+    of a position under the 8 board symmetries, solved once per process, and
+    larger boards use a time-bounded iterative deepening alpha-beta search.
+    """
+
+    CLASSIC = BoardGeometry.get(3, 3)
+
+    SYMMETRIES = _symmetry_permutations()
+    INVERSE_SYMMETRIES = [
+        tuple(perm.index(cell) for cell in range(9)) for perm in SYMMETRIES
+    ]
+
+    # TRANSFORMED[sym][mask] -> mask under symmetry sym, for all 512 masks
+    TRANSFORMED: List[Tuple[int, ...]] = []
+
+    # canonical key -> (score for side to move, best move in canonical frame)
+    _table: Optional[Dict[int, Tuple[int, int]]] = None
+
+    @staticmethod
+    def choose_move(own: int, opp: int, geometry: BoardGeometry = CLASSIC,
+                    difficulty: AIDifficulty = AIDifficulty.RANDOM,
+                    time_budget: Optional[float] = None) -> int:
+        """Pick a move for the side owning `own`, or -1 if the board is full"""
+        if geometry.is_full(own | opp):
+            return -1
+
+        if difficulty == AIDifficulty.PERFECT:
+            database = EndgameDatabase.for_geometry(geometry)
+            if database is not None:
+                move = database.best_move(own, opp)
+                if move is not None:
+                    return move
+            if geometry is TicTacToeAI.CLASSIC:
+                return TicTacToeAI.perfect_move(own, opp)
+            return TicTacToeAI.search_move(own, opp, geometry, time_budget)
+        if difficulty == AIDifficulty.GREEDY:
+            return TicTacToeAI.greedy_move(own, opp, geometry)
+
+        return random.choice(geometry.free_cells(own | opp))
+
+    @staticmethod
+    def transform(mask: int, perm: Tuple[int, ...]) -> int:
+        """Apply a cell permutation to a mask"""
+        result = 0
+        for cell in range(9):
+            if (mask >> cell) & 1:
+                result |= 1 << perm[cell]
+        return result
+
+    @staticmethod
+    def canonical(own: int, opp: int) -> Tuple[int, int]:
+        """Return (canonical key, symmetry index) for a position"""
+        best_key = -1
+        best_sym = 0
+        for sym, transformed in enumerate(TicTacToeAI.TRANSFORMED):
+            key = (transformed[own] << 9) | transformed[opp]
+            if best_key < 0 or key < best_key:
+                best_key = key
+                best_sym = sym
+        return best_key, best_sym
+
+    @staticmethod
+    def _solve(own: int, opp: int, table: Dict[int, Tuple[int, int]]) -> int:
+        """Negamax over canonical positions, filling the table"""
+        key, sym = TicTacToeAI.canonical(own, opp)
+        if key in table:
+            return table[key][0]
+
+        # Search in the canonical frame so the stored move needs no remapping
+        if sym:
+            transformed = TicTacToeAI.TRANSFORMED[sym]
+            own = transformed[own]
+            opp = transformed[opp]
+
+        empty_count = 9 - popcount(own | opp)
+        if TicTacToeAI.CLASSIC.has_line(opp):
+            # Opponent just won; faster losses score lower
+            table[key] = (-(empty_count + 1), -1)
+            return table[key][0]
+        if empty_count == 0:
+            table[key] = (0, -1)
+            return 0
+
+        best_score = -100
+        best_move = -1
+        for cell in TicTacToeAI.CLASSIC.preferred_order:
+            if ((own | opp) >> cell) & 1:
+                continue
+            score = -TicTacToeAI._solve(opp, own | (1 << cell), table)
+            if score > best_score:
+                best_score = score
+                best_move = cell
+
+        table[key] = (best_score, best_move)
+        return best_score
+
+    @staticmethod
+    def get_table() -> Dict[int, Tuple[int, int]]:
+        """Build (once) and return the perfect-play table"""
+        if TicTacToeAI._table is None:
+            table: Dict[int, Tuple[int, int]] = {}
+            TicTacToeAI._solve(0, 0, table)
+            TicTacToeAI._table = table
+        return TicTacToeAI._table
+
+    @staticmethod
+    def perfect_move(own: int, opp: int) -> int:
+        """Best move for the side owning `own` on the 3x3 board"""
+        table = TicTacToeAI.get_table()
+        key, sym = TicTacToeAI.canonical(own, opp)
+        if key not in table:
+            # Position not reachable from an empty board (e.g. edited state)
+            TicTacToeAI._solve(own, opp, table)
+        best_move = table[key][1]
+        if best_move < 0:
+            return -1
+        return TicTacToeAI.INVERSE_SYMMETRIES[sym][best_move]
+
+    @staticmethod
+    def greedy_move(own: int, opp: int, geometry: BoardGeometry = CLASSIC) -> int:
+        """Take a winning square, else block, else the first preferred square"""
+        occupied = own | opp
+        free = [cell for cell in geometry.preferred_order if not (occupied >> cell) & 1]
+        if not free:
+            return -1
+
+        for mask in (own, opp):
+            for cell in free:
+                if geometry.wins_at(mask | (1 << cell), cell):
+                    return cell
+
+        return free[0]
+
+    @staticmethod
+    def search_move(own: int, opp: int, geometry: BoardGeometry,
+                    time_budget: Optional[float] = None) -> int:
+        """Iterative-deepening alpha-beta within a time budget (seconds)"""
+        if time_budget is None:
+            time_budget = AI_MOVE_BUDGET_MS / 1000
+
+        search = _AlphaBetaSearch(geometry, time.monotonic() + time_budget)
+
+        # Forced moves need no search: win now, or block the opponent's win
+        candidates = search.candidates(own, opp)
+        for mask in (own, opp):
+            for cell in candidates:
+                if geometry.wins_at(mask | (1 << cell), cell):
+                    return cell
+
+        best_move = candidates[0]
+        max_depth = geometry.cell_count - popcount(own | opp)
+        for depth in range(1, max_depth + 1):
+            try:
+                score, move = search.root(own, opp, depth)
+            except SearchTimeout:
+                break
+            best_move = move
+            if abs(score) >= search.win_score - geometry.cell_count:
+                # Forced result found; deeper search cannot change it
+                break
+
+        return best_move
+
+
+def search_until(own: int, opp: int, size: int, win_length: int,
+                 deadline: float) -> Tuple[int, float, float]:
+    """search_move() run in a pool worker: (move, started, compute seconds)
+
+    `deadline` is a time.monotonic() value, which is the same clock in every
+    process on the host, so time spent queued counts against the budget. A
+    move whose deadline passed while queued gets the greedy move at once.
+    """
+    started = time.monotonic()
+    geometry = BoardGeometry.get(size, win_length)
+    remaining = deadline - started
+    if remaining <= 0:
+        move = TicTacToeAI.greedy_move(own, opp, geometry)
+    else:
+        move = TicTacToeAI.search_move(own, opp, geometry, remaining)
+    return move, started, time.monotonic() - started
+
+
+class _AlphaBetaSearch:
+    """Negamax alpha-beta with a transposition table shared across depths"""
+
+    EXACT, LOWER, UPPER = 0, 1, 2
+
+    def __init__(self, geometry: BoardGeometry, deadline: float):
+        self.geometry = geometry
+        self.deadline = deadline
+        self.win_score = win_score(geometry)
+        self.nodes = 0
+        # (own, opp) -> (depth, score, flag, best move)
+        self.table: Dict[Tuple[int, int], Tuple[int, int, int, int]] = {}
+
+    def candidates(self, own: int, opp: int) -> List[int]:
+        """Empty cells worth searching, best first"""
+        geometry = self.geometry
+        occupied = own | opp
+        if occupied == 0:
+            return [geometry.preferred_order[0]]
+
+        if geometry.size <= 4:
+            near = ~occupied & geometry.full_mask
+        else:
+            # On big boards only cells touching a stone are considered
+            near = 0
+            remaining = occupied
+            while remaining:
+                low = remaining & -remaining
+                near |= geometry.neighbour_masks[low.bit_length() - 1]
+                remaining ^= low
+            near &= ~occupied
+            if not near:
+                near = ~occupied & geometry.full_mask
+
+        return [cell for cell in geometry.preferred_order if (near >> cell) & 1]
+
+    def evaluate(self, own: int, opp: int) -> int:
+        """Static score for the side to move: open windows weighted by fill"""
+        score = 0
+        for win_mask in self.geometry.win_masks:
+            mine = own & win_mask
+            theirs = opp & win_mask
+            if mine and not theirs:
+                score += WINDOW_WEIGHTS[popcount(mine)]
+            elif theirs and not mine:
+                score -= WINDOW_WEIGHTS[popcount(theirs)]
+        return score
+
+    def root(self, own: int, opp: int, depth: int) -> Tuple[int, int]:
+        """Search to a fixed depth, returning (score, best move)"""
+        score = self.negamax(own, opp, depth, -self.win_score - 1, self.win_score + 1, 0)
+        return score, self.table[(own, opp)][3]
+
+    def negamax(self, own: int, opp: int, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes & 63 == 0 and time.monotonic() > self.deadline:
+            raise SearchTimeout()
+
+        if depth == 0:
+            return self.evaluate(own, opp)
+
+        key = (own, opp)
+        entry = self.table.get(key)
+        tt_move = -1
+        if entry is not None:
+            entry_depth, entry_score, flag, tt_move = entry
+            if entry_depth >= depth and ply > 0:
+                if flag == self.EXACT:
+                    return entry_score
+                if flag == self.LOWER and entry_score >= beta:
+                    return entry_score
+                if flag == self.UPPER and entry_score <= alpha:
+                    return entry_score
+
+        moves = self.candidates(own, opp)
+        if tt_move >= 0 and tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+
+        original_alpha = alpha
+        best_score = -self.win_score - 1
+        best_move = moves[0]
+        geometry = self.geometry
+        for cell in moves:
+            new_own = own | (1 << cell)
+            if geometry.wins_at(new_own, cell):
+                score = self.win_score - ply
+            elif geometry.is_full(new_own | opp):
+                score = 0
+            else:
+                score = -self.negamax(opp, new_own, depth - 1, -beta, -alpha, ply + 1)
+
+            if score > best_score:
+                best_score = score
+                best_move = cell
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            flag = self.UPPER
+        elif best_score >= beta:
+            flag = self.LOWER
+        else:
+            flag = self.EXACT
+        self.table[key] = (depth, best_score, flag, best_move)
+        return best_score
+
+
+TicTacToeAI.TRANSFORMED = [
+    tuple(TicTacToeAI.transform(mask, perm) for mask in range(1 << 9))
+    for perm in TicTacToeAI.SYMMETRIES
+]
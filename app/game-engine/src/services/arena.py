@@ -0,0 +1,281 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from models.game_models import AIDifficulty
+from services.ai_logic import TicTacToeAI
+from services.board import BoardGeometry
+
+# Cell values in the batch arrays
+EMPTY, X, O = 0, 1, 2
+
+# Winner codes per game
+UNFINISHED, X_WON, O_WON, DRAW = 0, 1, 2, 3
+
+
+class ArenaGeometry:
+    """NumPy views of a BoardGeometry, shared by the vectorized strategies"""
+
+    def __init__(self, geometry: BoardGeometry):
+        self.geometry = geometry
+        self.cell_count = geometry.cell_count
+
+        # windows[w] -> the k cells of window w
+        self.windows = np.array([
+            [cell for cell in range(geometry.cell_count) if (mask >> cell) & 1]
+            for mask in geometry.win_masks
+        ], dtype=np.intp)
+
+        # incidence[w, cell] is 1 when cell lies in window w
+        self.incidence = np.zeros((len(self.windows), self.cell_count), dtype=np.int32)
+        self.incidence[np.arange(len(self.windows))[:, None], self.windows] = 1
+
+        # Higher is better: the first preferred cell scores cell_count
+        self.preference = np.empty(self.cell_count, dtype=np.int32)
+        self.preference[list(geometry.preferred_order)] = np.arange(self.cell_count, 0, -1)
+
+        self._perfect_tables: Dict[int, np.ndarray] = {}
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get(size: int = 3, win_length: int = 3) -> "ArenaGeometry":
+        """Shared arrays (and perfect-play tables) per board size and win length"""
+        return ArenaGeometry(BoardGeometry.get(size, win_length))
+
+    def winning_cells(self, boards: np.ndarray, player: int) -> np.ndarray:
+        """(games, cells) bool: empty cells that complete a line for `player`"""
+        lines = boards[:, self.windows]
+        almost = ((lines == player).sum(axis=2) == self.windows.shape[1] - 1) \
+            & ((lines == EMPTY).sum(axis=2) == 1)
+        return (almost.astype(np.int32) @ self.incidence > 0) & (boards == EMPTY)
+
+    def has_won(self, boards: np.ndarray, player: int) -> np.ndarray:
+        """(games,) bool: `player` has k in a row"""
+        return (boards[:, self.windows] == player).all(axis=2).any(axis=1)
+
+    def perfect_table(self, player: int) -> np.ndarray:
+        """Best move for `player` by base-3 board index (3x3 only, built once)"""
+        table = self._perfect_tables.get(player)
+        if table is None:
+            table = np.full(3 ** self.cell_count, -1, dtype=np.int8)
+            opponent = O if player == X else X
+            for index in range(len(table)):
+                cells = [(index // 3 ** i) % 3 for i in range(self.cell_count)]
+                own_count = cells.count(player)
+                opp_count = cells.count(opponent)
+                # Only positions where it can be `player`'s turn
+                if own_count + opp_count == self.cell_count or \
+                        opp_count - own_count != (1 if player == O else 0):
+                    continue
+                own = sum(1 << i for i, cell in enumerate(cells) if cell == player)
+                opp = sum(1 << i for i, cell in enumerate(cells) if cell == opponent)
+                table[index] = TicTacToeAI.perfect_move(own, opp)
+            self._perfect_tables[player] = table
+        return table
+
+
+# A strategy maps (boards, player, arena geometry, rng) to one move per board
+Strategy = Callable[[np.ndarray, int, ArenaGeometry, np.random.Generator], np.ndarray]
+
+
+def random_moves(boards: np.ndarray, player: int, arena: ArenaGeometry,
+                 rng: np.random.Generator) -> np.ndarray:
+    """Uniform over empty cells (same distribution as the RANDOM difficulty)"""
+    scores = rng.random(boards.shape)
+    scores[boards != EMPTY] = -1.0
+    return scores.argmax(axis=1)
+
+
+def greedy_moves(boards: np.ndarray, player: int, arena: ArenaGeometry,
+                 rng: np.random.Generator) -> np.ndarray:
+    """Win, else block, else the first preferred cell (as TicTacToeAI.greedy_move)"""
+    opponent = O if player == X else X
+    cell_count = arena.cell_count
+    tier = np.maximum(arena.winning_cells(boards, player) * 2,
+                      arena.winning_cells(boards, opponent))
+    scores = np.where(boards == EMPTY, arena.preference + tier * cell_count, -1)
+    return scores.argmax(axis=1)
+
+
+def perfect_moves(boards: np.ndarray, player: int, arena: ArenaGeometry,
+                  rng: np.random.Generator) -> np.ndarray:
+    """Table lookup on 3x3, per-board alpha-beta search on larger boards"""
+    if arena.geometry is not TicTacToeAI.CLASSIC:
+        return search_moves(boards, player, arena, rng)
+    powers = 3 ** np.arange(arena.cell_count, dtype=np.int64)
+    return arena.perfect_table(player)[boards @ powers].astype(np.intp)
+
+
+def search_moves(boards: np.ndarray, player: int, arena: ArenaGeometry,
+                 rng: np.random.Generator) -> np.ndarray:
+    """PERFECT difficulty of the engine AI, one board at a time (slow)"""
+    opponent = O if player == X else X
+    moves = np.empty(len(boards), dtype=np.intp)
+    for i, board in enumerate(boards):
+        own = _to_mask(board == player)
+        opp = _to_mask(board == opponent)
+        moves[i] = TicTacToeAI.choose_move(own, opp, arena.geometry, AIDifficulty.PERFECT)
+    return moves
+
+
+def _to_mask(cells: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(cells, bitorder="little").tobytes(), "little")
+
+
+STRATEGIES: Dict[str, Strategy] = {
+    "random": random_moves,
+    "greedy": greedy_moves,
+    "perfect": perfect_moves,
+}
+
+
+class BatchResult(NamedTuple):
+    """Outcome counts from X's and O's point of view"""
+    games: int
+    x_wins: int
+    o_wins: int
+    draws: int
+
+
+def play_batch(x_strategy: str, o_strategy: str, games: int,
+               board_size: int = 3, win_length: int = 3,
+               seed: Optional[int] = None) -> BatchResult:
+    """Play `games` games at once, all boards advancing one ply per step"""
+    arena = ArenaGeometry.get(board_size, win_length)
+    strategies = {X: STRATEGIES[x_strategy], O: STRATEGIES[o_strategy]}
+    rng = np.random.default_rng(seed)
+
+    boards = np.zeros((games, arena.cell_count), dtype=np.int8)
+    winners = np.full(games, UNFINISHED, dtype=np.int8)
+    active = np.arange(games)
+
+    for ply in range(arena.cell_count):
+        if not len(active):
+            break
+        player = X if ply % 2 == 0 else O
+        live = boards[active]
+        moves = strategies[player](live, player, arena, rng)
+        live[np.arange(len(active)), moves] = player
+        boards[active] = live
+
+        won = arena.has_won(live, player)
+        winners[active[won]] = player
+        active = active[~won]
+
+    winners[active] = DRAW
+    counts = np.bincount(winners, minlength=4)
+    return BatchResult(games, int(counts[X_WON]), int(counts[O_WON]), int(counts[DRAW]))
+
+
+class MatchResult(NamedTuple):
+    """Outcome counts from strategy A's point of view"""
+    strategy_a: str
+    strategy_b: str
+    games: int
+    wins: int
+    draws: int
+    losses: int
+    seconds: float
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.games if self.games else 0.0
+
+    @property
+    def draw_rate(self) -> float:
+        return self.draws / self.games if self.games else 0.0
+
+    @property
+    def loss_rate(self) -> float:
+        return self.losses / self.games if self.games else 0.0
+
+    @property
+    def games_per_second(self) -> float:
+        return self.games / self.seconds if self.seconds else 0.0
+
+
+def _play_chunk(args) -> BatchResult:
+    return play_batch(*args)
+
+
+def run_match(strategy_a: str, strategy_b: str, games: int,
+              board_size: int = 3, win_length: int = 3,
+              seed: Optional[int] = None, workers: int = 1,
+              batch_size: int = 100_000) -> MatchResult:
+    """Play A against B, each taking X in half of the games
+
+    Games are split into batches of at most `batch_size`; with workers > 1
+    the batches run in a process pool.
+    """
+    for name in (strategy_a, strategy_b):
+        if name not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {name!r} (choose from {', '.join(STRATEGIES)})")
+
+    seeds = np.random.SeedSequence(seed)
+    chunks = []
+    a_as_x = (games + 1) // 2
+    for a_is_x, count in ((True, a_as_x), (False, games - a_as_x)):
+        x_name, o_name = (strategy_a, strategy_b) if a_is_x else (strategy_b, strategy_a)
+        for start in range(0, count, batch_size):
+            chunk_seed = int(seeds.spawn(1)[0].generate_state(1)[0])
+            chunks.append((a_is_x, (x_name, o_name, min(batch_size, count - start),
+                                    board_size, win_length, chunk_seed)))
+
+    started = time.perf_counter()
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_play_chunk, [args for _, args in chunks]))
+    else:
+        results = [_play_chunk(args) for _, args in chunks]
+    seconds = time.perf_counter() - started
+
+    wins = draws = losses = 0
+    for (a_is_x, _), result in zip(chunks, results):
+        a_wins, b_wins = (result.x_wins, result.o_wins) if a_is_x else (result.o_wins, result.x_wins)
+        wins += a_wins
+        losses += b_wins
+        draws += result.draws
+
+    return MatchResult(strategy_a, strategy_b, games, wins, draws, losses, seconds)
+
+
+def format_result(result: MatchResult) -> str:
+    return (
+        f"{result.strategy_a} vs {result.strategy_b}: {result.games} games, "
+        f"win {result.win_rate:.2%} / draw {result.draw_rate:.2%} / loss {result.loss_rate:.2%}, "
+        f"{result.games_per_second:,.0f} games/s"
+    )
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point: python -m services.arena greedy random"""
+    parser = argparse.ArgumentParser(description="Self-play arena for the game AI")
+    parser.add_argument("strategy_a", choices=sorted(STRATEGIES))
+    parser.add_argument("strategy_b", choices=sorted(STRATEGIES))
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--board-size", type=int, default=3)
+    parser.add_argument("--win-length", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes to spread batches over (0 = one per CPU)")
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    result = run_match(
+        args.strategy_a, args.strategy_b, args.games,
+        board_size=args.board_size,
+        win_length=args.win_length or min(args.board_size, 5),
+        seed=args.seed,
+        workers=args.workers or os.cpu_count() or 1,
+        batch_size=args.batch_size
+    )
+    print(format_result(result))
+
+
+if __name__ == "__main__":
+    main()
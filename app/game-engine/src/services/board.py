@@ -0,0 +1,104 @@
+from functools import lru_cache
+from typing import List, Tuple
+
+from models.game_models import MAX_BOARD_SIZE
+
+# Row/column steps for the four line directions: horizontal, vertical, both diagonals
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# 1 << i for every cell of the largest board, so list boards convert without shifting
+CELL_BITS = tuple(1 << i for i in range(MAX_BOARD_SIZE * MAX_BOARD_SIZE))
+
+
+def popcount(mask: int) -> int:
+    """Number of set bits (int.bit_count needs Python 3.10)"""
+    return bin(mask).count("1")
+
+
+class BoardGeometry:
+    """Precomputed bitboard masks for an N x N board with k-in-a-row
+
+    Cell i is bit i, numbered row by row. Geometries are immutable and cached
+    per (size, win_length) through BoardGeometry.get().
+    """
+
+    def __init__(self, size: int, win_length: int):
+        if not 1 <= win_length <= size:
+            raise ValueError(f"win_length must be between 1 and {size}")
+
+        self.size = size
+        self.win_length = win_length
+        self.cell_count = size * size
+        self.full_mask = (1 << self.cell_count) - 1
+
+        # Every k-long window on the board (rows, columns, then diagonals, so the
+        # classic board matches TicTacToeLogic.WINNING_COMBINATIONS order),
+        # and the windows through each cell
+        win_masks: List[int] = []
+        cell_win_masks: List[List[int]] = [[] for _ in range(self.cell_count)]
+        for d_row, d_col in DIRECTIONS:
+            for row in range(size):
+                for col in range(size):
+                    end_row = row + d_row * (win_length - 1)
+                    end_col = col + d_col * (win_length - 1)
+                    if not (0 <= end_row < size and 0 <= end_col < size):
+                        continue
+                    cells = [(row + d_row * i) * size + col + d_col * i for i in range(win_length)]
+                    mask = sum(1 << cell for cell in cells)
+                    win_masks.append(mask)
+                    for cell in cells:
+                        cell_win_masks[cell].append(mask)
+
+        self.win_masks: Tuple[int, ...] = tuple(win_masks)
+        self.cell_win_masks: Tuple[Tuple[int, ...], ...] = tuple(tuple(m) for m in cell_win_masks)
+
+        # Cells within one step of each cell (used to focus the AI search)
+        neighbour_masks = []
+        for cell in range(self.cell_count):
+            row, col = divmod(cell, size)
+            mask = 0
+            for n_row in range(max(0, row - 1), min(size, row + 2)):
+                for n_col in range(max(0, col - 1), min(size, col + 2)):
+                    mask |= 1 << (n_row * size + n_col)
+            neighbour_masks.append(mask & ~(1 << cell))
+        self.neighbour_masks: Tuple[int, ...] = tuple(neighbour_masks)
+
+        # Cells ordered from most to least useful: near the center, on many lines
+        center = (size - 1) / 2
+        self.preferred_order: Tuple[int, ...] = tuple(sorted(
+            range(self.cell_count),
+            key=lambda cell: (
+                max(abs(cell // size - center), abs(cell % size - center)),
+                -len(cell_win_masks[cell]),
+                cell
+            )
+        ))
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get(size: int = 3, win_length: int = 3) -> "BoardGeometry":
+        """Shared geometry for a board size and win length"""
+        return BoardGeometry(size, win_length)
+
+    def wins_at(self, mask: int, position: int) -> bool:
+        """Check if `mask` has k in a row through `position` (the last move)"""
+        for win_mask in self.cell_win_masks[position]:
+            if mask & win_mask == win_mask:
+                return True
+        return False
+
+    def has_line(self, mask: int) -> bool:
+        """Full scan for any k in a row in `mask`"""
+        for win_mask in self.win_masks:
+            if mask & win_mask == win_mask:
+                return True
+        return False
+
+    def is_full(self, occupied: int) -> bool:
+        """Check if every cell is taken"""
+        return occupied & self.full_mask == self.full_mask
+
+    def free_cells(self, occupied: int) -> List[int]:
+        """List empty cell indexes"""
+        empty = ~occupied & self.full_mask
+        return [i for i in range(self.cell_count) if (empty >> i) & 1]
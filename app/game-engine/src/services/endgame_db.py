@@ -0,0 +1,283 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from config.logging_config import get_logger
+from services.board import BoardGeometry, popcount
+
+logger = get_logger(__name__)
+
+# Where generated databases live; one file per (board size, win length)
+ENDGAME_DB_DIR = os.getenv(
+    "ENDGAME_DB_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 "data", "endgame")
+)
+
+MAGIC = b"TTTEGDB\x00"
+FORMAT_VERSION = 1
+
+# magic, format version, board size, win length, entry count, crc32 of the entries
+HEADER = struct.Struct("<8sHBBQI8x")
+
+# One byte per position: outcome for the side to move in the top two bits,
+# best move + 1 in the low six (0 when the game is already over)
+OUTCOME_SHIFT = 6
+MOVE_MASK = (1 << OUTCOME_SHIFT) - 1
+UNKNOWN, WIN, DRAW, LOSS = 0, 1, 2, 3
+
+# 3^cells entries: 4x4 is 43 MB, 5x5 would be 847 GB
+MAX_CELLS = 16
+
+# Base-3 value of each 8-cell bit pattern (cell i contributes 3^i)
+_TERNARY_BYTE = tuple(
+    sum(3 ** bit for bit in range(8) if (byte >> bit) & 1) for byte in range(256)
+)
+
+
+def ternary(mask: int) -> int:
+    """Base-3 value of a bitboard, one table lookup per 8 cells"""
+    value = 0
+    scale = 1
+    while mask:
+        value += _TERNARY_BYTE[mask & 0xFF] * scale
+        mask >>= 8
+        scale *= 3 ** 8
+    return value
+
+
+def position_index(x_mask: int, o_mask: int) -> int:
+    """Database index of a position: sum of cell * 3^i with empty 0, X 1, O 2"""
+    return ternary(x_mask) + 2 * ternary(o_mask)
+
+
+def file_name(size: int, win_length: int) -> str:
+    return f"endgame_{size}x{size}_k{win_length}.bin"
+
+
+class EndgameDatabaseError(Exception):
+    """Raised when a database file is missing, corrupt or for another board"""
+
+
+class EndgameDatabase:
+    """Read-only, memory-mapped table of solved positions for one board
+
+    The file is mapped rather than read, so every worker process on a host
+    shares one page-cache copy and opening it costs no computation: only the
+    header is checked. The checksum covers every page and is verified once,
+    when the image is built (--verify), or by passing verify=True. X is
+    assumed to move first: the side to move follows from the stone counts.
+    """
+
+    # (size, win_length) -> open database, or None when no file exists
+    _databases: Dict[Tuple[int, int], Optional["EndgameDatabase"]] = {}
+
+    def __init__(self, path: str, verify: bool = False):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:
+                raise EndgameDatabaseError(f"{path}: {e}")
+
+        try:
+            if len(self._mmap) < HEADER.size:
+                raise EndgameDatabaseError(f"{path}: truncated header")
+            magic, version, size, win_length, entries, checksum = HEADER.unpack_from(self._mmap)
+            if magic != MAGIC:
+                raise EndgameDatabaseError(f"{path}: not an endgame database")
+            if version != FORMAT_VERSION:
+                raise EndgameDatabaseError(f"{path}: format version {version}, expected {FORMAT_VERSION}")
+            if entries != 3 ** (size * size) or len(self._mmap) != HEADER.size + entries:
+                raise EndgameDatabaseError(f"{path}: size does not match a {size}x{size} board")
+            if verify:
+                with memoryview(self._mmap) as view:
+                    actual = zlib.crc32(view[HEADER.size:])
+                if actual != checksum:
+                    raise EndgameDatabaseError(f"{path}: checksum mismatch")
+        except Exception:
+            self._mmap.close()
+            raise
+
+        self.size = size
+        self.win_length = win_length
+        self.cell_count = size * size
+
+    def close(self):
+        self._mmap.close()
+
+    def lookup(self, x_mask: int, o_mask: int) -> Tuple[int, int]:
+        """(outcome for the side to move, best move or -1) for a position"""
+        entry = self._mmap[HEADER.size + position_index(x_mask, o_mask)]
+        return entry >> OUTCOME_SHIFT, (entry & MOVE_MASK) - 1
+
+    def best_move(self, own: int, opp: int) -> Optional[int]:
+        """Best move for the side owning `own`, or None if the position is not stored"""
+        own_count = popcount(own)
+        opp_count = popcount(opp)
+        if own_count == opp_count:
+            outcome, move = self.lookup(own, opp)
+        elif own_count + 1 == opp_count:
+            outcome, move = self.lookup(opp, own)
+        else:
+            return None
+        if outcome == UNKNOWN or move < 0:
+            return None
+        return move
+
+    @staticmethod
+    def for_geometry(geometry: BoardGeometry) -> Optional["EndgameDatabase"]:
+        """Database for a board, opened on first use; None when none was generated"""
+        key = (geometry.size, geometry.win_length)
+        if key not in EndgameDatabase._databases:
+            database = None
+            path = os.path.join(ENDGAME_DB_DIR, file_name(*key))
+            if os.path.exists(path):
+                try:
+                    database = EndgameDatabase(path)
+                except (OSError, EndgameDatabaseError) as e:
+                    logger.error("Ignoring endgame database: %s", e)
+            EndgameDatabase._databases[key] = database
+        return EndgameDatabase._databases[key]
+
+    @staticmethod
+    def load_all() -> List["EndgameDatabase"]:
+        """Open every database in ENDGAME_DB_DIR (startup warm-up)"""
+        if not os.path.isdir(ENDGAME_DB_DIR):
+            return []
+        loaded = []
+        for name in sorted(os.listdir(ENDGAME_DB_DIR)):
+            if not (name.startswith("endgame_") and name.endswith(".bin")):
+                continue
+            try:
+                size = int(name.split("_")[1].split("x")[0])
+                win_length = int(name.rsplit("_k", 1)[1][:-len(".bin")])
+            except (IndexError, ValueError):
+                continue
+            database = EndgameDatabase.for_geometry(BoardGeometry.get(size, win_length))
+            if database is not None:
+                loaded.append(database)
+        if loaded:
+            logger.info("Endgame databases loaded",
+                        extra={"event": "endgame_db",
+                               "boards": [f"{d.size}x{d.size}/k{d.win_length}" for d in loaded]})
+        return loaded
+
+    @staticmethod
+    def close_all():
+        for database in EndgameDatabase._databases.values():
+            if database is not None:
+                database.close()
+        EndgameDatabase._databases.clear()
+
+
+def solve(size: int, win_length: int, chunk_size: int = 1 << 20) -> bytes:
+    """Solve every position of a board by retrograde analysis; returns the entry bytes
+
+    Positions are swept from full boards back to the empty one, so each
+    position's children are already solved. Scores follow TicTacToeAI:
+    faster wins and slower losses score higher, ties go to the earlier cell
+    in the geometry's preferred order. Needs NumPy (offline tool only).
+    """
+    import numpy as np
+
+    geometry = BoardGeometry.get(size, win_length)
+    cells = geometry.cell_count
+    if cells > MAX_CELLS:
+        raise ValueError(f"{size}x{size} has 3^{cells} positions; at most {MAX_CELLS} cells are supported")
+
+    entries = 3 ** cells
+    powers = 3 ** np.arange(cells, dtype=np.int64)
+    windows = np.array([
+        [cell for cell in range(cells) if (mask >> cell) & 1] for mask in geometry.win_masks
+    ], dtype=np.intp)
+
+    def digits(indexes):
+        return ((indexes[:, None] // powers) % 3).astype(np.int8)
+
+    # Stones on the board, or -1 when the counts cannot arise with X moving first
+    level = np.full(entries, -1, dtype=np.int8)
+    for start in range(0, entries, chunk_size):
+        board = digits(np.arange(start, min(start + chunk_size, entries), dtype=np.int64))
+        x_count = (board == 1).sum(axis=1)
+        o_count = (board == 2).sum(axis=1)
+        valid = (x_count == o_count) | (x_count == o_count + 1)
+        level[start:start + len(board)] = np.where(valid, x_count + o_count, -1)
+
+    scores = np.zeros(entries, dtype=np.int8)
+    table = np.zeros(entries, dtype=np.uint8)
+    for stones in range(cells, -1, -1):
+        mover = 1 if stones % 2 == 0 else 2
+        just_moved = 3 - mover
+        empty_count = cells - stones
+        positions = np.flatnonzero(level == stones)
+
+        for start in range(0, len(positions), chunk_size):
+            indexes = positions[start:start + chunk_size]
+            board = digits(indexes)
+
+            lost = (board[:, windows] == just_moved).all(axis=2).any(axis=1) if stones else \
+                np.zeros(len(indexes), dtype=bool)
+            best = np.where(lost, -(empty_count + 1), 0).astype(np.int8)
+            move = np.full(len(indexes), -1, dtype=np.int8)
+
+            if empty_count:
+                open_positions = ~lost
+                best[open_positions] = -100
+                for cell in geometry.preferred_order:
+                    free = open_positions & (board[:, cell] == 0)
+                    child = -scores[indexes + free * (mover * powers[cell])]
+                    better = free & (child > best)
+                    best[better] = child[better]
+                    move[better] = cell
+
+            outcome = np.where(best > 0, WIN, np.where(best < 0, LOSS, DRAW)).astype(np.uint8)
+            scores[indexes] = best
+            table[indexes] = (outcome << OUTCOME_SHIFT) | (move + 1).astype(np.uint8)
+
+    return table.tobytes()
+
+
+def write_database(path: str, size: int, win_length: int, body: bytes):
+    """Write header and entries atomically (readers never see a partial file)"""
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, size, win_length, len(body), zlib.crc32(body))
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header)
+        f.write(body)
+    os.replace(temp_path, path)
+
+
+def main(argv: Optional[List[str]] = None):
+    """python -m services.endgame_db --board 3:3 --board 4:4 [--output-dir DIR] [--verify]"""
+    parser = argparse.ArgumentParser(description="Generate memory-mapped endgame databases")
+    parser.add_argument("--board", action="append", default=None, metavar="SIZE:WIN_LENGTH",
+                        help="Board to solve (repeatable, default 3:3 and 4:4)")
+    parser.add_argument("--output-dir", default=ENDGAME_DB_DIR)
+    parser.add_argument("--verify", action="store_true",
+                        help="Check the checksums of the existing databases instead of solving")
+    args = parser.parse_args(argv)
+
+    for board in args.board or ["3:3", "4:4"]:
+        size, win_length = (int(part) for part in board.split(":"))
+        if args.verify:
+            path = os.path.join(args.output_dir, file_name(size, win_length))
+            EndgameDatabase(path, verify=True).close()
+            print(f"{path}: checksum ok")
+            continue
+        started = time.perf_counter()
+        body = solve(size, win_length)
+        path = os.path.join(args.output_dir, file_name(size, win_length))
+        write_database(path, size, win_length, body)
+        print(f"{path}: {len(body):,} positions in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
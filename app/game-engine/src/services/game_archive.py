@@ -0,0 +1,391 @@
+import asyncio
+import fcntl
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config.logging_config import get_logger
+from config.metrics import game_archived, game_finished
+from config.redis_config import (
+    delete_games, dequeue_waiting_game, get_redis_client, index_games,
+    iter_game_batches, matchmaking_queue, store_games_if_version
+)
+from models.game_codec import encode_game
+from models.game_models import GameState, GameStatus
+from services.game_cache import forget_game
+from services.game_events import build_delta, game_events, rebuild_game
+from services.game_index import ALL_INDEX_KEYS, index_entry, prune_expired
+
+logger = get_logger(__name__)
+
+# Directory of archive segments, on a volume every replica mounts. Unset
+# disables archival: finished games then stay in Redis until GAME_TTL_SECONDS.
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR") or None
+
+# A new segment is started once the current one is this large
+ARCHIVE_SEGMENT_BYTES = int(os.getenv("ARCHIVE_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+
+# Seconds between lifecycle passes (0 disables the worker)
+LIFECYCLE_INTERVAL_SECONDS = float(os.getenv("LIFECYCLE_INTERVAL_SECONDS", "60"))
+
+# WAITING/ACTIVE games without an update for this long are marked ABANDONED
+GAME_STALL_SECONDS = int(os.getenv("GAME_STALL_SECONDS", "900"))
+
+# FINISHED/ABANDONED games stay readable in Redis this long before archival
+ARCHIVE_AFTER_SECONDS = int(os.getenv("ARCHIVE_AFTER_SECONDS", "120"))
+
+# Redis lock so one replica runs a pass at a time
+LIFECYCLE_LOCK_KEY = "game_lifecycle_lock"
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl.gz"
+INDEX_FILE = "index.jsonl"
+LOCK_FILE = ".lock"
+
+
+def to_utc(value: datetime) -> datetime:
+    """Naive UTC, the form game timestamps are stored in"""
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    return value
+
+
+def segment_path(archive_dir: str, number: int) -> str:
+    return os.path.join(archive_dir, f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}")
+
+
+def list_segments(archive_dir: Optional[str]) -> List[str]:
+    """Segment file names, oldest first"""
+    if not archive_dir or not os.path.isdir(archive_dir):
+        return []
+    return sorted(name for name in os.listdir(archive_dir)
+                  if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+
+
+class ArchiveWriter:
+    """Append-only writer of gzip JSONL segments plus a JSONL index
+
+    Every batch is appended to the current segment as its own gzip member, so
+    a segment is always a valid (multi-member) gzip file and a batch can be
+    read by seeking to its offset. The index gets one line per game with the
+    segment, member offset and the fields history queries filter on. Data is
+    fsynced before the index line is written, and the index before the caller
+    deletes the games from Redis: a crash can duplicate a game in a segment,
+    never lose one.
+    """
+
+    def __init__(self, archive_dir: str = ARCHIVE_DIR, segment_bytes: int = ARCHIVE_SEGMENT_BYTES):
+        self.archive_dir = archive_dir
+        self.segment_bytes = segment_bytes
+
+    def _current_segment(self) -> str:
+        segments = list_segments(self.archive_dir)
+        number = int(segments[-1][len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) if segments else 1
+        path = segment_path(self.archive_dir, number)
+        if os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+            path = segment_path(self.archive_dir, number + 1)
+        return path
+
+    def append(self, games: List[GameState]) -> int:
+        """Write a batch as one gzip member and index it; returns bytes written"""
+        if not games:
+            return 0
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = self._current_segment()
+
+        with open(path, "ab") as f:
+            offset = f.tell()
+            with gzip.GzipFile(fileobj=f, mode="wb") as member:
+                for game_state in games:
+                    member.write(game_state.model_dump_json().encode())
+                    member.write(b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+            written = f.tell() - offset
+
+        segment = os.path.basename(path)
+        with open(os.path.join(self.archive_dir, INDEX_FILE), "a") as index:
+            for game_state in games:
+                index.write(json.dumps({
+                    "game_id": game_state.game_id,
+                    "segment": segment,
+                    "offset": offset,
+                    "status": game_state.status.value,
+                    "winner": game_state.winner,
+                    "game_mode": game_state.game_mode.value,
+                    "players": [player.user_id for player in game_state.players],
+                    "updated_at": game_state.updated_at.isoformat(),
+                }, separators=(",", ":")))
+                index.write("\n")
+            index.flush()
+            os.fsync(index.fileno())
+        return written
+
+
+class ArchiveReader:
+    """Streaming queries over the archive; nothing is loaded whole into memory
+
+    Without an archive directory every query comes back empty.
+    """
+
+    def __init__(self, archive_dir: Optional[str] = ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+
+    def iter_index(self) -> Iterator[Dict]:
+        """Index entries in archival order"""
+        if not self.archive_dir:
+            return
+        path = os.path.join(self.archive_dir, INDEX_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path) as index:
+            for line in index:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Torn last line after a crash
+                    continue
+
+    def iter_segment(self, segment: str, offset: int = 0) -> Iterator[GameState]:
+        """Games of a segment from a member offset to its end, one line at a time"""
+        with open(os.path.join(self.archive_dir, segment), "rb") as f:
+            f.seek(offset)
+            with gzip.GzipFile(fileobj=f, mode="rb") as stream:
+                for line in stream:
+                    yield GameState.model_validate_json(line)
+
+    def iter_games(self) -> Iterator[GameState]:
+        """Every archived game, segment by segment"""
+        for segment in list_segments(self.archive_dir):
+            yield from self.iter_segment(segment)
+
+    def get_game(self, game_id: str) -> Optional[GameState]:
+        """One archived game: an index scan, then only its batch is decompressed"""
+        location: Optional[Tuple[str, int]] = None
+        for entry in self.iter_index():
+            if entry["game_id"] == game_id:
+                # Keep the last copy if a crash archived it twice
+                location = (entry["segment"], entry["offset"])
+        if location is None:
+            return None
+        for game_state in self.iter_segment(*location):
+            if game_state.game_id == game_id:
+                return game_state
+        return None
+
+    def history(self, player_id: Optional[str] = None, status: Optional[str] = None,
+                since: Optional[datetime] = None, until: Optional[datetime] = None,
+                limit: int = 50) -> List[GameState]:
+        """Archived games matching the filters, oldest first, at most `limit`
+
+        Filters run on the index; only batches holding a match are read.
+        Timestamps with a timezone are compared in UTC.
+        """
+        since = to_utc(since) if since is not None else None
+        until = to_utc(until) if until is not None else None
+        wanted: Dict[Tuple[str, int], set] = {}
+        found = 0
+        for entry in self.iter_index():
+            if player_id is not None and player_id not in entry["players"]:
+                continue
+            if status is not None and entry["status"] != status:
+                continue
+            if since is not None or until is not None:
+                updated_at = to_utc(datetime.fromisoformat(entry["updated_at"]))
+                if since is not None and updated_at < since:
+                    continue
+                if until is not None and updated_at >= until:
+                    continue
+            location = (entry["segment"], entry["offset"])
+            ids = wanted.setdefault(location, set())
+            if entry["game_id"] not in ids:
+                ids.add(entry["game_id"])
+                found += 1
+            if found >= limit:
+                break
+
+        games = []
+        for (segment, offset), ids in wanted.items():
+            for game_state in self.iter_segment(segment, offset):
+                if game_state.game_id in ids:
+                    games.append(game_state)
+                    ids.discard(game_state.game_id)
+                    if not ids:
+                        break
+        return games
+
+
+class GameLifecycleWorker:
+    """Background pass that abandons stalled games and archives finished ones
+
+    Each pass scans the games in Redis batch by batch. WAITING/ACTIVE games
+    idle for GAME_STALL_SECONDS are marked ABANDONED (pipelined
+    compare-and-set, so a concurrent move wins). With an archive directory,
+    FINISHED/ABANDONED games older than ARCHIVE_AFTER_SECONDS are appended
+    to the archive and then deleted from Redis and the listing indexes;
+    without one they are left to expire. The games kept are re-added to
+    their index (which also indexes games stored before the indexes
+    existed), and index entries of expired games are dropped at the end of
+    the pass. A Redis lock keeps replicas from running passes concurrently
+    and a file lock does the same for worker processes sharing ARCHIVE_DIR.
+    """
+
+    def __init__(self, archive_dir: Optional[str] = ARCHIVE_DIR,
+                 interval: float = LIFECYCLE_INTERVAL_SECONDS):
+        self.writer = ArchiveWriter(archive_dir) if archive_dir else None
+        self.interval = interval
+        self.passes = 0
+        self.abandoned = 0
+        self.archived = 0
+        self.unindexed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"passes": self.passes, "abandoned": self.abandoned, "archived": self.archived,
+                "unindexed": self.unindexed}
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Lifecycle pass failed: %s", e)
+
+    def _lock_archive_dir(self):
+        """Exclusive non-blocking flock on the archive directory, or None if held"""
+        os.makedirs(self.writer.archive_dir, exist_ok=True)
+        lock_file = open(os.path.join(self.writer.archive_dir, LOCK_FILE), "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    async def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """One pass; returns the games abandoned and archived and the expired index entries dropped"""
+        result = {"abandoned": 0, "archived": 0, "unindexed": 0}
+        lock = get_redis_client().lock(
+            LIFECYCLE_LOCK_KEY, timeout=max(60.0, self.interval * 2), thread_local=False
+        )
+        if not await lock.acquire(blocking=False):
+            return result
+
+        lock_file = None
+        try:
+            if self.writer is not None:
+                lock_file = await asyncio.to_thread(self._lock_archive_dir)
+                if lock_file is None:
+                    return result
+
+            now = now or datetime.utcnow()
+            stalled_before = now - timedelta(seconds=GAME_STALL_SECONDS)
+            archive_before = now - timedelta(seconds=ARCHIVE_AFTER_SECONDS)
+
+            async for records in iter_game_batches():
+                stalled = []
+                to_archive = []
+                indexes = {}
+                for blob, deltas in records:
+                    try:
+                        game_state = rebuild_game(blob, deltas)
+                    except Exception as e:
+                        logger.warning("Skipping invalid game data: %s", e)
+                        continue
+                    if game_state.status in (GameStatus.WAITING, GameStatus.ACTIVE):
+                        if game_state.updated_at >= stalled_before:
+                            indexes[game_state.game_id] = index_entry(game_state)
+                        else:
+                            stalled.append(game_state)
+                    elif self.writer is not None and game_state.updated_at < archive_before:
+                        to_archive.append(game_state)
+                    else:
+                        indexes[game_state.game_id] = index_entry(game_state)
+
+                result["abandoned"] += await self._abandon(stalled)
+                await index_games(indexes)
+                if to_archive:
+                    await asyncio.to_thread(self.writer.append, to_archive)
+                    await delete_games((game_state.game_id for game_state in to_archive),
+                                       index_keys=ALL_INDEX_KEYS)
+                    for game_state in to_archive:
+                        forget_game(game_state.game_id)
+                    game_archived(len(to_archive))
+                    result["archived"] += len(to_archive)
+
+            result["unindexed"] = await prune_expired(now)
+        finally:
+            if lock_file is not None:
+                lock_file.close()
+            try:
+                await lock.release()
+            except Exception:
+                # Expired while the pass ran; another replica may hold it now
+                pass
+
+        self.passes += 1
+        self.abandoned += result["abandoned"]
+        self.archived += result["archived"]
+        self.unindexed += result["unindexed"]
+        if any(result.values()):
+            logger.info("Lifecycle pass: %d abandoned, %d archived, %d expired unindexed",
+                        result["abandoned"], result["archived"], result["unindexed"],
+                        extra={"event": "lifecycle", **result})
+        return result
+
+    async def _abandon(self, games: List[GameState]) -> int:
+        """Mark stalled games ABANDONED unless they changed meanwhile; returns how many were"""
+        if not games:
+            return 0
+        stores = []
+        events = {}
+        indexes = {}
+        previous = {}
+        for game_state in games:
+            previous[game_state.game_id] = game_state.status
+            expected_version = game_state.version
+            game_state.status = GameStatus.ABANDONED
+            game_state.updated_at = datetime.utcnow()
+            game_state.version = expected_version + 1
+            stores.append((game_state.game_id, encode_game(game_state), expected_version))
+            events[game_state.game_id] = (build_delta(game_state, "abandoned"), True)
+            indexes[game_state.game_id] = index_entry(game_state, previous[game_state.game_id])
+
+        versions = await store_games_if_version(stores, events=events, indexes=indexes)
+
+        abandoned = 0
+        for game_state in games:
+            if versions.get(game_state.game_id) is None:
+                continue
+            forget_game(game_state.game_id)
+            await game_events.publish(game_state.game_id, events[game_state.game_id][0])
+            if previous[game_state.game_id] == GameStatus.WAITING:
+                await dequeue_waiting_game(
+                    matchmaking_queue(game_state.game_mode.value, game_state.board_size, game_state.win_length),
+                    game_state.game_id
+                )
+            game_finished("abandoned")
+            abandoned += 1
+        return abandoned
+
+
+game_archive = ArchiveReader()
+game_lifecycle = GameLifecycleWorker()
@@ -0,0 +1,218 @@
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+from config.logging_config import get_logger
+from config.redis_config import get_redis_client, get_game_if_changed, game_id_from_key, is_cluster
+from models.game_codec import decode_game, encode_game
+from models.game_models import GameState
+from services.game_events import rebuild_game
+
+logger = get_logger(__name__)
+
+# Max decoded games kept per process (0 disables the cache)
+GAME_CACHE_SIZE = int(os.getenv("GAME_CACHE_SIZE", "1000"))
+
+# "version": every read asks Redis whether the game changed (one small round trip,
+#            no blob transfer or decode when it did not).
+# "notify":  entries are dropped from Redis keyspace notifications and hits need
+#            no round trip. Falls back to "version" if notifications can't be enabled.
+GAME_CACHE_MODE = os.getenv("GAME_CACHE_MODE", "version")
+
+VERSION_KEY_PATTERN = "game_version:*"
+
+
+class CacheEntry(NamedTuple):
+    version: int
+    blob: bytes
+    state: GameState
+
+
+class GameCache:
+    """Bounded LRU of decoded games, each tagged with its stored version
+
+    Cached GameState objects are shared between requests and must not be
+    mutated; callers that update a game decode a private copy from the blob.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, game_id: str) -> Optional[CacheEntry]:
+        entry = self.entries.get(game_id)
+        if entry is not None:
+            self.entries.move_to_end(game_id)
+        return entry
+
+    def put(self, game_id: str, version: int, blob: bytes, state: GameState):
+        if self.max_size <= 0:
+            return
+        self.entries[game_id] = CacheEntry(version, blob, state)
+        self.entries.move_to_end(game_id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, game_id: str):
+        if self.entries.pop(game_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self.invalidations += len(self.entries)
+        self.entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+game_cache = GameCache(GAME_CACHE_SIZE)
+
+_notify_task: Optional[asyncio.Task] = None
+# True while the keyspace-notification listener is subscribed
+_notify_ready = False
+# Bumped on every notification, so a read that raced one is not cached
+_notify_epoch = 0
+
+
+def _notifications_active() -> bool:
+    return GAME_CACHE_MODE == "notify" and _notify_ready
+
+
+async def load_game(game_id: str, for_update: bool = False) -> Optional[GameState]:
+    """Get a game through the cache
+
+    With for_update=True the returned state is a private copy that the caller
+    may mutate; otherwise it may be shared with other requests.
+    """
+    entry = game_cache.get(game_id)
+
+    if entry is not None and _notifications_active():
+        game_cache.hits += 1
+        return decode_game(entry.blob) if for_update else entry.state
+
+    epoch = _notify_epoch
+    version, blob, deltas = await get_game_if_changed(game_id, entry.version if entry else None)
+    if blob is None and version >= 0 and entry is not None:
+        if not deltas:
+            game_cache.hits += 1
+            return decode_game(entry.blob) if for_update else entry.state
+        # Event-sourced: only the updates since the cached version came back
+        blob = entry.blob
+
+    game_cache.misses += 1
+    if blob is None:
+        game_cache.invalidate(game_id)
+        return None
+
+    if deltas:
+        game_state = rebuild_game(blob, deltas)
+        blob = encode_game(game_state)
+    else:
+        game_state = decode_game(blob)
+    if version >= 0 and epoch == _notify_epoch:
+        game_cache.put(game_id, version, blob, game_state)
+        if for_update:
+            return decode_game(blob)
+    return game_state
+
+
+def remember_game(game_state: GameState, blob: bytes):
+    """Cache a state this process just stored (it must not be mutated afterwards)"""
+    game_cache.put(game_state.game_id, game_state.version, blob, game_state)
+
+
+def forget_game(game_id: str):
+    """Drop a game, e.g. after a version conflict showed the entry is stale"""
+    game_cache.invalidate(game_id)
+
+
+async def _listen_for_invalidations():
+    """Drop cache entries when any replica changes or expires a game"""
+    global _notify_ready, _notify_epoch
+
+    client = get_redis_client()
+    pubsub = client.pubsub()
+    try:
+        await pubsub.psubscribe(f"__keyspace@*__:{VERSION_KEY_PATTERN}")
+        while True:
+            try:
+                _notify_ready = True
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    _notify_epoch += 1
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    game_id = game_id_from_key(channel.split("__:", 1)[-1])
+                    game_cache.invalidate(game_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Notifications may have been missed; nothing cached can be trusted
+                _notify_ready = False
+                game_cache.clear()
+                logger.warning("Game cache invalidation listener error: %s", e)
+                await asyncio.sleep(1)
+                await pubsub.psubscribe(f"__keyspace@*__:{VERSION_KEY_PATTERN}")
+    finally:
+        _notify_ready = False
+        await pubsub.close()
+
+
+async def init_game_cache():
+    """Start cross-replica invalidation when GAME_CACHE_MODE=notify"""
+    global _notify_task, GAME_CACHE_MODE
+
+    if GAME_CACHE_MODE != "notify" or GAME_CACHE_SIZE <= 0:
+        return
+    
+    if is_cluster():
+        # Keyspace notifications are per node; one subscription would miss most games
+        logger.info("Keyspace notifications are not used in cluster mode, using version checks")
+        GAME_CACHE_MODE = "version"
+        return
+
+    try:
+        # K = keyspace channel, $ = string commands, g = DEL, x = expiry;
+        # merged with whatever flags are already configured
+        client = get_redis_client()
+        current = (await client.config_get("notify-keyspace-events")).get(b"notify-keyspace-events", b"")
+        flags = set(current.decode() if isinstance(current, bytes) else current) | set("K$gx")
+        await client.config_set("notify-keyspace-events", "".join(sorted(flags)))
+    except Exception as e:
+        logger.warning("Keyspace notifications unavailable, using version checks: %s", e)
+        GAME_CACHE_MODE = "version"
+        return
+
+    _notify_task = asyncio.create_task(_listen_for_invalidations())
+    logger.info("Game cache using keyspace notifications for invalidation")
+
+
+async def close_game_cache():
+    """Stop the invalidation listener"""
+    global _notify_task
+
+    if _notify_task is not None:
+        _notify_task.cancel()
+        try:
+            await _notify_task
+        except asyncio.CancelledError:
+            pass
+        _notify_task = None
+    game_cache.clear()
@@ -0,0 +1,190 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from config.logging_config import get_logger
+from config.redis_config import get_pubsub_client
+from models.game_codec import decode_game
+from models.game_models import GameState, GameStatus, Player
+
+logger = get_logger(__name__)
+
+CHANNEL_PREFIX = "game_events:"
+
+# Undelivered messages kept per connection before it is told to resync
+SUBSCRIBER_QUEUE_SIZE = 64
+
+
+def game_channel(game_id: str) -> str:
+    """Redis pub/sub channel carrying one game's updates"""
+    return f"{CHANNEL_PREFIX}{game_id}"
+
+
+def build_delta(game_state: GameState, event: str,
+                previous_board: Optional[List[Optional[str]]] = None) -> str:
+    """Compact JSON update: new version, changed cells and turn/status fields"""
+    delta = {
+        "event": event,
+        "game_id": game_state.game_id,
+        "v": game_state.version,
+        "status": game_state.status.value,
+        "turn": game_state.current_turn,
+        "winner": game_state.winner,
+        "moves_count": game_state.moves_count,
+        "ts": game_state.updated_at.isoformat(),
+    }
+    if previous_board is not None:
+        delta["cells"] = [
+            [i, cell] for i, (old, cell) in enumerate(zip(previous_board, game_state.board))
+            if old != cell
+        ]
+    if event == "join":
+        delta["players"] = [player.model_dump(mode="json") for player in game_state.players]
+    return json.dumps(delta, separators=(",", ":"))
+
+
+def build_snapshot(game_state: GameState, event: str = "snapshot") -> str:
+    """Full state sent when a client connects; later deltas with v <= its version are stale"""
+    return json.dumps({
+        "event": event,
+        "game_id": game_state.game_id,
+        "v": game_state.version,
+        "game_state": game_state.model_dump(mode="json")
+    }, separators=(",", ":"))
+
+
+def apply_delta(game_state: GameState, delta: dict) -> bool:
+    """Apply a build_delta() update in place; deltas the state already has are skipped"""
+    if delta["v"] <= game_state.version:
+        return False
+    for cell, value in delta.get("cells", ()):
+        game_state.board[cell] = value
+    if "players" in delta:
+        game_state.players = [Player(**player) for player in delta["players"]]
+    game_state.status = GameStatus(delta["status"])
+    game_state.current_turn = delta["turn"]
+    game_state.winner = delta["winner"]
+    game_state.moves_count = delta["moves_count"]
+    if "ts" in delta:
+        game_state.updated_at = datetime.fromisoformat(delta["ts"])
+    game_state.version = delta["v"]
+    return True
+
+
+def rebuild_game(blob: bytes, deltas: Iterable[Union[bytes, str]] = ()) -> GameState:
+    """Stored blob (or event-sourced snapshot) plus the deltas stored after it"""
+    game_state = decode_game(blob)
+    for delta in deltas:
+        apply_delta(game_state, json.loads(delta))
+    return game_state
+
+
+RESYNC_MESSAGE = json.dumps({"event": "resync"})
+
+
+class GameEventHub:
+    """Fans game updates from Redis pub/sub out to this replica's connections
+
+    One pattern subscription per process receives every game's channel, and
+    each message is serialized once and handed to all local subscribers.
+    """
+
+    def __init__(self):
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.published = 0
+        self.delivered = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, game_id: str, message: str):
+        """Send an update to every replica (errors never fail the caller)"""
+        try:
+            await get_pubsub_client().publish(game_channel(game_id), message)
+            self.published += 1
+        except Exception as e:
+            logger.warning("Failed to publish update for %s: %s", game_id, e, extra={"game_id": game_id})
+
+    async def publish_many(self, messages: List[Tuple[str, str]]):
+        """Send (game_id, message) pairs in one pipelined round trip"""
+        if not messages:
+            return
+        try:
+            async with get_pubsub_client().pipeline(transaction=False) as pipe:
+                for game_id, message in messages:
+                    pipe.publish(game_channel(game_id), message)
+                await pipe.execute()
+            self.published += len(messages)
+        except Exception as e:
+            logger.warning("Failed to publish %d updates: %s", len(messages), e)
+
+    @asynccontextmanager
+    async def subscribe(self, game_id: str) -> AsyncIterator[asyncio.Queue]:
+        """Queue of JSON messages for one game, for the lifetime of a connection"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.setdefault(game_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self.subscribers.get(game_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self.subscribers[game_id]
+
+    def connection_count(self) -> int:
+        return sum(len(queues) for queues in self.subscribers.values())
+
+    def _dispatch(self, game_id: str, message: str):
+        for queue in self.subscribers.get(game_id, ()):
+            try:
+                queue.put_nowait(message)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                # Slow client: drop its backlog and make it refetch the state
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC_MESSAGE)
+
+    async def _listen(self):
+        while True:
+            pubsub = get_pubsub_client().pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"]
+                    data = message["data"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    self._dispatch(channel[len(CHANNEL_PREFIX):], data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Game event listener error: %s", e)
+                # Updates may have been missed while disconnected
+                for game_id in list(self.subscribers):
+                    self._dispatch(game_id, RESYNC_MESSAGE)
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+
+
+game_events = GameEventHub()
+
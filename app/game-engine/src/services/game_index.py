@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from config.logging_config import get_logger
+from config.redis_config import (
+    GAME_TTL_SECONDS, IndexEntry, existing_games, game_index_key, get_games, get_index_pages,
+    index_games, prune_game_index, unindex_games
+)
+from models.game_models import GameMode, GameState, GameStatus, GameSummary
+from services.game_events import rebuild_game
+
+logger = get_logger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+MILLISECOND = timedelta(milliseconds=1)
+
+# Every listing index, for cleanups that do not know which one a game is in
+ALL_INDEX_KEYS = [game_index_key(status.value, mode.value) for status in GameStatus for mode in GameMode]
+
+
+def index_score(created_at: datetime) -> int:
+    """Score of a game in its index: created_at in milliseconds since the Unix epoch"""
+    if created_at.tzinfo is not None:
+        created_at = created_at.replace(tzinfo=None) - created_at.utcoffset()
+    return (created_at - EPOCH) // MILLISECOND
+
+
+def index_entry(game_state: GameState, previous_status: Optional[GameStatus] = None) -> IndexEntry:
+    """Index entry for a game about to be written; `previous_status` is its status when it was read"""
+    key = game_index_key(game_state.status.value, game_state.game_mode.value)
+    previous_key = key
+    if previous_status is not None and previous_status != game_state.status:
+        previous_key = game_index_key(previous_status.value, game_state.game_mode.value)
+    return IndexEntry(key, previous_key, index_score(game_state.created_at))
+
+
+def encode_cursor(score: int, game_id: str) -> str:
+    return f"{score}:{game_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """(score, game id) of a cursor; ValueError if it was not handed out by list_games()"""
+    score, separator, game_id = cursor.partition(":")
+    if not separator or not game_id or not score.isdigit():
+        raise ValueError("Invalid cursor")
+    return int(score), game_id
+
+
+def summarize(game_state: GameState) -> GameSummary:
+    return GameSummary(
+        game_id=game_state.game_id,
+        status=game_state.status,
+        game_mode=game_state.game_mode,
+        board_size=game_state.board_size,
+        win_length=game_state.win_length,
+        players=game_state.players,
+        moves_count=game_state.moves_count,
+        winner=game_state.winner,
+        created_at=game_state.created_at,
+        updated_at=game_state.updated_at
+    )
+
+
+async def list_games(status: Optional[GameStatus] = None, game_mode: Optional[GameMode] = None,
+                     limit: int = 50, cursor: Optional[str] = None
+                     ) -> Tuple[List[GameState], Optional[str]]:
+    """A page of live games, newest first, and the cursor of the next page
+
+    Reads limit + 1 entries from each matching index (one per status and
+    mode), merges them and loads only the page's games. Entries whose game
+    expired (confirmed with EXISTS) or changed status are repaired on the
+    way, so a page may hold fewer than `limit` games even when more follow.
+    Read errors are raised and leave the indexes alone.
+    """
+    statuses = [status] if status else list(GameStatus)
+    modes = [game_mode] if game_mode else list(GameMode)
+    indexes = {game_index_key(s.value, m.value): (s, m) for s in statuses for m in modes}
+    max_score, after_id = decode_cursor(cursor) if cursor else (None, "")
+
+    entries = await get_index_pages(list(indexes), max_score, after_id, limit + 1)
+    entries.sort(reverse=True)
+    page = entries[:limit]
+    next_cursor = encode_cursor(*page[-1][:2]) if len(entries) > limit else None
+
+    records = await get_games(game_id for _, game_id, _ in page)
+    games = []
+    seen = set()
+    stale: Dict[str, List[str]] = {}
+    moved: Dict[str, IndexEntry] = {}
+    missing = [(game_id, key) for _, game_id, key in page if game_id not in records]
+    if missing:
+        try:
+            # Only games whose key is really gone expired since the last prune
+            alive = await existing_games(game_id for game_id, _ in missing)
+        except Exception as e:
+            logger.warning("Failed to check expired games: %s", e)
+        else:
+            for game_id, key in missing:
+                if game_id not in alive:
+                    stale.setdefault(key, []).append(game_id)
+    for score, game_id, key in page:
+        record = records.get(game_id)
+        if record is None:
+            continue
+        try:
+            game_state = rebuild_game(*record)
+        except Exception as e:
+            logger.warning("Skipping invalid game data: %s", e)
+            continue
+        if (game_state.status, game_state.game_mode) != indexes[key]:
+            # Left behind by a write whose index update was lost (cluster mode)
+            stale.setdefault(key, []).append(game_id)
+            moved[game_id] = index_entry(game_state)
+            continue
+        if game_id not in seen:
+            seen.add(game_id)
+            games.append(game_state)
+
+    if stale:
+        try:
+            for key, game_ids in stale.items():
+                await unindex_games(key, game_ids)
+            await index_games(moved)
+        except Exception as e:
+            logger.warning("Failed to repair game indexes: %s", e)
+
+    return games, next_cursor
+
+
+async def prune_expired(now: Optional[datetime] = None) -> int:
+    """Drop the index entries of games that expired from Redis"""
+    created_before = (now or datetime.utcnow()) - timedelta(seconds=GAME_TTL_SECONDS)
+    return await prune_game_index(ALL_INDEX_KEYS, index_score(created_before))
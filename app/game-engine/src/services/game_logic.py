@@ -1,21 +1,113 @@
-import random
+from functools import lru_cache
 from typing import List, Optional, Tuple
-from models.game_models import GameState, Player, PlayerSymbol, GameStatus, GameMode
+from models.game_models import GameState, Player, PlayerSymbol, GameStatus, GameMode, AIDifficulty
+from services.board import CELL_BITS, BoardGeometry, popcount
+from config.metrics import ENGINE_LATENCY, timed
+from services.ai_logic import TicTacToeAI
 from datetime import datetime
 
 class TicTacToeLogic:
-    """Simple game logic for Tic-Tac-Toe"""
-    
+    """Simple game logic for Tic-Tac-Toe
+
+    Internally the board is a pair of bitboards (one int mask per symbol, bit i
+    set when cell i is taken). The list form is only built at the API/Redis
+    boundary via to_bitboards()/from_bitboards(); a move sets its one list
+    cell rather than rebuilding the list. Board size and win length come from
+    a BoardGeometry; cell_count defaults describe the classic 3x3.
+    """
+
     WINNING_COMBINATIONS = [
         [0, 1, 2], [3, 4, 5], [6, 7, 8],  # Rows
         [0, 3, 6], [1, 4, 7], [2, 5, 8],  # Columns
         [0, 4, 8], [2, 4, 6]              # Diagonals
     ]
 
+    @staticmethod
+    def geometry_for(board: List[Optional[str]], win_length: Optional[int] = None) -> BoardGeometry:
+        """Geometry for a square list board (default win length as in create_game)"""
+        return TicTacToeLogic._geometry_for_cells(len(board), win_length)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _geometry_for_cells(cell_count: int, win_length: Optional[int]) -> BoardGeometry:
+        size = int(round(cell_count ** 0.5))
+        return BoardGeometry.get(size, win_length or GameEngine.default_win_length(size))
+
+    @staticmethod
+    def to_bitboards(board: List[Optional[str]]) -> Tuple[int, int]:
+        """Convert list board into (x_mask, o_mask)"""
+        x_mask = 0
+        o_mask = 0
+        for bit, cell in zip(CELL_BITS, board):
+            if cell is None:
+                continue
+            if cell == "X":
+                x_mask |= bit
+            elif cell == "O":
+                o_mask |= bit
+        return x_mask, o_mask
+
+    @staticmethod
+    def from_bitboards(x_mask: int, o_mask: int, cell_count: int = 9) -> List[Optional[str]]:
+        """Convert (x_mask, o_mask) back into the list board"""
+        return [
+            "X" if (x_mask >> i) & 1 else "O" if (o_mask >> i) & 1 else None
+            for i in range(cell_count)
+        ]
+
+    @staticmethod
+    def popcount(mask: int) -> int:
+        """Number of set bits (int.bit_count needs Python 3.10)"""
+        return popcount(mask)
+
+    @staticmethod
+    def is_free(x_mask: int, o_mask: int, position: int, cell_count: int = 9) -> bool:
+        """Check if a move is valid on bitboards"""
+        return (0 <= position < cell_count
+                and not ((x_mask | o_mask) >> position) & 1)
+
+    @staticmethod
+    def bitboard_winner(x_mask: int, o_mask: int,
+                        geometry: Optional[BoardGeometry] = None) -> Optional[str]:
+        """Check for winner on bitboards (full scan)"""
+        geometry = geometry or BoardGeometry.get()
+        for win_mask in geometry.win_masks:
+            if x_mask & win_mask == win_mask:
+                return "X"
+            if o_mask & win_mask == win_mask:
+                return "O"
+
+        if geometry.is_full(x_mask | o_mask):
+            return "draw"
+
+        return None
+
+    @staticmethod
+    def move_winner(x_mask: int, o_mask: int, position: int,
+                    geometry: Optional[BoardGeometry] = None) -> Optional[str]:
+        """Check for winner after a move, looking only at lines through `position`"""
+        geometry = geometry or BoardGeometry.get()
+        if (x_mask >> position) & 1:
+            if geometry.wins_at(x_mask, position):
+                return "X"
+        elif geometry.wins_at(o_mask, position):
+            return "O"
+
+        if geometry.is_full(x_mask | o_mask):
+            return "draw"
+
+        return None
+
+    @staticmethod
+    def free_cells(x_mask: int, o_mask: int, cell_count: int = 9) -> List[int]:
+        """List empty cell indexes"""
+        empty = ~(x_mask | o_mask) & ((1 << cell_count) - 1)
+        return [i for i in range(cell_count) if (empty >> i) & 1]
+
     @staticmethod
     def is_valid_move(board: List[Optional[str]], position: int) -> bool:
         """Check if a move is valid"""
-        return 0 <= position <= 8 and board[position] is None
+        return 0 <= position < len(board) and board[position] is None
 
     @staticmethod
     def make_move(board: List[Optional[str]], position: int, symbol: str) -> List[Optional[str]]:
@@ -25,31 +117,46 @@ class TicTacToeLogic:
         return new_board
 
     @staticmethod
-    def check_winner(board: List[Optional[str]]) -> Optional[str]:
+    def check_winner(board: List[Optional[str]], win_length: Optional[int] = None) -> Optional[str]:
         """Check for winner"""
-        for combo in TicTacToeLogic.WINNING_COMBINATIONS:
-            if (board[combo[0]] == board[combo[1]] == board[combo[2]] 
-                and board[combo[0]] is not None):
-                return board[combo[0]]
-        
-        if all(cell is not None for cell in board):
-            return "draw"
-        
-        return None
+        return TicTacToeLogic.bitboard_winner(*TicTacToeLogic.to_bitboards(board),
+                                              geometry=TicTacToeLogic.geometry_for(board, win_length))
+
+    @staticmethod
+    def ai_move(board: List[Optional[str]], symbol: str = "O",
+                difficulty: AIDifficulty = AIDifficulty.RANDOM,
+                win_length: Optional[int] = None) -> int:
+        """AI move for the given symbol and difficulty"""
+        return TicTacToeLogic.bitboard_ai_move(*TicTacToeLogic.to_bitboards(board),
+                                               symbol=symbol, difficulty=difficulty,
+                                               geometry=TicTacToeLogic.geometry_for(board, win_length))
 
     @staticmethod
-    def ai_move(board: List[Optional[str]]) -> int:
-        """Simple AI - random move"""
-        available = [i for i, cell in enumerate(board) if cell is None]
-        return random.choice(available) if available else -1
+    @timed(ENGINE_LATENCY, "ai_move")
+    def bitboard_ai_move(x_mask: int, o_mask: int, symbol: str = "O",
+                         difficulty: AIDifficulty = AIDifficulty.RANDOM,
+                         geometry: Optional[BoardGeometry] = None,
+                         time_budget: Optional[float] = None) -> int:
+        """AI move on bitboards"""
+        own, opp = (x_mask, o_mask) if symbol == "X" else (o_mask, x_mask)
+        return TicTacToeAI.choose_move(own, opp, geometry or BoardGeometry.get(),
+                                       difficulty, time_budget)
 
 
 class GameEngine:
     """Simple game management"""
     
+    @staticmethod
+    def default_win_length(board_size: int) -> int:
+        """k-in-a-row used when a game does not specify one"""
+        return min(board_size, 5)
+    
     @staticmethod
     def create_game(game_id: str, creator_id: str, creator_username: str, 
-                   game_mode: GameMode) -> GameState:
+                   game_mode: GameMode,
+                   ai_difficulty: AIDifficulty = AIDifficulty.RANDOM,
+                   board_size: int = 3,
+                   win_length: Optional[int] = None) -> GameState:
         """Create a new game"""
         creator = Player(
             user_id=creator_id,
@@ -73,11 +180,14 @@ class GameEngine:
         
         return GameState(
             game_id=game_id,
-            board=[None] * 9,
+            board=[None] * (board_size * board_size),
+            board_size=board_size,
+            win_length=win_length or GameEngine.default_win_length(board_size),
             players=players,
             current_turn=creator_id,
             status=status,
             game_mode=game_mode,
+            ai_difficulty=ai_difficulty,
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow()
         )
@@ -103,12 +213,21 @@ class GameEngine:
         return True, "Joined successfully"
     
     @staticmethod
-    def make_move(game_state: GameState, player_id: str, 
-                 position: int) -> Tuple[bool, str, Optional[dict]]:
-        """Process a move"""
-        if (game_state.status != GameStatus.ACTIVE or 
-            game_state.current_turn != player_id or
-            not TicTacToeLogic.is_valid_move(game_state.board, position)):
+    @timed(ENGINE_LATENCY, "make_move")
+    def make_move(game_state: GameState, player_id: str, position: int,
+                  ai_reply: bool = True) -> Tuple[bool, str, Optional[dict]]:
+        """Process a move
+
+        With ai_reply=False the AI opponent's reply is left to the caller
+        (see ai_opponent() and apply_ai_move()), so it can be computed off
+        the event loop.
+        """
+        if game_state.status != GameStatus.ACTIVE or game_state.current_turn != player_id:
+            return False, "Invalid move", None
+        
+        geometry = BoardGeometry.get(game_state.board_size, game_state.win_length)
+        x_mask, o_mask = TicTacToeLogic.to_bitboards(game_state.board)
+        if not TicTacToeLogic.is_free(x_mask, o_mask, position, geometry.cell_count):
             return False, "Invalid move", None
         
         player = next((p for p in game_state.players if p.user_id == player_id), None)
@@ -116,12 +235,12 @@ class GameEngine:
             return False, "Player not found", None
         
         # Make player move
-        game_state.board = TicTacToeLogic.make_move(game_state.board, position, player.symbol.value)
+        x_mask, o_mask = GameEngine._place(game_state, position, player.symbol.value, x_mask, o_mask)
         game_state.moves_count += 1
         game_state.updated_at = datetime.utcnow()
         
         # Check winner
-        winner = TicTacToeLogic.check_winner(game_state.board)
+        winner = TicTacToeLogic.move_winner(x_mask, o_mask, position, geometry)
         if winner:
             game_state.status = GameStatus.FINISHED
             game_state.winner = winner
@@ -130,20 +249,68 @@ class GameEngine:
         # AI move if vs AI
         other_player = next((p for p in game_state.players if p.user_id != player_id), None)
         if other_player and other_player.is_ai:
-            ai_position = TicTacToeLogic.ai_move(game_state.board)
-            if ai_position >= 0:
-                game_state.board = TicTacToeLogic.make_move(game_state.board, ai_position, other_player.symbol.value)
-                game_state.moves_count += 1
-                
-                ai_winner = TicTacToeLogic.check_winner(game_state.board)
-                if ai_winner:
-                    game_state.status = GameStatus.FINISHED
-                    game_state.winner = ai_winner
-                    return True, f"Game over! Winner: {ai_winner}", {"position": ai_position}
-                
-                return True, "Move successful", {"position": ai_position}
+            if ai_reply:
+                ai_position = TicTacToeLogic.bitboard_ai_move(
+                    x_mask, o_mask,
+                    symbol=other_player.symbol.value,
+                    difficulty=game_state.ai_difficulty,
+                    geometry=geometry
+                )
+                message, ai_move_data = GameEngine._place_ai_move(
+                    game_state, other_player, ai_position, x_mask, o_mask, geometry
+                )
+                return True, message, ai_move_data
         else:
             # Switch turns for human vs human
             game_state.current_turn = other_player.user_id if other_player else player_id
         
-        return True, "Move successful", None
\ No newline at end of file
+        return True, "Move successful", None
+
+    @staticmethod
+    def _place(game_state: GameState, position: int, symbol: str,
+               x_mask: int, o_mask: int) -> Tuple[int, int]:
+        """Put `symbol` at `position` on the game's list board and on the masks"""
+        if symbol == "X":
+            x_mask |= 1 << position
+        else:
+            o_mask |= 1 << position
+        board = game_state.board.copy()
+        board[position] = symbol
+        game_state.board = board
+        return x_mask, o_mask
+
+    @staticmethod
+    def ai_opponent(game_state: GameState) -> Optional[Player]:
+        """AI player owed a reply after a human move made with ai_reply=False"""
+        if game_state.status != GameStatus.ACTIVE or game_state.game_mode != GameMode.VS_AI:
+            return None
+        return next((p for p in game_state.players if p.is_ai), None)
+
+    @staticmethod
+    @timed(ENGINE_LATENCY, "apply_ai_move")
+    def apply_ai_move(game_state: GameState, ai_player: Player,
+                      ai_position: int) -> Tuple[str, Optional[dict]]:
+        """Play an AI reply computed elsewhere; returns (message, ai_move_data)"""
+        geometry = BoardGeometry.get(game_state.board_size, game_state.win_length)
+        x_mask, o_mask = TicTacToeLogic.to_bitboards(game_state.board)
+        if ai_position >= 0 and not TicTacToeLogic.is_free(x_mask, o_mask, ai_position, geometry.cell_count):
+            raise ValueError(f"AI move {ai_position} is not a free cell")
+        return GameEngine._place_ai_move(game_state, ai_player, ai_position, x_mask, o_mask, geometry)
+
+    @staticmethod
+    def _place_ai_move(game_state: GameState, ai_player: Player, ai_position: int,
+                       x_mask: int, o_mask: int, geometry: BoardGeometry) -> Tuple[str, Optional[dict]]:
+        ai_move_data = None
+        if ai_position >= 0:
+            x_mask, o_mask = GameEngine._place(game_state, ai_position, ai_player.symbol.value,
+                                               x_mask, o_mask)
+            game_state.moves_count += 1
+            ai_move_data = {"position": ai_position}
+            
+            ai_winner = TicTacToeLogic.move_winner(x_mask, o_mask, ai_position, geometry)
+            if ai_winner:
+                game_state.status = GameStatus.FINISHED
+                game_state.winner = ai_winner
+                return f"Game over! Winner: {ai_winner}", ai_move_data
+        
+        return "Move successful", ai_move_data
\ No newline at end of file
@@ -0,0 +1,138 @@
+import os
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import Response
+
+from models.game_models import GameResponse, GameState
+
+try:
+    import msgpack
+except ImportError:
+    # Optional: without it every client gets JSON
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+# Encoded game responses kept per process, so pollers of one game share a body
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", os.getenv("GAME_CACHE_SIZE", "1000")))
+
+# Clients may keep a response but must revalidate it (If-None-Match) before use
+CACHE_CONTROL = "no-cache"
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Encoding for an Accept header: "msgpack" when preferred and available, else "json" """
+    if not accept or msgpack is None:
+        return "json"
+    msgpack_q = json_q = 0.0
+    for media_range in accept.split(","):
+        media_type, *params = media_range.split(";")
+        media_type = media_type.strip().lower()
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+            json_q = max(json_q, q)
+    return "msgpack" if msgpack_q > 0 and msgpack_q >= json_q else "json"
+
+
+def game_etag(game_state: GameState, encoding: str) -> str:
+    """Strong ETag of one encoding of a game; changes with every stored update
+
+    The version is bumped by every write; updated_at tells apart a game that
+    was deleted and created again under the same id.
+    """
+    return f'"{game_state.version}-{game_state.updated_at:%Y%m%d%H%M%S%f}-{encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for it)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class ResponseCache:
+    """Bounded LRU of encoded game responses, keyed by game, encoding and message
+
+    An entry is only served for the ETag it was encoded for, so a stale one
+    is simply replaced by the next request.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: "OrderedDict[Tuple[str, str], Tuple[str, bytes]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key: Tuple[str, str], etag: str) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != etag:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Tuple[str, str], etag: str, body: bytes):
+        if self.max_size <= 0:
+            return
+        self.entries[key] = (etag, body)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified
+        }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+
+
+def _encode(response: GameResponse, encoding: str) -> bytes:
+    if encoding == "msgpack":
+        return msgpack.packb(response.model_dump(mode="json"))
+    # Serialized by pydantic-core directly: no response_model re-validation or jsonable_encoder
+    return response.model_dump_json().encode()
+
+
+def game_response(game_state: GameState, message: str, accept: Optional[str] = None,
+                  if_none_match: Optional[str] = None) -> Response:
+    """GameResponse for a GET, with an ETag and in the encoding the client accepts
+
+    A request whose If-None-Match holds the current ETag gets 304 with no
+    body and nothing is serialized.
+    """
+    encoding = negotiate(accept)
+    etag = game_etag(game_state, encoding)
+    headers = {"ETag": etag, "Vary": "Accept", "Cache-Control": CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+
+    key = (game_state.game_id, f"{encoding}:{message}")
+    body = response_cache.get(key, etag)
+    if body is None:
+        body = _encode(GameResponse(success=True, message=message, game_state=game_state), encoding)
+        response_cache.put(key, etag, body)
+    media_type = MSGPACK_MEDIA_TYPE if encoding == "msgpack" else JSON_MEDIA_TYPE
+    return Response(content=body, media_type=media_type, headers=headers)
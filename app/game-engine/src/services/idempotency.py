@@ -0,0 +1,57 @@
+import hashlib
+import json
+import uuid
+from typing import Optional, Tuple
+
+from pydantic import BaseModel
+
+# Longest Idempotency-Key header value accepted
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+# Namespace of the game ids derived from a create request's key
+CREATE_GAME_NAMESPACE = uuid.UUID("0d3c9a52-5b7e-4f0a-9a43-6f1e2c8b7d10")
+
+
+class IdempotencyKeyReused(Exception):
+    """Raised when an Idempotency-Key comes back with a different request"""
+
+
+class IdempotentRequest:
+    """A request sent with an Idempotency-Key header
+
+    Its record, a fingerprint of the request plus the response it got, is
+    stored in the game's idempotency hash by the same script that applies
+    the state change. A retry is answered from the record without running
+    the game engine or writing the game again.
+    """
+
+    def __init__(self, key: str, scope: str, request: BaseModel):
+        # Scope is the route and caller ("move:<player_id>"), so keys of
+        # different players or routes never collide
+        self.field = f"{scope}:{key}"
+        self.fingerprint = hashlib.sha256(request.model_dump_json().encode()).hexdigest()
+
+    @staticmethod
+    def from_header(key: Optional[str], scope: str, request: BaseModel) -> Optional["IdempotentRequest"]:
+        """None without a header; ValueError for an empty or oversized key"""
+        if key is None:
+            return None
+        if not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            raise ValueError(f"Idempotency-Key must be 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters")
+        return IdempotentRequest(key, scope, request)
+
+    def game_id(self) -> str:
+        """Id for the game a create request makes: a retry looks in the same game's records"""
+        return str(uuid.uuid5(CREATE_GAME_NAMESPACE, self.field))
+
+    def entry(self, response: BaseModel) -> Tuple[str, str]:
+        """(field, record) to store with the state change"""
+        record = {"request": self.fingerprint, "response": response.model_dump(mode="json")}
+        return self.field, json.dumps(record, separators=(",", ":"))
+
+    def stored_response(self, record: bytes) -> dict:
+        """Response body sent the first time, checked against this request"""
+        record = json.loads(record)
+        if record["request"] != self.fingerprint:
+            raise IdempotencyKeyReused("Idempotency-Key was already used for a different request")
+        return record["response"]
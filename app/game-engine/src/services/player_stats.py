@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config.logging_config import get_logger
+from config.redis_config import (
+    PlayerResult, close_redis, get_redis_client, init_redis, iter_game_batches, record_results
+)
+from models.game_models import GameMode, GameState, GameStatus
+from services.game_archive import ARCHIVE_DIR, ArchiveReader, to_utc
+from services.game_events import rebuild_game
+
+logger = get_logger(__name__)
+
+# Leaderboard points per outcome; only vs_human games are ranked
+LEADERBOARD_POINTS = {"wins": 3, "draws": 1, "losses": 0}
+
+# Set by the backfill job so it cannot add the same games twice
+BACKFILL_MARKER_KEY = "player_stats_backfill"
+
+
+def game_results(game_state: GameState) -> List[PlayerResult]:
+    """Each human player's outcome of a FINISHED game (AI players are not tracked)"""
+    if game_state.status != GameStatus.FINISHED or not game_state.winner:
+        return []
+    ranked = game_state.game_mode == GameMode.VS_HUMAN
+    results = []
+    for player in game_state.players:
+        if player.is_ai:
+            continue
+        if game_state.winner == "draw":
+            outcome = "draws"
+        elif game_state.winner == player.symbol.value:
+            outcome = "wins"
+        else:
+            outcome = "losses"
+        results.append(PlayerResult(player.user_id, player.username, outcome,
+                                    LEADERBOARD_POINTS[outcome] if ranked else None))
+    return results
+
+
+async def backfill(before: datetime, archive: Optional[ArchiveReader] = None,
+                   force: bool = False) -> Dict[str, int]:
+    """Count games that finished before `before` into the stats and leaderboard
+
+    Games finished after the engine started recording results are already
+    counted, so `before` must be when that version was rolled out. Counters
+    are incremented, not overwritten, so live updates made meanwhile are kept.
+    Reads the games still in Redis and, if given, the archive. A `before`
+    with a timezone is converted to UTC, the zone games are stored in.
+    """
+    before = to_utc(before)
+    client = get_redis_client()
+    if not await client.set(BACKFILL_MARKER_KEY, before.isoformat(), nx=True) and not force:
+        raise RuntimeError(f"Backfill already ran (remove the {BACKFILL_MARKER_KEY} key to rerun)")
+
+    seen = set()
+    counts = {"games": 0, "results": 0}
+
+    async def count(games: List[GameState]):
+        results = []
+        for game_state in games:
+            if game_state.game_id in seen or game_state.updated_at >= before:
+                continue
+            seen.add(game_state.game_id)
+            finished = game_results(game_state)
+            if finished:
+                counts["games"] += 1
+                results.extend(finished)
+        await record_results(results)
+        counts["results"] += len(results)
+
+    async for batch in iter_game_batches():
+        await count([rebuild_game(blob, deltas) for blob, deltas in batch])
+
+    if archive is not None:
+        batch = []
+        for game_state in archive.iter_games():
+            batch.append(game_state)
+            if len(batch) >= 1000:
+                await count(batch)
+                batch = []
+        await count(batch)
+
+    logger.info("Player stats backfilled from %d games", counts["games"],
+                extra={"event": "stats_backfill", **counts})
+    return counts
+
+
+def main(argv: Optional[List[str]] = None):
+    """python -m services.player_stats --before 2026-10-16T12:00:00 [--archive-dir DIR | --no-archive] [--force]"""
+    parser = argparse.ArgumentParser(description="One-off backfill of per-user stats and the leaderboard")
+    parser.add_argument("--before", required=True, type=datetime.fromisoformat,
+                        help="UTC time the engine started recording results (games finished later are skipped)")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR, help="Archive whose games are counted too")
+    parser.add_argument("--no-archive", action="store_true", help="Only count games still in Redis")
+    parser.add_argument("--force", action="store_true", help="Run even if a backfill already ran")
+    args = parser.parse_args(argv)
+
+    archive = None if args.no_archive or not args.archive_dir else ArchiveReader(args.archive_dir)
+
+    async def run():
+        await init_redis()
+        try:
+            counts = await backfill(args.before, archive, args.force)
+        finally:
+            await close_redis()
+        print(f"{counts['games']:,} finished games, {counts['results']:,} player results recorded")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
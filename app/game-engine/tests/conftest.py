@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Tests import the service the same way the Dockerfile runs it
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
@@ -0,0 +1,92 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from services.ai_logic import TicTacToeAI
+from services.arena import (
+    EMPTY, O, X, ArenaGeometry, greedy_moves, perfect_moves, play_batch, run_match
+)
+
+
+def random_positions(count, seed=0):
+    """Reachable-looking 3x3 positions with X to move (equal stone counts), no winner"""
+    arena = ArenaGeometry.get()
+    rng = np.random.default_rng(seed)
+    positions = []
+    while len(positions) < count:
+        board = np.zeros(9, dtype=np.int8)
+        stones = rng.integers(0, 4)
+        cells = rng.permutation(9)[:2 * stones]
+        board[cells[:stones]] = X
+        board[cells[stones:]] = O
+        boards = board[None, :]
+        if not arena.has_won(boards, X)[0] and not arena.has_won(boards, O)[0]:
+            positions.append(board)
+    return np.array(positions)
+
+
+def masks(board, player):
+    own = sum(1 << i for i, cell in enumerate(board) if cell == player)
+    opp = sum(1 << i for i, cell in enumerate(board) if cell not in (EMPTY, player))
+    return own, opp
+
+
+def test_batch_counts_add_up():
+    result = play_batch("random", "random", 500, seed=1)
+    assert result.games == 500
+    assert result.x_wins + result.o_wins + result.draws == 500
+
+
+def test_batch_is_reproducible_with_a_seed():
+    assert play_batch("random", "greedy", 300, seed=7) == play_batch("random", "greedy", 300, seed=7)
+
+
+def test_perfect_play_always_draws_itself():
+    result = play_batch("perfect", "perfect", 200, seed=2)
+    assert result.draws == 200
+
+
+@pytest.mark.parametrize("opponent", ["random", "greedy"])
+def test_perfect_never_loses(opponent):
+    result = run_match("perfect", opponent, 2000, seed=3)
+    assert result.losses == 0
+    assert result.wins + result.draws == 2000
+
+
+def test_greedy_beats_random():
+    result = run_match("greedy", "random", 2000, seed=4)
+    assert result.win_rate > 0.6
+    assert result.loss_rate < 0.1
+
+
+def test_match_swaps_sides_and_batches():
+    result = run_match("greedy", "random", 1001, seed=5, batch_size=100)
+    assert result.games == 1001
+    assert result.wins + result.draws + result.losses == 1001
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        run_match("greedy", "minimax", 10)
+
+
+def test_greedy_moves_match_engine_greedy():
+    arena = ArenaGeometry.get()
+    boards = random_positions(300)
+    moves = greedy_moves(boards, X, arena, np.random.default_rng(0))
+    for board, move in zip(boards, moves):
+        assert move == TicTacToeAI.greedy_move(*masks(board, X))
+
+
+def test_perfect_moves_match_engine_perfect():
+    arena = ArenaGeometry.get()
+    boards = random_positions(300, seed=1)
+    moves = perfect_moves(boards, X, arena, np.random.default_rng(0))
+    for board, move in zip(boards, moves):
+        assert move == TicTacToeAI.perfect_move(*masks(board, X))
+
+
+def test_larger_board():
+    result = play_batch("greedy", "random", 200, board_size=5, win_length=4, seed=6)
+    assert result.x_wins + result.o_wins + result.draws == 200
+    assert result.x_wins > result.o_wins
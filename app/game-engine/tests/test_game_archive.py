@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta, timezone
+
+from models.game_models import GameMode, GameStatus
+from services.game_archive import ArchiveReader, ArchiveWriter
+from services.game_logic import GameEngine
+
+
+def finished_game(game_id, updated_at):
+    game_state = GameEngine.create_game(game_id, "p1", "Alice", GameMode.VS_HUMAN)
+    GameEngine.join_game(game_state, "p2", "Bob")
+    game_state.status = GameStatus.FINISHED
+    game_state.updated_at = updated_at
+    return game_state
+
+
+def test_history_round_trip(tmp_path):
+    games = [finished_game(f"game-{i}", datetime(2026, 1, 1, i)) for i in range(3)]
+    ArchiveWriter(str(tmp_path)).append(games)
+    reader = ArchiveReader(str(tmp_path))
+    assert [g.game_id for g in reader.history(player_id="p2")] == ["game-0", "game-1", "game-2"]
+    assert reader.get_game("game-1").updated_at == datetime(2026, 1, 1, 1)
+
+
+def test_history_compares_aware_bounds_in_utc(tmp_path):
+    games = [finished_game(f"game-{i}", datetime(2026, 1, 1, i)) for i in range(4)]
+    ArchiveWriter(str(tmp_path)).append(games)
+    plus_two = timezone(timedelta(hours=2))
+    history = ArchiveReader(str(tmp_path)).history(
+        since=datetime(2026, 1, 1, 3, tzinfo=plus_two),   # 01:00 UTC
+        until=datetime(2026, 1, 1, 3, tzinfo=timezone.utc)
+    )
+    assert [g.game_id for g in history] == ["game-1", "game-2"]
+
+
+def test_no_archive_dir_is_empty():
+    reader = ArchiveReader(None)
+    assert reader.history() == []
+    assert reader.get_game("game-1") is None
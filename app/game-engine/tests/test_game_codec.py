@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models.game_codec import (
+    GameCodecError, decode_game, encode_game_binary, encode_game_json, is_legacy_blob
+)
+from models.game_models import AIDifficulty, GameMode, GameStatus
+from services.game_logic import GameEngine
+
+
+def human_game(board_size=3, win_length=None):
+    game_state = GameEngine.create_game("game-1", "p1", "Alice", GameMode.VS_HUMAN,
+                                        board_size=board_size, win_length=win_length)
+    GameEngine.join_game(game_state, "p2", "Bob")
+    return game_state
+
+
+def assert_same_game(decoded, original):
+    assert decoded.model_dump() == original.model_dump()
+
+
+def test_binary_round_trip_new_game():
+    game_state = GameEngine.create_game("game-1", "p1", "Alice", GameMode.VS_AI,
+                                        ai_difficulty=AIDifficulty.PERFECT)
+    blob = encode_game_binary(game_state)
+    assert not is_legacy_blob(blob)
+    assert_same_game(decode_game(blob), game_state)
+
+
+def test_binary_round_trip_mid_game():
+    game_state = human_game()
+    for player, position in (("p1", 4), ("p2", 0), ("p1", 8)):
+        GameEngine.make_move(game_state, player, position)
+    game_state.version = 7
+    assert_same_game(decode_game(encode_game_binary(game_state)), game_state)
+
+
+@pytest.mark.parametrize("winner", ["X", "O", "draw", "p2", None])
+def test_binary_round_trip_winner(winner):
+    game_state = human_game()
+    game_state.status = GameStatus.FINISHED if winner else GameStatus.ABANDONED
+    game_state.winner = winner
+    game_state.current_turn = None
+    assert_same_game(decode_game(encode_game_binary(game_state)), game_state)
+
+
+def test_binary_round_trip_large_board():
+    game_state = human_game(board_size=19, win_length=5)
+    GameEngine.make_move(game_state, "p1", 360)
+    GameEngine.make_move(game_state, "p2", 0)
+    decoded = decode_game(encode_game_binary(game_state))
+    assert_same_game(decoded, game_state)
+    assert decoded.board[360] == "X" and decoded.board[0] == "O"
+
+
+def test_unicode_names_and_turn_outside_players():
+    game_state = human_game()
+    game_state.players[1].username = "Zoë 🎲"
+    game_state.current_turn = "someone-else"
+    assert_same_game(decode_game(encode_game_binary(game_state)), game_state)
+
+
+def test_timestamps_keep_microseconds_and_drop_timezone():
+    game_state = human_game()
+    game_state.created_at = datetime(2024, 2, 29, 23, 59, 59, 123456)
+    game_state.updated_at = datetime(2024, 3, 1, 1, 0, 0, 1, tzinfo=timezone(timedelta(hours=1)))
+    decoded = decode_game(encode_game_binary(game_state))
+    assert decoded.created_at == game_state.created_at
+    assert decoded.updated_at == datetime(2024, 3, 1, 0, 0, 0, 1)
+
+
+def test_legacy_json_still_decodes():
+    game_state = human_game()
+    GameEngine.make_move(game_state, "p1", 4)
+    blob = encode_game_json(game_state)
+    assert is_legacy_blob(blob)
+    assert_same_game(decode_game(blob), game_state)
+    assert_same_game(decode_game(blob.decode()), game_state)
+
+
+def test_binary_is_smaller_than_json():
+    game_state = human_game()
+    assert len(encode_game_binary(game_state)) * 3 < len(encode_game_json(game_state))
+
+
+@pytest.mark.parametrize("cut", [1, 5, 20, -3])
+def test_truncated_record(cut):
+    blob = encode_game_binary(human_game())
+    with pytest.raises(GameCodecError):
+        decode_game(blob[:cut])
+
+
+def test_unknown_codec_version():
+    blob = bytearray(encode_game_binary(human_game()))
+    blob[2] = 99
+    with pytest.raises(GameCodecError):
+        decode_game(bytes(blob))
+
+
+def test_corrupt_byte_raises_codec_error():
+    # Every byte after the magic set to an out-of-range value
+    blob = encode_game_binary(human_game())
+    for index in range(1, len(blob)):
+        for value in (0x00, 0x7F, 0xFF):
+            corrupt = bytearray(blob)
+            corrupt[index] = value
+            try:
+                decode_game(bytes(corrupt))
+            except GameCodecError:
+                pass
@@ -0,0 +1,201 @@
+import random
+import time
+
+import pytest
+
+from models.game_models import AIDifficulty, GameMode, GameStatus
+from services.ai_logic import TicTacToeAI, _AlphaBetaSearch, win_score
+from services.board import BoardGeometry
+from services.game_logic import GameEngine, TicTacToeLogic
+
+CLASSIC = TicTacToeAI.CLASSIC
+
+
+def human_game(board_size=3, win_length=None):
+    game_state = GameEngine.create_game("game-1", "p1", "Alice", GameMode.VS_HUMAN,
+                                        board_size=board_size, win_length=win_length)
+    GameEngine.join_game(game_state, "p2", "Bob")
+    return game_state
+
+
+def play(game_state, positions):
+    results = []
+    for i, position in enumerate(positions):
+        results.append(GameEngine.make_move(game_state, "p1" if i % 2 == 0 else "p2", position))
+    return results
+
+
+def test_bitboards_round_trip():
+    board = ["X", "O", None, None, "X", None, "O", None, "X"]
+    x_mask, o_mask = TicTacToeLogic.to_bitboards(board)
+    assert x_mask == 0b100010001
+    assert o_mask == 0b001000010
+    assert TicTacToeLogic.from_bitboards(x_mask, o_mask) == board
+
+
+@pytest.mark.parametrize("board, winner", [
+    (["X", "X", "X", None, "O", "O", None, None, None], "X"),
+    (["X", "O", "X", None, "O", "X", None, "O", None], "O"),
+    (["O", "X", "X", None, "O", None, "X", None, "O"], "O"),
+    (["X", "O", "X", "X", "O", "O", "O", "X", "X"], "draw"),
+    (["X", "O", None, None, "X", None, "O", None, None], None),
+    ([None] * 9, None),
+])
+def test_check_winner(board, winner):
+    assert TicTacToeLogic.check_winner(board) == winner
+
+
+def test_check_winner_large_board():
+    board = [None] * 49
+    for cell in (8, 16, 24, 32):
+        board[cell] = "O"
+    assert TicTacToeLogic.check_winner(board, win_length=5) is None
+    board[40] = "O"
+    assert TicTacToeLogic.check_winner(board, win_length=5) == "O"
+
+
+def test_move_winner_agrees_with_full_scan():
+    rng = random.Random(0)
+    geometry = BoardGeometry.get(5, 4)
+    for _ in range(500):
+        cells = rng.sample(range(25), rng.randint(1, 25))
+        x_mask = o_mask = 0
+        for i, cell in enumerate(cells):
+            if i % 2 == 0:
+                x_mask |= 1 << cell
+            else:
+                o_mask |= 1 << cell
+        before = TicTacToeLogic.bitboard_winner(x_mask & ~(1 << cells[-1]), o_mask & ~(1 << cells[-1]),
+                                                geometry)
+        if before in ("X", "O"):
+            continue
+        assert TicTacToeLogic.move_winner(x_mask, o_mask, cells[-1], geometry) == \
+            TicTacToeLogic.bitboard_winner(x_mask, o_mask, geometry)
+
+
+def test_human_game_win():
+    game_state = human_game()
+    results = play(game_state, [0, 3, 1, 4, 2])
+    assert all(success for success, _, _ in results)
+    assert game_state.status == GameStatus.FINISHED
+    assert game_state.winner == "X"
+    assert game_state.moves_count == 5
+    assert game_state.board == ["X", "X", "X", "O", "O", None, None, None, None]
+
+
+def test_human_game_draw():
+    game_state = human_game()
+    play(game_state, [0, 1, 2, 4, 3, 5, 7, 6, 8])
+    assert game_state.status == GameStatus.FINISHED
+    assert game_state.winner == "draw"
+    assert None not in game_state.board
+
+
+def test_invalid_moves_leave_the_game_unchanged():
+    game_state = human_game()
+    GameEngine.make_move(game_state, "p1", 4)
+    before = game_state.model_dump()
+    assert GameEngine.make_move(game_state, "p1", 0)[0] is False   # not p1's turn
+    assert GameEngine.make_move(game_state, "p2", 4)[0] is False   # taken
+    assert GameEngine.make_move(game_state, "p2", 9)[0] is False   # off the board
+    assert game_state.model_dump() == before
+
+
+def test_move_does_not_mutate_the_previous_board():
+    game_state = human_game()
+    board = game_state.board
+    GameEngine.make_move(game_state, "p1", 4)
+    assert board == [None] * 9
+    assert game_state.board[4] == "X"
+
+
+def test_k_in_a_row_on_larger_board():
+    game_state = human_game(board_size=6, win_length=4)
+    play(game_state, [0, 30, 7, 31, 14, 32])
+    assert game_state.status == GameStatus.ACTIVE
+    success, message, _ = GameEngine.make_move(game_state, "p1", 21)
+    assert success and message == "Game over! Winner: X"
+    assert game_state.winner == "X"
+
+
+# Perfect play on 3x3: exhaustive over every sequence of opponent moves
+
+def _worst_result(ai_mask, opp_mask, ai_to_move):
+    """Worst outcome for the AI over all opponent replies: 1 win, 0 draw, -1 loss"""
+    if CLASSIC.has_line(ai_mask):
+        return 1
+    if CLASSIC.has_line(opp_mask):
+        return -1
+    if CLASSIC.is_full(ai_mask | opp_mask):
+        return 0
+    if ai_to_move:
+        move = TicTacToeAI.perfect_move(ai_mask, opp_mask)
+        assert not ((ai_mask | opp_mask) >> move) & 1
+        return _worst_result(ai_mask | (1 << move), opp_mask, False)
+    return min(
+        _worst_result(ai_mask, opp_mask | (1 << cell), True)
+        for cell in CLASSIC.free_cells(ai_mask | opp_mask)
+    )
+
+
+@pytest.mark.parametrize("ai_moves_first", [True, False])
+def test_perfect_play_never_loses(ai_moves_first):
+    assert _worst_result(0, 0, ai_moves_first) >= 0
+
+
+def test_perfect_play_draws_itself():
+    own = opp = 0
+    while not CLASSIC.is_full(own | opp):
+        own |= 1 << TicTacToeAI.perfect_move(own, opp)
+        if CLASSIC.has_line(own):
+            break
+        own, opp = opp, own
+    assert not CLASSIC.has_line(own) and not CLASSIC.has_line(opp)
+
+
+def test_perfect_play_takes_the_win_before_blocking():
+    # X: 0, 1; O: 3, 4 with O to move: O wins at 5 rather than blocking at 2
+    x_mask = 0b000000011
+    o_mask = 0b000011000
+    assert TicTacToeAI.perfect_move(o_mask, x_mask) == 5
+
+
+def test_perfect_play_blocks():
+    # X: 0, 1; O: 4 with O to move: only 2 avoids losing
+    assert TicTacToeAI.perfect_move(0b000010000, 0b000000011) == 2
+
+
+def test_ai_game_with_perfect_difficulty_never_lost():
+    rng = random.Random(1)
+    for _ in range(50):
+        game_state = GameEngine.create_game("game-1", "p1", "Alice", GameMode.VS_AI,
+                                            ai_difficulty=AIDifficulty.PERFECT)
+        while game_state.status == GameStatus.ACTIVE:
+            free = [i for i, cell in enumerate(game_state.board) if cell is None]
+            success, _, _ = GameEngine.make_move(game_state, "p1", rng.choice(free))
+            assert success
+        assert game_state.winner in ("O", "draw")
+
+
+def test_greedy_wins_then_blocks():
+    # Greedy as O: completes 3-4-5 rather than blocking 0-1-2
+    assert TicTacToeAI.greedy_move(0b000011000, 0b000000011) == 5
+    assert TicTacToeAI.greedy_move(0b000010000, 0b000000011) == 2
+
+
+@pytest.mark.parametrize("size,win_length", [(8, 7), (8, 8), (19, 19)])
+def test_heuristic_scores_stay_below_a_win(size, win_length):
+    # Long lines for both sides, but no win within one move
+    geometry = BoardGeometry.get(size, win_length)
+    own = sum(1 << cell for cell in range(win_length - 2))
+    opp = sum(1 << cell for cell in range(2 * size, 2 * size + win_length - 2))
+    search = _AlphaBetaSearch(geometry, time.monotonic() + 5)
+    score, _ = search.root(own, opp, 1)
+    assert abs(score) < win_score(geometry) - geometry.cell_count
+
+
+def test_search_takes_a_long_win():
+    geometry = BoardGeometry.get(8, 7)
+    own = sum(1 << cell for cell in range(6))
+    opp = sum(1 << cell for cell in range(16, 22))
+    assert TicTacToeAI.search_move(own, opp, geometry, time_budget=1.0) == 6
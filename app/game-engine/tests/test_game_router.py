@@ -0,0 +1,253 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("lupa")  # Lua scripting in fakeredis
+
+import config.admission as admission
+import config.redis_config as redis_config
+import routers.game_router as game_router
+from config.redis_config import GameVersionConflict, get_idempotency_record
+from main import app
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """run(scenario): await scenario(client) against the app on a fresh fakeredis"""
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis_config, "_create_client", lambda url: fakeredis.FakeAsyncRedis(server=server))
+    monkeypatch.setattr(admission, "ADMISSION_ENABLED", False)
+
+    def run(scenario):
+        async def main():
+            await redis_config.init_redis()
+            try:
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    return await scenario(client)
+            finally:
+                await redis_config.close_redis()
+        return asyncio.run(main())
+
+    return run
+
+
+async def create_human_game(client):
+    response = await client.post("/api/game/create", json={
+        "created_by": "p1", "created_by_username": "Alice", "game_mode": "vs_human"})
+    assert response.status_code == 200
+    game_id = response.json()["game_state"]["game_id"]
+    response = await client.post(f"/api/game/join/{game_id}", json={
+        "player_id": "p2", "player_username": "Bob"})
+    assert response.status_code == 200
+    return game_id
+
+
+async def move(client, game_id, player_id, position, key=None):
+    return await client.post(f"/api/game/move/{game_id}", headers={"Idempotency-Key": key} if key else {},
+                             json={"player_id": player_id, "position": position})
+
+
+async def game_version(client, game_id):
+    response = await client.get(f"/api/game/state/{game_id}")
+    return response.json()["game_state"]["version"]
+
+
+# Idempotency-Key
+
+def test_create_replay(api):
+    async def scenario(client):
+        body = {"created_by": "p1", "created_by_username": "Alice"}
+        first = await client.post("/api/game/create", json=body, headers={"Idempotency-Key": "k1"})
+        second = await client.post("/api/game/create", json=body, headers={"Idempotency-Key": "k1"})
+        assert first.status_code == second.status_code == 200
+        assert second.headers.get("Idempotent-Replayed") == "true"
+        assert second.json() == first.json()
+
+        other = await client.post("/api/game/create", json=body, headers={"Idempotency-Key": "k2"})
+        assert other.json()["game_state"]["game_id"] != first.json()["game_state"]["game_id"]
+    api(scenario)
+
+
+def test_join_replay(api):
+    async def scenario(client):
+        created = await client.post("/api/game/create", json={
+            "created_by": "p1", "created_by_username": "Alice"})
+        game_id = created.json()["game_state"]["game_id"]
+        body = {"player_id": "p2", "player_username": "Bob"}
+        first = await client.post(f"/api/game/join/{game_id}", json=body, headers={"Idempotency-Key": "j"})
+        second = await client.post(f"/api/game/join/{game_id}", json=body, headers={"Idempotency-Key": "j"})
+        assert first.status_code == second.status_code == 200
+        assert second.headers.get("Idempotent-Replayed") == "true"
+        assert second.json() == first.json()
+        assert await game_version(client, game_id) == 1
+    api(scenario)
+
+
+def test_move_replay_is_not_applied_twice(api):
+    async def scenario(client):
+        game_id = await create_human_game(client)
+        version = await game_version(client, game_id)
+        first = await move(client, game_id, "p1", 4, key="m1")
+        second = await move(client, game_id, "p1", 4, key="m1")
+        assert first.status_code == second.status_code == 200
+        assert second.headers.get("Idempotent-Replayed") == "true"
+        assert second.json() == first.json()
+        assert await game_version(client, game_id) == version + 1
+
+        # Without the key the same move is a second, invalid move
+        assert (await move(client, game_id, "p1", 4)).status_code == 400
+    api(scenario)
+
+
+def test_reused_key_with_another_request_is_rejected(api):
+    async def scenario(client):
+        game_id = await create_human_game(client)
+        assert (await move(client, game_id, "p1", 4, key="m1")).status_code == 200
+        reused = await move(client, game_id, "p1", 0, key="m1")
+        assert reused.status_code == 422
+    api(scenario)
+
+
+def test_record_is_only_stored_with_the_state_change(api, monkeypatch):
+    async def always_conflict(game_id, game_data, expected_version, *args, **kwargs):
+        raise GameVersionConflict(game_id, expected_version, expected_version + 1)
+
+    async def scenario(client):
+        game_id = await create_human_game(client)
+        store = game_router.store_game_if_version
+        monkeypatch.setattr(game_router, "store_game_if_version", always_conflict)
+        assert (await move(client, game_id, "p1", 4, key="m1")).status_code == 409
+        assert await get_idempotency_record(game_id, "move:p1:m1") is None
+
+        monkeypatch.setattr(game_router, "store_game_if_version", store)
+        retried = await move(client, game_id, "p1", 4, key="m1")
+        assert retried.status_code == 200
+        assert "Idempotent-Replayed" not in retried.headers
+        assert await get_idempotency_record(game_id, "move:p1:m1") is not None
+    api(scenario)
+
+
+# Compare-and-set
+
+def test_version_conflict_is_retried(api, monkeypatch):
+    calls = []
+
+    async def scenario(client):
+        game_id = await create_human_game(client)
+        store = game_router.store_game_if_version
+
+        async def conflict_once(game_id, game_data, expected_version, *args, **kwargs):
+            calls.append(expected_version)
+            if len(calls) == 1:
+                raise GameVersionConflict(game_id, expected_version, expected_version + 1)
+            return await store(game_id, game_data, expected_version, *args, **kwargs)
+
+        version = await game_version(client, game_id)
+        monkeypatch.setattr(game_router, "store_game_if_version", conflict_once)
+        response = await move(client, game_id, "p1", 4)
+        monkeypatch.setattr(game_router, "store_game_if_version", store)
+
+        assert response.status_code == 200
+        assert len(calls) == 2
+        assert await game_version(client, game_id) == version + 1
+        assert (await client.get(f"/api/game/state/{game_id}")).json()["game_state"]["board"][4] == "X"
+    api(scenario)
+
+
+def test_version_conflict_gives_up_with_409(api, monkeypatch):
+    async def always_conflict(game_id, game_data, expected_version, *args, **kwargs):
+        raise GameVersionConflict(game_id, expected_version, expected_version + 1)
+
+    async def scenario(client):
+        game_id = await create_human_game(client)
+        version = await game_version(client, game_id)
+        store = game_router.store_game_if_version
+        monkeypatch.setattr(game_router, "store_game_if_version", always_conflict)
+        assert (await move(client, game_id, "p1", 4)).status_code == 409
+        monkeypatch.setattr(game_router, "store_game_if_version", store)
+        assert await game_version(client, game_id) == version
+    api(scenario)
+
+
+# Batch moves
+
+def test_batch_moves(api):
+    async def scenario(client):
+        first = await create_human_game(client)
+        second = await create_human_game(client)
+        response = await client.post("/api/game/moves/batch", json={"moves": [
+            {"game_id": first, "player_id": "p1", "position": 0},
+            {"game_id": first, "player_id": "p2", "position": 4},
+            {"game_id": second, "player_id": "p2", "position": 0},  # Not p2's turn
+            {"game_id": "missing", "player_id": "p1", "position": 0},
+        ]})
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["applied"], body["failed"]) == (2, 2)
+        assert [result["status_code"] for result in body["results"]] == [200, 200, 400, 404]
+
+        state = (await client.get(f"/api/game/state/{first}")).json()["game_state"]
+        assert state["board"][0] == "X" and state["board"][4] == "O"
+        assert state["version"] == body["results"][1]["version"]
+        assert (await client.get(f"/api/game/state/{second}")).json()["game_state"]["moves_count"] == 0
+    api(scenario)
+
+
+# Matchmaking
+
+def test_matchmaking_claim_is_atomic(api):
+    async def scenario(client):
+        waiting = await client.post("/api/game/matchmaking", json={"player_id": "a", "player_username": "A"})
+        game_id = waiting.json()["game_state"]["game_id"]
+        assert not waiting.json()["matched"]
+
+        responses = await asyncio.gather(*(
+            client.post("/api/game/matchmaking", json={"player_id": f"p{i}", "player_username": "P"})
+            for i in range(5)
+        ))
+        matched = [r.json() for r in responses if r.json()["matched"]]
+        assert len(matched) == 1
+        assert matched[0]["game_state"]["game_id"] == game_id
+        assert matched[0]["game_state"]["status"] == "active"
+    api(scenario)
+
+
+def test_matchmaking_twice_returns_the_same_game(api):
+    async def scenario(client):
+        body = {"player_id": "a", "player_username": "A"}
+        first = (await client.post("/api/game/matchmaking", json=body)).json()
+        second = (await client.post("/api/game/matchmaking", json=body)).json()
+        assert not first["matched"] and not second["matched"]
+        assert second["game_state"]["game_id"] == first["game_state"]["game_id"]
+        stats = (await client.get("/api/game/matchmaking/stats")).json()
+        assert stats["waiting"] == 1
+    api(scenario)
+
+
+# Listing
+
+def test_list_pagination(api):
+    async def scenario(client):
+        created = set()
+        for i in range(7):
+            response = await client.post("/api/game/create", json={
+                "created_by": f"p{i}", "created_by_username": "P"})
+            created.add(response.json()["game_state"]["game_id"])
+
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+            page = (await client.get("/api/game/list", params=params)).json()
+            seen.extend(game["game_id"] for game in page["games"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert len(seen) == len(set(seen)) == 7
+        assert set(seen) == created
+
+        assert (await client.get("/api/game/list", params={"cursor": "not-a-cursor"})).status_code == 400
+    api(scenario)